@@ -1,56 +1,189 @@
-import json
+import asyncio
 import os
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+from scripts.config_cache import ConfigConflict, ConfigError, get_config_cache
+from scripts.json_patch import JsonPatchError, apply_patch
+from scripts.log_follower import DROPPED, FileFollower
+from scripts.log_reader import iter_byte_range, parse_range, tail_lines
+from scripts.metrics import fetch_metrics
 
 app = FastAPI()
+# Compresses responses (including streamed logs) for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, 'src', 'config.json')
 LOG_PATH = os.path.join(BASE_DIR, 'logs', 'run.log')
+EVENTS_PATH = os.path.join(BASE_DIR, 'logs', 'cycle_events.jsonl')
+METRICS_SOCKET = os.path.join(BASE_DIR, 'logs', 'metrics.sock')
+config_cache = get_config_cache(CONFIG_PATH)
+# One follower per file, shared by every /stream client
+followers = {'log': FileFollower(LOG_PATH, 'log'), 'event': FileFollower(EVENTS_PATH, 'event')}
+STREAM_QUEUE_SIZE = 256
+STREAM_HEARTBEAT = 15.0
 
 @app.get("/status")
 def get_status():
     # Show current config and last log line
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
+        config = config_cache.get()
     except Exception as e:
         config = {"error": str(e)}
     try:
-        with open(LOG_PATH, 'r') as f:
-            lines = f.readlines()
-            last_log = lines[-10:] if len(lines) > 10 else lines
+        last_log = tail_lines(LOG_PATH, 10)
     except Exception as e:
         last_log = [f"Error reading log: {e}"]
     return {"config": config, "last_log": last_log}
 
+def _etag_matches(header, etag):
+    return header is not None and (header.strip() == '*' or etag in [t.strip() for t in header.split(',')])
+
 @app.get("/config")
-def get_config():
+def get_config(request: Request):
+    """Returns the cached config; 304 if If-None-Match has the current ETag."""
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
-        return config
+        config, etag = config_cache.get_with_etag()
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    return JSONResponse(content=config, headers={'ETag': etag})
+
+def _write_config(config, expected_etag):
+    """Validates and atomically writes `config`; 412 if `expected_etag` is stale."""
+    if expected_etag is not None and expected_etag.strip() == '*':
+        expected_etag = None
+    try:
+        config, etag = config_cache.write(config, expected_etag=expected_etag)
+    except ConfigConflict as e:
+        return JSONResponse(status_code=412, content={"error": str(e)})
+    except ConfigError as e:
+        return JSONResponse(status_code=422, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return JSONResponse(content={"status": "ok", "version": config['config_version']}, headers={'ETag': etag})
 
 @app.post("/config")
 async def set_config(request: Request):
+    """Replaces the whole config (optionally guarded by If-Match)."""
     try:
         new_config = await request.json()
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(new_config, f, indent=2)
-        return {"status": "ok"}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid JSON: {e}"})
+    return _write_config(new_config, request.headers.get('if-match'))
+
+@app.patch("/config")
+async def patch_config(request: Request):
+    """Applies a JSON Patch (RFC 6902) to the current config."""
+    try:
+        patch = await request.json()
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid JSON: {e}"})
+    try:
+        current, etag = config_cache.get_with_etag()
+        new_config = apply_patch(current, patch)
+    except JsonPatchError as e:
+        return JSONResponse(status_code=422, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+    # Without If-Match, still refuse to apply the patch over a concurrent change
+    return _write_config(new_config, request.headers.get('if-match') or etag)
 
 @app.get("/log")
-def get_log():
+def get_log(request: Request, lines: int = None, offset: int = None, limit: int = None):
+    """Returns the run log.
+
+    - lines=N: only the last N lines
+    - offset=/limit=: a byte window (X-Log-Size tells clients where to resume)
+    - Range: bytes=...: a standard partial response (206)
+    Otherwise the whole file is streamed in chunks.
+    """
     try:
-        with open(LOG_PATH, 'r') as f:
-            return PlainTextResponse(f.read())
+        if lines is not None:
+            return PlainTextResponse(''.join(tail_lines(LOG_PATH, lines)))
+        size = os.path.getsize(LOG_PATH)
+        headers = {'Accept-Ranges': 'bytes', 'X-Log-Size': str(size)}
+        status_code = 200
+        start, end = 0, size - 1
+        if offset is not None or limit is not None:
+            start = min(max(offset or 0, 0), size)
+            end = size - 1 if limit is None else min(size, start + max(limit, 0)) - 1
+        else:
+            try:
+                byte_range = parse_range(request.headers.get('range'), size)
+            except ValueError:
+                return PlainTextResponse('', status_code=416, headers={'Content-Range': f'bytes */{size}'})
+            if byte_range is not None:
+                start, end = byte_range
+                status_code = 206
+                # Ranges refer to the unencoded file, so never gzip a partial response
+                headers.update({'Content-Range': f'bytes {start}-{end}/{size}', 'Content-Encoding': 'identity'})
+        headers['Content-Length'] = str(max(0, end - start + 1))
+        return StreamingResponse(iter_byte_range(LOG_PATH, start, end), status_code=status_code,
+                                 media_type='text/plain; charset=utf-8', headers=headers)
     except Exception as e:
         return PlainTextResponse(f"Error reading log: {e}", status_code=500)
 
+def _sse(kind, data):
+    return f"event: {kind}\n" + ''.join(f"data: {line}\n" for line in data.split('\n')) + "\n"
+
+@app.get("/stream")
+async def stream(request: Request, sources: str = 'log,event', tail: int = 0):
+    """Server-sent events: new run log lines ('log') and cycle events ('event').
+
+    tail=N first replays the last N log lines. Clients that fall more than
+    STREAM_QUEUE_SIZE lines behind are sent a 'dropped' event and disconnected.
+    """
+    kinds = [kind for kind in sources.split(',') if kind in followers]
+    if not kinds:
+        return JSONResponse(status_code=400, content={"error": f"sources must be among {sorted(followers)}"})
+
+    async def events():
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        for kind in kinds:
+            followers[kind].subscribe(queue)
+        try:
+            if tail > 0 and 'log' in kinds:
+                try:
+                    for line in await asyncio.to_thread(tail_lines, LOG_PATH, tail):
+                        yield _sse('log', line.rstrip('\n'))
+                except OSError:
+                    pass
+            while True:
+                try:
+                    kind, line = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if line is DROPPED:
+                    yield _sse('dropped', 'client too slow, reconnect to resume')
+                    break
+                yield _sse(kind, line)
+        finally:
+            for kind in kinds:
+                followers[kind].unsubscribe(queue)
+
+    # Never gzip: compression would buffer the stream
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'Content-Encoding': 'identity'})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics relayed from the running automation daemon."""
+    try:
+        body = await asyncio.to_thread(fetch_metrics, METRICS_SOCKET)
+        up = 1
+    except OSError:
+        body, up = '', 0
+    body += ('# HELP click_and_yes_daemon_up Whether the automation daemon answered\n'
+             '# TYPE click_and_yes_daemon_up gauge\n'
+             f'click_and_yes_daemon_up {up}\n')
+    return PlainTextResponse(body, media_type='text/plain; version=0.0.4; charset=utf-8')
+
 # To run: uvicorn api_server:app --reload
@@ -1,2 +1,2 @@
-def run(message=None, coords=None):
-    print(f"[PLUGIN] Message: {message}, Coords: {coords}")
+def run(message=None, window=None, coords=None):
+    print(f"[PLUGIN] Message: {message}, Window: {window}, Coords: {coords}")
@@ -1,6 +1,9 @@
 #!/bin/bash
 
-# Robust automation runner with proper looping
+# Thin launcher for the resident automation daemon.
+# The daemon keeps config, imports and the X11 connection warm across cycles
+# and schedules cycles itself; this script only restarts it if it exits
+# abnormally (e.g. its per-cycle watchdog fired).
 LOG_DIR="logs"
 mkdir -p "$LOG_DIR"
 
@@ -8,10 +11,15 @@ log_with_time() {
     echo "$(date '+%Y-%m-%d %H:%M:%S') $1"
 }
 
+DAEMON_PID=""
+
 cleanup() {
     log_with_time "[INFO] 🛑 Shutdown signal received"
     log_with_time "[INFO] Cleaning up..."
-    pkill -f "click_and_type_multi_linux.py" 2>/dev/null || true
+    if [ -n "$DAEMON_PID" ]; then
+        kill -TERM "$DAEMON_PID" 2>/dev/null || true
+        wait "$DAEMON_PID" 2>/dev/null
+    fi
     log_with_time "[INFO] === AUTOMATION RUNNER TERMINATED ==="
     exit 0
 }
@@ -21,35 +29,21 @@ trap cleanup SIGINT SIGTERM
 log_with_time "=== AUTOMATION RUNNER STARTING ==="
 log_with_time "Press Ctrl+C to stop gracefully"
 
-# Use 15 second intervals
-WAIT_TIME=15
+# Seconds between cycles; leave empty to use cycle_interval from src/config.json
+WAIT_TIME="${WAIT_TIME-15}"
 
-LOOP_COUNT=0
+RESTART_COUNT=0
 while true; do
-    LOOP_COUNT=$((LOOP_COUNT + 1))
-    log_with_time "==================== RUN #$LOOP_COUNT ===================="
-    # Validate config
-    if ! python3 -c "
-import json
-with open('src/config.json') as f:
-    config = json.load(f)
-assert config.get('windows'), 'No windows configured'
-assert config.get('message'), 'No messages configured'
-print('Configuration valid. Running automation...')
-"; then
-        log_with_time "❌ Configuration invalid. Skipping this run."
-        sleep 10
-        continue
-    fi
-    # Run automation
-    if timeout 45 python3 scripts/click_and_type_multi_linux.py; then
-        log_with_time "✓ Automation run #$LOOP_COUNT completed successfully"
-    else
-        log_with_time "⚠ Automation run #$LOOP_COUNT completed with issues"
+    python3 scripts/automation_daemon.py ${WAIT_TIME:+--interval "$WAIT_TIME"} --cycle-timeout 45 "$@" &
+    DAEMON_PID=$!
+    wait "$DAEMON_PID"
+    STATUS=$?
+    DAEMON_PID=""
+    if [ "$STATUS" -eq 0 ]; then
+        log_with_time "✓ Automation daemon exited cleanly"
+        break
     fi
-    log_with_time "Waiting $WAIT_TIME seconds before next run... (Press Ctrl+C to exit)"
-    # Interruptible sleep
-    for ((i=0; i<WAIT_TIME; i++)); do
-        sleep 1
-    done
+    RESTART_COUNT=$((RESTART_COUNT + 1))
+    log_with_time "⚠ Automation daemon exited with status $STATUS, restart #$RESTART_COUNT in 10 seconds..."
+    sleep 10
 done
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Resident automation daemon.
+
+Replaces the run.sh spawn-per-run loop: the interpreter, imports, X11
+connection, window registry and parsed config stay warm across cycles.
+An in-process scheduler starts a cycle every `cycle_interval` seconds or,
+with `"trigger": "idle"`, whenever a window's chat region has stopped
+changing for `idle_seconds` (see idle_watcher.py). A
+watchdog exits the process if a single cycle overruns `cycle_timeout`, so a
+supervisor (run.sh) can restart it. Each cycle emits a structured event
+(see cycle_events.py) and updates the metrics served on logs/metrics.sock.
+
+Unlike click_and_type_multi_linux.py, which picks the first Cursor window
+and searches it for the chat panel (falling back to manual selection), the
+daemon delivers to the windows listed in the config, by title, at the
+cached, detected or configured chat input coordinates.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+from click_and_type_multi_linux import (absolute_file_protection_check, activate_window,
+                                        backend, find_cursor_ai_chat_panel, log_with_time, registry)
+from click_and_type_multi_linux_enhanced import engine, send_message
+from config_cache import ConfigError, get_config_cache
+from coordinate_cache import get_coordinate_cache
+from cycle_events import CycleEvent, get_event_log
+from cycling_state import get_cycling_state
+from idle_watcher import DEFAULT_FPS, DEFAULT_MAX_WAIT, DEFAULT_STABLE_SECONDS, IdleWatcher, chat_region
+from log_pipeline import flush_logging
+from message_sampler import MessageSampler, message_text
+from metrics import CycleMetrics, MetricsServer
+from title_matcher import build_matcher
+
+EXIT_WATCHDOG = 3
+
+
+class AutomationDaemon:
+    """Runs automation cycles on a schedule or on idle chats inside one process."""
+
+    def __init__(self, interval=None, cycle_timeout=45.0, trigger=None):
+        self.interval = interval
+        self.trigger = trigger
+        self.cycle_timeout = cycle_timeout
+        self.cycle_count = 0
+        self._stop = threading.Event()
+        self._deadline = None
+        self.cycling_state = get_cycling_state()
+        self.config = None
+        self.config_cache = get_config_cache()
+        self.config_generation = None
+        self.events = get_event_log()
+        self.metrics = CycleMetrics()
+        self.coordinates = get_coordinate_cache().watch(registry)
+        self.idle = IdleWatcher()
+
+    def load_config(self):
+        """Refreshes derived state when the cached config has a new generation."""
+        config = self.config_cache.get()
+        if self.config_generation == self.config_cache.generation:
+            return config
+        if self.config_generation is not None:
+            log_with_time(f"🔄 Config reloaded (generation {self.config_cache.generation}, "
+                          f"version {config.get('config_version', 0)})")
+        self.config = config
+        self.config_generation = self.config_cache.generation
+        cycling = config.get('cycling', 'round_robin')
+        self.sampler = None
+        if cycling in MessageSampler.MODES:
+            self.sampler = MessageSampler(config['message'], cycling, config.get('random_seed'))
+        enabled_windows = self.cycling_state.enabled_ring(config['windows'])
+        self.matcher = build_matcher(tuple(w.get('title', '') for w in enabled_windows))
+        engine.mode = config.get('delivery_mode', 'auto')
+        engine.activation_timeout = float(config.get('activation_timeout', 2.0))
+        self.cycling_state.flush_interval = float(config.get('state_flush_interval', 5.0))
+        self.idle.stable_seconds = float(config.get('idle_seconds', DEFAULT_STABLE_SECONDS))
+        self.idle.fps = float(config.get('idle_fps', DEFAULT_FPS))
+        self.idle.max_wait = float(config.get('idle_max_wait', DEFAULT_MAX_WAIT))
+        return config
+
+    def next_message(self):
+        """Returns (index, text) of the next message."""
+        messages = self.config['message']
+        if self.sampler is not None:
+            index = self.sampler.draw_index()
+        else:
+            index = self.cycling_state.next_index('message', len(messages))
+        return index, message_text(messages[index])
+
+    def next_window(self):
+        return self.cycling_state.next_window(self.config['windows'], self.config.get('window_cycling', 'round_robin'))
+
+    def run_cycle(self, event=None, window_config=None):
+        """Delivers one message to `window_config`, by default the next configured window.
+
+        Stage timings and outcome details are recorded on `event`.
+        """
+        event = event or CycleEvent(self.cycle_count)
+        window_config = window_config or self.next_window()
+        title = window_config.get('title', '')
+        message_id, message = self.next_message()
+        event.update(window_title=title, message_id=message_id)
+        with event.stage('discovery'):
+            window = self.matcher.match_windows(registry.windows()).get(title)
+        if not window:
+            log_with_time(f"❌ Window not found: {title}")
+            event.update(error='window not found')
+            return False
+        event.update(window_id=window['id'])
+        with event.stage('activation'):
+            activated = activate_window(window, float(self.config.get('activation_timeout', 2.0)))
+        event.update(retries=window.get('activation_attempts', 1) - 1)
+        if not activated:
+            log_with_time(f"❌ Could not activate window: {window['title']}")
+            event.update(error='activation failed')
+            return False
+        with event.stage('panel'):
+            window = registry.get(window['id']) or window
+            coordinates = self.resolve_coordinates(window, window_config)
+            if coordinates is not None:
+                backend.mouse_move(coordinates['x'], coordinates['y'])
+        if coordinates is None:
+            log_with_time(f"❌ No chat input found or configured for: {title}")
+            event.update(error='no coordinates')
+            return False
+        event.update(panel_source=coordinates['source'])
+        with event.stage('safety'):
+            blocked = absolute_file_protection_check()
+        if blocked:
+            log_with_time("❌ Safety check failed, skipping delivery")
+            event.update(error='safety check blocked', safety_blocked=True)
+            if coordinates['source'] != 'config':
+                self.coordinates.forget(window)
+            return False
+        report = {}
+        sent = send_message(message, click_at=coordinates, details=report)
+        event.record_delivery(report)
+        if not sent:
+            event.update(error=report.get('error') or 'delivery failed')
+        return sent
+
+    def resolve_coordinates(self, window, window_config):
+        """Returns {'x', 'y', 'source'} for the window's chat input.
+
+        Coordinates configured for the window win: detection only runs for
+        it if `detect_chat_input` is set to true (on the window, or else
+        globally). Windows without coordinates are detected unless it is
+        set to false. Detection uses the window-relative cache; on a miss
+        (new window, or its size changed) it searches the window once and
+        caches the result, falling back to any configured coordinates.
+        """
+        configured = window_config.get('coordinates', {})
+        has_configured = 'x' in configured and 'y' in configured
+        if self.detects_chat_input(window_config):
+            cached = self.coordinates.get(window)
+            if cached is not None:
+                return cached
+            if window.get('geometry'):
+                found = find_cursor_ai_chat_panel(window)
+                if found:
+                    self.coordinates.put(window, found['x'], found['y'], found.get('confidence'))
+                    return {'x': found['x'], 'y': found['y'], 'source': 'detected'}
+        if has_configured:
+            return {'x': configured['x'], 'y': configured['y'], 'source': 'config'}
+        return None
+
+    def detects_chat_input(self, window_config):
+        """Whether the chat input of this window is searched for (see resolve_coordinates)."""
+        configured = window_config.get('coordinates', {})
+        default = not ('x' in configured and 'y' in configured)
+        return window_config.get('detect_chat_input', self.config.get('detect_chat_input', default))
+
+    def cycle_interval(self):
+        """Seconds between cycle starts, from the command line or else the config."""
+        if self.interval is not None:
+            return self.interval
+        return float((self.config or {}).get('cycle_interval', 15))
+
+    def trigger_mode(self):
+        """'interval' or 'idle', from the command line or else the config."""
+        if self.trigger:
+            return self.trigger
+        try:
+            config = self.load_config()
+        except ConfigError:
+            config = self.config or {}
+        return config.get('trigger', 'interval')
+
+    def chat_regions(self):
+        """Screen rectangles to watch for idleness, keyed by window title.
+
+        A rectangle that is not on screen (its window is minimized, on
+        another desktop or covered there) is reported as None, so another
+        window's content is never mistaken for its activity.
+        """
+        try:
+            config = self.load_config()
+        except ConfigError as e:
+            log_with_time(f"❌ Configuration invalid: {e}. Keeping the watched regions.")
+            return None
+        regions = {}
+        windows = self.matcher.match_windows(registry.windows())
+        for window_config in self.cycling_state.enabled_ring(config['windows']):
+            title = window_config.get('title', '')
+            window = windows.get(title)
+            if window and window.get('geometry'):
+                configured = window_config.get('coordinates', {})
+                if self.detects_chat_input(window_config) or not ('x' in configured and 'y' in configured):
+                    chat_input = self.coordinates.get(window)
+                else:
+                    chat_input = configured
+                region = chat_region(window, window_config.get('chat_region'), chat_input)
+                regions[title] = region if registry.is_visible(window['id'], region) else None
+        return regions
+
+    def wait_for_idle(self):
+        """Blocks until a watched chat region has gone quiet.
+
+        Returns that window's config, or None on shutdown.
+        """
+        title = self.idle.wait(self._stop, refresh=self.chat_regions)
+        if title is None:
+            return None
+        self.idle.fired(title)
+        log_with_time(f"💤 Chat idle for {self.idle.stable_seconds:.0f}s: {title}")
+        return next((w for w in self.config['windows'] if w.get('title', '') == title), None)
+
+    def _watchdog(self):
+        while not self._stop.wait(1.0):
+            deadline = self._deadline
+            if deadline is not None and time.monotonic() > deadline:
+                log_with_time(f"🛑 Watchdog: cycle #{self.cycle_count} exceeded {self.cycle_timeout}s, exiting")
+                self.cycling_state.flush()
+                flush_logging()
+                os._exit(EXIT_WATCHDOG)
+
+    def stop(self, *_):
+        log_with_time("🛑 Shutdown signal received")
+        self._stop.set()
+
+    def run_forever(self, once=False):
+        threading.Thread(target=self._watchdog, name='cycle-watchdog', daemon=True).start()
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            window_config = None
+            if self.trigger_mode() == 'idle':
+                try:
+                    window_config = self.wait_for_idle()
+                except Exception as e:
+                    retry = self.cycle_interval()
+                    log_with_time(f"❌ Idle detection failed: {e}. Retrying in {retry:.0f}s.")
+                    self._stop.wait(retry)
+                    continue
+                if window_config is None:
+                    continue
+            self.cycle_count += 1
+            log_with_time(f"==================== CYCLE #{self.cycle_count} ====================")
+            event = CycleEvent(self.cycle_count, backend=backend.name)
+            ok, error = False, None
+            try:
+                try:
+                    self.load_config()
+                except ConfigError as e:
+                    error = f"configuration invalid: {e}"
+                    log_with_time(f"❌ Configuration invalid: {e}. Skipping this cycle.")
+                else:
+                    self._deadline = time.monotonic() + self.cycle_timeout
+                    ok = self.run_cycle(event, window_config)
+                    if ok:
+                        log_with_time(f"✓ Cycle #{self.cycle_count} completed successfully")
+                    else:
+                        log_with_time(f"⚠ Cycle #{self.cycle_count} completed with issues")
+            except Exception as e:
+                error = e
+                log_with_time(f"❌ Cycle #{self.cycle_count} failed: {e}")
+            finally:
+                self._deadline = None
+                self.metrics.observe_cycle(self.events.emit(event.finish(ok, error)))
+            if once:
+                break
+            if self.trigger_mode() == 'idle':
+                continue
+            next_run = max(next_run + self.cycle_interval(), time.monotonic())
+            self._stop.wait(next_run - time.monotonic())
+        log_with_time("=== AUTOMATION DAEMON STOPPED ===")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--interval', type=float, help='seconds between cycle starts (default: config cycle_interval or 15)')
+    parser.add_argument('--cycle-timeout', type=float, default=45.0, help='watchdog limit for a single cycle')
+    parser.add_argument('--once', action='store_true', help='run a single cycle and exit')
+    parser.add_argument('--trigger', choices=('interval', 'idle'),
+                        help='start cycles on a timer or when a chat goes idle (default: config trigger or interval)')
+    args = parser.parse_args()
+    daemon = AutomationDaemon(interval=args.interval, cycle_timeout=args.cycle_timeout, trigger=args.trigger)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    log_with_time(f"=== AUTOMATION DAEMON STARTING ({backend.name} backend, {registry.mode} registry) ===")
+    try:
+        metrics_server = MetricsServer(daemon.metrics.registry)
+    except OSError as e:
+        log_with_time(f"⚠ Metrics socket unavailable: {e}")
+        metrics_server = None
+    try:
+        daemon.run_forever(once=args.once)
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
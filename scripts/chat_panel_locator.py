@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Finds the AI chat input box in a single capture of the window.
+
+Replaces pointer probing (move, click, type a space, backspace at a few
+guessed points) with image analysis: edge detection finds wide, short,
+rectangular boxes, and each is scored on how rectangular its outline is,
+how flat its interior is (an empty text field), how low in the window it
+sits and how crisp its border is. If a template image of the input is
+configured, a multi-scale template match is tried first. The result carries a
+confidence score; nothing is clicked and the pointer never moves.
+"""
+try:
+    import cv2
+    import numpy as np
+    from image_recognition import get_template_matcher, to_gray
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+MIN_CONFIDENCE = 0.5
+
+# Score weights for the edge/rectangle detector; they sum to 1.
+WEIGHTS = {'rectangularity': 0.3, 'flatness': 0.3, 'position': 0.25, 'contrast': 0.15}
+
+
+def _candidate_boxes(gray, edges):
+    height, width = gray.shape
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not (0.15 * width <= w <= 0.98 * width and 18 <= h <= 0.25 * height):
+            continue
+        if w < 2.5 * h or y + h / 2 < 0.4 * height:
+            continue
+        yield (x, y, w, h), cv2.contourArea(contour)
+
+
+def _score(gray, edges, box, area):
+    x, y, w, h = box
+    height = gray.shape[0]
+    interior = gray[y + 4:y + h - 4, x + 4:x + w - 4]
+    border = np.concatenate([edges[y, x:x + w], edges[y + h - 1, x:x + w],
+                             edges[y:y + h, x], edges[y:y + h, x + w - 1]])
+    scores = {
+        'rectangularity': min(1.0, area / float(w * h)),
+        'flatness': 1.0 - min(1.0, float(interior.std()) / 40.0) if interior.size else 0.0,
+        'position': (y + h / 2.0) / height,
+        'contrast': float(border.mean()) / 255.0,
+    }
+    return sum(WEIGHTS[name] * value for name, value in scores.items()), scores
+
+
+def locate_chat_input(image, template=None, template_threshold=0.8):
+    """Returns the chat input found in `image` (BGR or grayscale) or None.
+
+    `template` is an image array or a path (cached by the template matcher).
+    The result is {'x', 'y', 'box', 'confidence', 'method'} with the click
+    point and box (x, y, width, height) relative to the image.
+    """
+    if not OPENCV_AVAILABLE:
+        return None
+    gray = to_gray(image)
+    if template is not None:
+        match = get_template_matcher().find(gray, template, threshold=template_threshold)
+        if match:
+            x, y, tw, th = match['x'], match['y'], match['width'], match['height']
+            return {'x': x + tw // 2, 'y': y + th // 2, 'box': (x, y, tw, th),
+                    'confidence': round(match['score'], 3), 'method': 'template'}
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (3, 3), 0), 30, 90)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    best = None
+    for box, area in _candidate_boxes(gray, edges):
+        confidence, scores = _score(gray, edges, box, area)
+        if best is None or confidence > best['confidence']:
+            x, y, w, h = box
+            best = {'x': x + w // 2, 'y': y + h // 2, 'box': box, 'confidence': round(confidence, 3),
+                    'method': 'edges', 'scores': scores}
+    return best
+
+
+def load_template(path):
+    """Loads a grayscale template image, or returns None."""
+    if not OPENCV_AVAILABLE or not path:
+        return None
+    return get_template_matcher().load(path)
@@ -2,28 +2,30 @@
 Script to automate clicking coordinates and copying message from config.json to clipboard.
 """
 import datetime
-import json
-import logging
 import os
 import platform
 import random
 import time
-from logging.handlers import RotatingFileHandler
 
 import pyautogui
-import pyperclip
 import pygetwindow as gw
 
+from clipboard_owner import copy_to_clipboard
+from config_cache import get_config_cache
+from cycling_state import get_cycling_state
+from log_pipeline import log_with_time, setup_logging
+from message_sampler import sampler_for
+from plugin_manager import get_plugin_manager
+
 
 def get_config():
     """Reads coordinates and message(s) from config file."""
     try:
-        with open(os.path.join(os.path.dirname(__file__), '../src/config.json'), encoding='utf-8') as f:
-            config = json.load(f)
-            coords = config.get('coordinates', {'x': 100, 'y': 200})
-            messages = config.get('message', ["yes, continue"])
-            cycling = config.get('cycling', 'round_robin')  # 'round_robin', 'random', or 'weighted'
-            return coords, messages, cycling
+        config = get_config_cache().get()
+        coords = config.get('coordinates', {'x': 100, 'y': 200})
+        messages = config.get('message', ["yes, continue"])
+        cycling = config.get('cycling', 'round_robin')  # 'round_robin', 'random', or 'weighted'
+        return coords, messages, cycling
     except Exception as e:
         print(f"Error reading config: {e}")
         return {'x': 100, 'y': 200}, ["yes, continue"], 'round_robin'
@@ -31,52 +33,16 @@ def get_config():
 
 def get_next_message(messages, cycling):
     """Cycles or randomly selects messages, supports weights if present."""
-    idx_file = os.path.join(os.path.dirname(__file__), '../logs/message_index.txt')
     # If messages are dicts with 'text', support weighted/random cycling
     if isinstance(messages[0], dict):
         if cycling == 'random':
             return random.choice(messages)['text']
-        elif cycling == 'weighted':
-            weights = [m.get('weight', 1) for m in messages]
-            return random.choices(messages, weights=weights, k=1)[0]['text']
+        elif cycling in ('weighted', 'shuffle_bag'):
+            return sampler_for(messages, cycling, get_config_cache().get().get('random_seed')).draw()
         # Default: round robin
-        try:
-            if os.path.exists(idx_file):
-                with open(idx_file, 'r') as f:
-                    idx = int(f.read().strip())
-            else:
-                idx = 0
-        except Exception:
-            idx = 0
-        message = messages[idx % len(messages)]['text']
-        try:
-            with open(idx_file, 'w') as f:
-                f.write(str((idx + 1) % len(messages)))
-        except Exception as e:
-            print(f"Error writing message index: {e}")
-        return message
+        return messages[get_cycling_state().next_index('message', len(messages))]['text']
     # If messages are strings, fallback to round robin
-    try:
-        if os.path.exists(idx_file):
-            with open(idx_file, 'r') as f:
-                idx = int(f.read().strip())
-        else:
-            idx = 0
-    except Exception:
-        idx = 0
-    message = messages[idx % len(messages)]
-    try:
-        with open(idx_file, 'w') as f:
-            f.write(str((idx + 1) % len(messages)))
-    except Exception as e:
-        print(f"Error writing message index: {e}")
-    return message
-
-
-def log_with_time(msg):
-    now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
-    logging.info(f"{now} {msg}")
+    return messages[get_cycling_state().next_index('message', len(messages))]
 
 
 def click_and_paste(x, y, message, max_retries=3):
@@ -92,10 +58,7 @@ def click_and_paste(x, y, message, max_retries=3):
             time.sleep(0.1)
             pyautogui.click(x, y)
             time.sleep(0.5)
-            pyperclip.copy(full_message)
-            time.sleep(0.1)
-            clipboard_content = pyperclip.paste()
-            if clipboard_content != full_message:
+            if not copy_to_clipboard(full_message):
                 log_with_time(f"[WARNING] Clipboard verification failed on attempt {attempt + 1}")
                 if attempt < max_retries - 1:
                     time.sleep(1)
@@ -120,10 +83,7 @@ def check_platform_dependencies():
     os_name = platform.system()
     missing = []
     if os_name == 'Linux':
-        # pyautogui on Linux may require scrot and python3-tk
-        import shutil
-        if shutil.which('scrot') is None:
-            missing.append('scrot (install with: sudo apt-get install scrot)')
+        # pyautogui on Linux needs python3-tk; screen capture is in-memory (screen_capture.py)
         try:
             import tkinter
         except ImportError:
@@ -150,35 +110,17 @@ def check_platform_dependencies():
         exit(1)
 
 
-def run_plugins(message, coords):
-    import glob
-    import importlib.util
-    import sys
-    plugins_dir = os.path.join(os.path.dirname(__file__), '../plugins')
-    if not os.path.isdir(plugins_dir):
-        return
-    for plugin_path in glob.glob(os.path.join(plugins_dir, '*.py')):
-        plugin_name = os.path.splitext(os.path.basename(plugin_path))[0]
-        spec = importlib.util.spec_from_file_location(plugin_name, plugin_path)
-        if spec is None:
-            continue
-        plugin = importlib.util.module_from_spec(spec)
-        try:
-            sys.modules[plugin_name] = plugin
-            spec.loader.exec_module(plugin)
-            if hasattr(plugin, 'run'):
-                plugin.run(message=message, coords=coords)
-        except Exception as e:
-            print(f"[PLUGIN ERROR] {plugin_name}: {e}")
+def run_plugins(message, coords, hook='pre_send'):
+    # Plugins are imported once and re-imported only when their file changes;
+    # returns False if a pre-send plugin vetoed the message
+    return get_plugin_manager().run_hooks(hook, message=message, coords=coords)
 
 
 def get_windows():
     """Reads window titles from config file."""
     try:
-        with open(os.path.join(os.path.dirname(__file__), '../src/config.json'), encoding='utf-8') as f:
-            config = json.load(f)
-            windows = config.get('windows', [])
-            return [w['title'] for w in windows if 'title' in w]
+        windows = get_config_cache().get().get('windows', [])
+        return [w['title'] for w in windows if 'title' in w]
     except Exception as e:
         print(f"Error reading windows from config: {e}")
         return []
@@ -206,14 +148,7 @@ if __name__ == "__main__":
         log_path = os.path.join(
             os.path.dirname(__file__), '../logs/click_and_type.log'
         )
-        handler = RotatingFileHandler(
-            log_path, maxBytes=1000000, backupCount=3
-        )
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s %(levelname)s %(message)s',
-            handlers=[handler]
-        )
+        setup_logging(log_file=log_path)
         coords, messages, cycling = get_config()
         window_titles = get_windows()
         if not window_titles:
@@ -225,8 +160,11 @@ if __name__ == "__main__":
                     log_with_time(f"[WINDOW] Activating window: {title}")
                     activate_window(title)
                 log_with_time(f"[AUTOMATION] Sending message: {message[:50]}...")
-                run_plugins(message, coords)
+                if not run_plugins(message, coords):
+                    log_with_time("[AUTOMATION] Message vetoed by plugin, skipping.")
+                    continue
                 click_and_paste(coords['x'], coords['y'], message)
+                run_plugins(message, coords, hook='post_send')
                 log_with_time("[AUTOMATION] Message sent and window cycled.")
                 time.sleep(1)  # Wait 1 second between windows
             waiting_time = 60  # 1 minute between cycles
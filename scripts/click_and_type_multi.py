@@ -3,16 +3,20 @@ Multi-window automation script that cycles between different windows
 and sends messages to each one.
 """
 import datetime
-import json
-import logging
 import os
 import platform
 import random
 import time
-from logging.handlers import RotatingFileHandler
 
 import pyautogui
-import pyperclip
+
+from clipboard_owner import copy_to_clipboard
+from config_cache import get_config_cache
+from cycle_pipeline import CyclePipeline
+from cycling_state import get_cycling_state
+from log_pipeline import log_with_time, setup_logging
+from message_sampler import sampler_for
+from plugin_manager import get_plugin_manager
 
 try:
     import pygetwindow as gw
@@ -25,25 +29,15 @@ except ImportError:
 def get_config():
     """Reads configuration including windows and messages."""
     try:
-        with open(os.path.join(os.path.dirname(__file__), '../src/config.json'), encoding='utf-8') as f:
-            config = json.load(f)
-
-            # Legacy support - convert old format to new format
-            if 'coordinates' in config and 'windows' not in config:
-                coords = config.get('coordinates', {'x': 100, 'y': 200})
-                config['windows'] = [{
-                    'title': 'Default Window',
-                    'coordinates': coords,
-                    'enabled': True
-                }]
-
-            windows = config.get('windows', [])
-            messages = config.get('message', ["yes, continue"])
-            cycling = config.get('cycling', 'round_robin')
-            window_cycling = config.get('window_cycling', 'round_robin')
-            fallback_to_coordinates = config.get('fallback_to_coordinates', True)
-
-            return windows, messages, cycling, window_cycling, fallback_to_coordinates
+        # Cached: only re-parsed when src/config.json changes on disk
+        config = get_config_cache().get()
+        windows = config.get('windows', [])
+        messages = config.get('message', ["yes, continue"])
+        cycling = config.get('cycling', 'round_robin')
+        window_cycling = config.get('window_cycling', 'round_robin')
+        fallback_to_coordinates = config.get('fallback_to_coordinates', True)
+
+        return windows, messages, cycling, window_cycling, fallback_to_coordinates
     except Exception as e:
         print(f"Error reading config: {e}")
         default_window = {'title': 'Default', 'coordinates': {'x': 100, 'y': 200}, 'enabled': True}
@@ -52,69 +46,22 @@ def get_config():
 
 def get_next_window(windows, window_cycling):
     """Get the next window to target."""
-    enabled_windows = [w for w in windows if w.get('enabled', True)]
-    if not enabled_windows:
-        return None
-
-    idx_file = os.path.join(os.path.dirname(__file__), '../logs/window_index.txt')
-
-    if window_cycling == 'random':
-        return random.choice(enabled_windows)
-
-    # Round robin (default)
-    try:
-        if os.path.exists(idx_file):
-            with open(idx_file, 'r') as f:
-                idx = int(f.read().strip())
-        else:
-            idx = 0
-    except Exception:
-        idx = 0
-
-    window = enabled_windows[idx % len(enabled_windows)]
-
-    try:
-        with open(idx_file, 'w') as f:
-            f.write(str((idx + 1) % len(enabled_windows)))
-    except Exception as e:
-        print(f"Error writing window index: {e}")
-
-    return window
+    return get_cycling_state().next_window(windows, window_cycling)
 
 
 def get_next_message(messages, cycling):
     """Get the next message to send."""
-    idx_file = os.path.join(os.path.dirname(__file__), '../logs/message_index.txt')
-
     if isinstance(messages[0], dict):
         if cycling == 'random':
             return random.choice(messages)['text']
-        elif cycling == 'weighted':
-            weights = [m.get('weight', 1) for m in messages]
-            return random.choices(messages, weights=weights, k=1)[0]['text']
+        elif cycling in ('weighted', 'shuffle_bag'):
+            return sampler_for(messages, cycling, get_config_cache().get().get('random_seed')).draw()
 
     # Handle both dict and string formats
-    try:
-        if os.path.exists(idx_file):
-            with open(idx_file, 'r') as f:
-                idx = int(f.read().strip())
-        else:
-            idx = 0
-    except Exception:
-        idx = 0
-
+    idx = get_cycling_state().next_index('message', len(messages))
     if isinstance(messages[0], dict):
-        message = messages[idx % len(messages)]['text']
-    else:
-        message = messages[idx % len(messages)]
-
-    try:
-        with open(idx_file, 'w') as f:
-            f.write(str((idx + 1) % len(messages)))
-    except Exception as e:
-        print(f"Error writing message index: {e}")
-
-    return message
+        return messages[idx]['text']
+    return messages[idx]
 
 
 def find_window_by_title(title):
@@ -140,8 +87,11 @@ def find_window_by_title(title):
         return None
 
 
-def activate_window(window_config, fallback_to_coordinates=True):
-    """Activate a window by title, with coordinate fallback."""
+def activate_window(window_config, fallback_to_coordinates=True, window=None):
+    """Activate a window by title, with coordinate fallback.
+
+    `window` may be a window handle already looked up by the caller.
+    """
     title = window_config.get('title', '')
     coordinates = window_config.get('coordinates', {})
 
@@ -149,7 +99,7 @@ def activate_window(window_config, fallback_to_coordinates=True):
 
     # Try to find and activate window by title
     if PYGETWINDOW_AVAILABLE and title:
-        window = find_window_by_title(title)
+        window = window or find_window_by_title(title)
         if window:
             try:
                 if window.isMinimized:
@@ -177,14 +127,7 @@ def activate_window(window_config, fallback_to_coordinates=True):
     return False
 
 
-def log_with_time(msg):
-    """Log message with timestamp."""
-    now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
-    logging.info(f"{now} {msg}")
-
-
-def send_message_to_window(window_config, message, max_retries=3):
+def send_message_to_window(window_config, message, max_retries=3, window=None):
     """Send message to a specific window."""
     title = window_config.get('title', 'Unknown')
     coordinates = window_config.get('coordinates', {})
@@ -193,8 +136,9 @@ def send_message_to_window(window_config, message, max_retries=3):
         try:
             log_with_time(f"[AUTOMATION] Attempt {attempt + 1} for window: {title}")
 
-            # Activate the window
-            if not activate_window(window_config, fallback_to_coordinates=True):
+            # Activate the window (re-look it up on retries in case the handle went stale)
+            if not activate_window(window_config, fallback_to_coordinates=True,
+                                   window=window if attempt == 0 else None):
                 if attempt < max_retries - 1:
                     log_with_time(f"[RETRY] Window activation failed, retrying in 2 seconds...")
                     time.sleep(2)
@@ -210,12 +154,8 @@ def send_message_to_window(window_config, message, max_retries=3):
             now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
             full_message = f"{now} {message}"
 
-            # Copy to clipboard and verify
-            pyperclip.copy(full_message)
-            time.sleep(0.1)
-
-            clipboard_content = pyperclip.paste()
-            if clipboard_content != full_message:
+            # Stage on the clipboard and confirm
+            if not copy_to_clipboard(full_message):
                 log_with_time(f"[WARNING] Clipboard verification failed for {title} on attempt {attempt + 1}")
                 if attempt < max_retries - 1:
                     time.sleep(1)
@@ -273,9 +213,6 @@ def check_platform_dependencies():
         missing.append('pygetwindow (install with: pip install pygetwindow)')
 
     if os_name == 'Linux':
-        import shutil
-        if shutil.which('scrot') is None:
-            missing.append('scrot (install with: sudo apt-get install scrot)')
         try:
             import tkinter
         except ImportError:
@@ -289,30 +226,64 @@ def check_platform_dependencies():
         exit(1)
 
 
-def run_plugins(message, window_config):
-    """Run any available plugins."""
-    import glob
-    import importlib.util
-    import sys
+def target_windows():
+    """Yields the next window from the current (cached) config, forever.
+
+    Stops if the config no longer has an enabled window.
+    """
+    while True:
+        windows, _, _, window_cycling, _ = get_config()
+        target_window = get_next_window(windows, window_cycling)
+        if target_window is None:
+            log_with_time("[ERROR] No enabled windows found")
+            return
+        yield target_window
+
+
+def prepare_delivery(target_window):
+    """Pipeline stage run off the focus path: everything except input."""
+    _, messages, cycling, _, _ = get_config()
+    message = get_next_message(messages, cycling)
+    title = target_window.get('title', '')
+    window = find_window_by_title(title) if title else None
+    list_available_windows()
+    allowed = run_plugins(message, target_window)
+    return {'window_config': target_window, 'message': message, 'window': window, 'allowed': allowed}
+
+
+def revalidate_delivery(prepared):
+    """Re-looks up the prepared window if its handle no longer matches the title."""
+    title = prepared['window_config'].get('title', '')
+    window = prepared['window']
+    if window is not None:
+        try:
+            if title.lower() in window.title.lower():
+                return prepared
+        except Exception as e:
+            log_with_time(f"[WINDOW] Prepared window for '{title}' went stale: {e}")
+    if title:
+        prepared['window'] = find_window_by_title(title)
+    return prepared
 
-    plugins_dir = os.path.join(os.path.dirname(__file__), '../plugins')
-    if not os.path.isdir(plugins_dir):
-        return
 
-    for plugin_path in glob.glob(os.path.join(plugins_dir, '*.py')):
-        plugin_name = os.path.splitext(os.path.basename(plugin_path))[0]
-        spec = importlib.util.spec_from_file_location(plugin_name, plugin_path)
-        if spec is None:
-            continue
+def deliver(prepared):
+    """Serialized pipeline stage: focus, clipboard and keyboard input."""
+    target_window = prepared['window_config']
+    log_with_time(f"[AUTOMATION] Target window: {target_window.get('title', 'Unknown')}")
+    log_with_time(f"[AUTOMATION] Message: {prepared['message'][:50]}...")
+    if not prepared['allowed']:
+        log_with_time("[AUTOMATION] Message vetoed by plugin, skipping.")
+        return False
+    success = send_message_to_window(target_window, prepared['message'], window=prepared['window'])
+    run_plugins(prepared['message'], target_window, hook='post_send')
+    return success
 
-        plugin = importlib.util.module_from_spec(spec)
-        try:
-            sys.modules[plugin_name] = plugin
-            spec.loader.exec_module(plugin)
-            if hasattr(plugin, 'run'):
-                plugin.run(message=message, window=window_config)
-        except Exception as e:
-            print(f"[PLUGIN ERROR] {plugin_name}: {e}")
+
+def run_plugins(message, window_config, hook='pre_send'):
+    """Run any available plugins; returns False if a pre-send plugin vetoed."""
+    # Plugins are imported once and re-imported only when their file changes
+    return get_plugin_manager().run_hooks(hook, message=message, window=window_config,
+                                          coords=window_config.get('coordinates'))
 
 
 if __name__ == "__main__":
@@ -321,12 +292,7 @@ if __name__ == "__main__":
 
         # Set up logging
         log_path = os.path.join(os.path.dirname(__file__), '../logs/click_and_type.log')
-        handler = RotatingFileHandler(log_path, maxBytes=1000000, backupCount=3)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s %(levelname)s %(message)s',
-            handlers=[handler]
-        )
+        setup_logging(log_file=log_path)
 
         # Load configuration
         windows, messages, cycling, window_cycling, fallback_to_coordinates = get_config()
@@ -335,18 +301,14 @@ if __name__ == "__main__":
             log_with_time("[ERROR] No windows configured")
             exit(1)
 
-        # Main loop: cycle through windows and messages
-        while True:
-            target_window = get_next_window(windows, window_cycling)
-            if not target_window:
-                log_with_time("[ERROR] No enabled windows found")
-                exit(1)
-            message = get_next_message(messages, cycling)
-            log_with_time(f"[AUTOMATION] Target window: {target_window.get('title', 'Unknown')}")
-            log_with_time(f"[AUTOMATION] Message: {message[:50]}...")
-            list_available_windows()
-            run_plugins(message, target_window)
-            success = send_message_to_window(target_window, message)
+        if not any(w.get('enabled', True) for w in windows):
+            log_with_time("[ERROR] No enabled windows found")
+            exit(1)
+
+        # Main loop: cycle through windows and messages. The next window is
+        # prepared in the background while we wait after each delivery.
+        pipeline = CyclePipeline(prepare_delivery, deliver, revalidate_delivery)
+        for _, success in pipeline.run(target_windows()):
             if success:
                 log_with_time("[AUTOMATION] Message sent successfully")
             else:
@@ -6,15 +6,27 @@ CURSOR AI CHAT PANEL FINDER
 - Absolute protection against file overwriting
 - Visual coordinate verification before typing
 """
+import copy
 import datetime
-import json
+import logging
 import os
-import random
 import signal
-import subprocess
 import sys
 import time
 
+from x11_backend import LazyProxy, get_backend, parse_window_id
+from chat_panel_locator import MIN_CONFIDENCE, OPENCV_AVAILABLE, locate_chat_input
+from config_cache import get_config_cache
+from log_pipeline import log_with_time
+from message_sampler import MessageSampler
+from screen_capture import capture_region
+from title_matcher import get_config_matcher
+from window_registry import get_registry
+
+backend = LazyProxy(get_backend)
+registry = LazyProxy(get_registry)
+_panel_frame = None
+
 def signal_handler(signum, frame):
     log_with_time(f"🛑 Shutdown requested at {datetime.datetime.now().strftime('%H:%M:%S')}")
     sys.exit(0)
@@ -22,241 +34,155 @@ def signal_handler(signum, frame):
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
-def log_with_time(msg):
-    now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
-    sys.stdout.flush()
-
-def run_command(cmd, timeout=10):
-    try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
-        return result.stdout.strip(), result.stderr.strip(), result.returncode
-    except Exception as e:
-        return "", str(e), 1
-
 def load_config():
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '../src/config.json')
-        with open(config_path, encoding='utf-8') as f:
-            config = json.load(f)
-        return config
+        return get_config_cache().get()
     except Exception as e:
         log_with_time(f"❌ Config error: {e}")
         sys.exit(1)
 
-def prepare_weighted_messages(message_config):
-    weighted_messages = []
-    for msg_item in message_config:
-        if isinstance(msg_item, dict):
-            text = msg_item.get('text', '')
-            weight = msg_item.get('weight', 1)
-        else:
-            text = str(msg_item)
-            weight = 1
-        for _ in range(weight):
-            weighted_messages.append(text)
-    return weighted_messages
-
 def find_cursor_windows():
-    log_with_time("🔍 Finding Cursor windows...")
-    stdout, stderr, returncode = run_command("wmctrl -l")
-    if returncode != 0:
-        log_with_time(f"wmctrl failed: {stderr}")
-        return []
+    log_with_time(f"🔍 Finding Cursor windows ({registry.mode} registry)...")
     cursor_windows = []
-    for line in stdout.split('\n'):
-        if not line.strip():
-            continue
-        parts = line.split(None, 3)
-        if len(parts) >= 4:
-            window_id, desktop, host, window_title = parts[0], parts[1], parts[2], parts[3]
-            if 'cursor' in window_title.lower() and 'click-and-yes-cursor' not in window_title.lower():
-                cursor_windows.append({
-                    'id': window_id,
-                    'title': window_title,
-                    'desktop': desktop
-                })
-                log_with_time(f"Found Cursor window: {window_id} - {window_title}")
+    title_matcher = get_config_matcher()
+    for window in registry.windows():
+        window_id, window_title = window['id'], window['title']
+        result = title_matcher.classify(window_title)
+        if result['targets'] and not result['excluded']:
+            cursor_windows.append(window)
+            log_with_time(f"Found Cursor window: {window_id} - {window_title}")
     cursor_windows.sort(key=lambda w: w['id'])
     log_with_time(f"Found {len(cursor_windows)} valid Cursor windows")
     return cursor_windows
 
-def activate_window(window_info):
+def activate_window(window_info, timeout=2.0):
+    """Activates a window, waiting up to `timeout` seconds per attempt for focus.
+
+    The measured latency is stored in window_info['activation_latency'] and
+    the number of attempts made in window_info['activation_attempts'].
+    """
     window_id = window_info['id']
     window_title = window_info['title']
     log_with_time(f"🎯 Activating: {window_title}")
     for attempt in range(3):
-        run_command(f"wmctrl -ia {window_id}")
-        time.sleep(1.5)
-        current_id, _, _ = run_command('xdotool getwindowfocus')
-        current_name, _, _ = run_command('xdotool getwindowfocus getwindowname')
-        try:
-            expected_decimal = str(int(window_id, 16))
-        except:
-            expected_decimal = window_id
-        if current_id.strip() == expected_decimal or window_title.lower() in current_name.lower():
-            log_with_time(f"✅ Window activated: {current_name.strip()}")
+        start = time.perf_counter()
+        latency = backend.activate_window_sync(window_id, timeout=timeout)
+        if latency is None:
+            current_id = backend.get_active_window()
+            current_name = backend.get_window_name(current_id) or ''
+            if current_id == parse_window_id(window_id) or window_title.lower() in current_name.lower():
+                latency = time.perf_counter() - start
+        window_info['activation_attempts'] = attempt + 1
+        if latency is not None:
+            window_info['activation_latency'] = latency
+            log_with_time(f"✅ Window activated in {latency * 1000:.0f}ms: {window_title}")
             return True
-        else:
-            log_with_time(f"⚠ Activation attempt {attempt + 1} failed")
-            if attempt < 2:
-                time.sleep(1.0)
+        log_with_time(f"⚠ Activation attempt {attempt + 1} not confirmed within {timeout}s")
+    window_info['activation_latency'] = None
     return False
 
 def get_current_mouse_position():
     try:
-        stdout, _, _ = run_command('xdotool getmouselocation --shell')
-        coords = {}
-        for line in stdout.split('\n'):
-            if '=' in line:
-                key, value = line.split('=', 1)
-                coords[key] = int(value)
-        return coords.get('X', 0), coords.get('Y', 0)
+        x, y, _ = backend.get_mouse_location()
+        return x, y
     except:
         return 0, 0
 
 def get_window_info():
     try:
-        window_id, _, _ = run_command('xdotool getwindowfocus')
+        window_id = backend.get_active_window()
         if not window_id:
             return None
-        geometry_output, _, _ = run_command(f'xdotool getwindowgeometry {window_id}')
-        window_name, _, _ = run_command(f'xdotool getwindowname {window_id}')
         return {
             'id': window_id,
-            'name': window_name.strip(),
-            'geometry': geometry_output
+            'name': (backend.get_window_name(window_id) or '').strip(),
+            'geometry': backend.get_window_geometry(window_id)
         }
     except:
         return None
 
-def find_cursor_ai_chat_panel():
+def find_cursor_ai_chat_panel(window=None):
+    """Locates the AI chat input from one capture of `window` (a registry
+    record) or, by default, the active window.
+
+    Never moves the pointer or types; returns None (so callers can fall
+    back to manual selection) if the input cannot be found confidently.
+    """
     log_with_time("🔍 SEARCHING FOR CURSOR AI CHAT PANEL")
-    window_info = get_window_info()
+    if window is not None:
+        window_info = {'id': window['id'], 'name': window['title'], 'geometry': window['geometry']}
+    else:
+        window_info = get_window_info()
     if not window_info:
         log_with_time("❌ Could not get window information")
         return None
-    log_with_time(f"Window: {window_info['name']}")
-    log_with_time(f"Geometry: {window_info['geometry']}")
+    log_with_time("Window: %s", window_info['name'], level=logging.DEBUG)
+    log_with_time("Geometry: %s", window_info['geometry'], level=logging.DEBUG)
     try:
-        geometry_line = [line for line in window_info['geometry'].split('\n') if 'Geometry:' in line][0]
-        geometry_part = geometry_line.split('Geometry: ')[1]
-        size_part, offset_part = geometry_part.split('+', 1)
-        width, height = map(int, size_part.split('x'))
-        if '+' in offset_part:
-            x_offset, y_offset = map(int, offset_part.split('+'))
-        else:
-            parts = offset_part.split('+')
-            if len(parts) == 2:
-                x_offset, y_offset = map(int, parts)
-            else:
-                x_offset, y_offset = 0, 0
-        log_with_time(f"Window bounds: {width}x{height} at ({x_offset}, {y_offset})")
+        geometry = window_info['geometry']
+        width, height = geometry['width'], geometry['height']
+        x_offset, y_offset = geometry['x'], geometry['y']
+        log_with_time("Window bounds: %sx%s at (%s, %s)", width, height, x_offset, y_offset, level=logging.DEBUG)
     except Exception as e:
         log_with_time(f"⚠ Could not parse geometry: {e}")
-        width, height = 1920, 1080
-        x_offset, y_offset = 0, 0
-    potential_chat_areas = [
-        {
-            'name': 'Right Panel (Typical AI Chat)',
-            'x': x_offset + int(width * 0.75),
-            'y': y_offset + int(height * 0.85),
-            'description': 'Right side panel bottom (most common AI chat location)'
-        },
-        {
-            'name': 'Bottom Panel Center',
-            'x': x_offset + int(width * 0.5),
-            'y': y_offset + int(height * 0.9),
-            'description': 'Bottom center panel (alternative AI chat)'
-        },
-        {
-            'name': 'Right Panel Mid',
-            'x': x_offset + int(width * 0.8),
-            'y': y_offset + int(height * 0.7),
-            'description': 'Right panel middle area'
-        },
-        {
-            'name': 'Bottom Right Corner',
-            'x': x_offset + int(width * 0.85),
-            'y': y_offset + int(height * 0.95),
-            'description': 'Bottom right corner input area'
-        }
-    ]
-    log_with_time(f"Testing {len(potential_chat_areas)} potential AI chat locations...")
-    for i, area in enumerate(potential_chat_areas):
-        log_with_time(f"🔍 Test {i+1}: {area['name']} at ({area['x']}, {area['y']})")
-        log_with_time(f"   Purpose: {area['description']}")
-        run_command(f"xdotool mousemove {area['x']} {area['y']}")
-        time.sleep(0.5)
-        mouse_window_id, mouse_window_name = get_window_under_mouse()
-        if mouse_window_name and 'cursor' in mouse_window_name.lower():
-            log_with_time(f"   ✅ Found Cursor area: {mouse_window_name}")
-            if test_if_text_input_area(area['x'], area['y']):
-                log_with_time(f"   ✅ CONFIRMED: Text input area detected!")
-                log_with_time(f"   🎯 AI CHAT PANEL FOUND: {area['name']}")
-                return {
-                    'x': area['x'],
-                    'y': area['y'],
-                    'name': area['name'],
-                    'description': area['description']
-                }
-            else:
-                log_with_time(f"   ⚠ Not a text input area")
-        else:
-            log_with_time(f"   ❌ Not in Cursor window")
-    log_with_time("❌ Could not find Cursor AI chat panel")
-    return None
+        return None
+    if not OPENCV_AVAILABLE:
+        log_with_time("⚠ Screenshot detection needs numpy and opencv-python")
+        return None
+    global _panel_frame
+    config = load_config()
+    start = time.perf_counter()
+    # Only used for this search, so the previous capture's array is reused
+    frame = _panel_frame = capture_region(x_offset, y_offset, width, height, out=_panel_frame)
+    if frame is None:
+        log_with_time("❌ Could not capture the window")
+        return None
+    template_path = config.get('chat_input_template')
+    if template_path and not os.path.isabs(template_path):
+        template_path = os.path.join(os.path.dirname(__file__), '..', template_path)
+    found = locate_chat_input(frame, template=template_path or None)
+    elapsed = time.perf_counter() - start
+    min_confidence = float(config.get('chat_detection_confidence', MIN_CONFIDENCE))
+    if not found or found['confidence'] < min_confidence:
+        confidence = found['confidence'] if found else 0.0
+        log_with_time(f"❌ Could not find Cursor AI chat panel (best confidence {confidence:.2f}, "
+                      f"{elapsed * 1000:.0f}ms)")
+        return None
+    log_with_time(f"🎯 AI CHAT PANEL FOUND by {found['method']} in {elapsed * 1000:.0f}ms "
+                  f"(confidence {found['confidence']:.2f})")
+    log_with_time("   Box: %s, scores: %s", found['box'], found.get('scores'), level=logging.DEBUG)
+    return {
+        'x': x_offset + found['x'],
+        'y': y_offset + found['y'],
+        'name': 'Detected chat input',
+        'description': f"Chat input located by {found['method']} detection",
+        'confidence': found['confidence']
+    }
 
 def get_window_under_mouse():
     try:
-        stdout, _, _ = run_command('xdotool getmouselocation --shell')
-        window_id = None
-        for line in stdout.split('\n'):
-            if 'WINDOW=' in line:
-                window_id = line.split('WINDOW=')[1]
-                break
+        _, _, window_id = backend.get_mouse_location()
         if window_id:
-            window_name, _, _ = run_command(f'xdotool getwindowname {window_id}')
+            window_name = backend.get_window_name(window_id) or ''
             return window_id, window_name.strip()
         return None, None
     except:
         return None, None
 
-def test_if_text_input_area(x, y):
-    try:
-        log_with_time(f"   🧪 Testing text input at ({x}, {y})")
-        run_command(f"xdotool mousemove {x} {y}")
-        time.sleep(0.3)
-        run_command("xdotool click 1")
-        time.sleep(0.5)
-        run_command("xdotool type ' '")
-        time.sleep(0.1)
-        run_command("xdotool key BackSpace")
-        time.sleep(0.1)
-        log_with_time(f"   ✅ Text input test completed")
-        return True
-    except Exception as e:
-        log_with_time(f"   ❌ Text input test failed: {e}")
-        return False
-
 def absolute_file_protection_check():
     try:
         window_id, window_name = get_window_under_mouse()
         if not window_name:
             log_with_time("⚠ Cannot identify current window - BLOCKING for safety")
             return True
-        window_name_lower = window_name.lower()
-        file_extensions = ['.py', '.js', '.json', '.md', '.txt', '.cpp', '.c', '.java', '.html', '.css', '.yml', '.yaml', '.xml', '.sql']
-        for ext in file_extensions:
-            if ext in window_name_lower:
-                log_with_time(f"🚫 ABSOLUTE BLOCK: File extension {ext} detected in window: {window_name}")
-                return True
-        editor_keywords = ['visual studio code', 'vim', 'nvim', 'nano', 'gedit', 'kate', 'sublime', 'atom', 'notepad']
-        for keyword in editor_keywords:
-            if keyword in window_name_lower:
-                log_with_time(f"🚫 ABSOLUTE BLOCK: Editor keyword '{keyword}' detected: {window_name}")
-                return True
-        if 'cursor' in window_name_lower and not any(ext in window_name_lower for ext in file_extensions):
+        result = get_config_matcher().classify(window_name)
+        if result['extensions']:
+            log_with_time(f"🚫 ABSOLUTE BLOCK: File extension {result['extensions'][0]} detected in window: {window_name}")
+            return True
+        if result['editor_keywords']:
+            log_with_time(f"🚫 ABSOLUTE BLOCK: Editor keyword '{result['editor_keywords'][0]}' detected: {window_name}")
+            return True
+        if result['targets']:
             log_with_time(f"✅ CURSOR DETECTED WITHOUT FILE INDICATORS: {window_name}")
             return False
         log_with_time(f"🚫 SAFETY BLOCK: Uncertain window type: {window_name}")
@@ -288,7 +214,7 @@ def manual_coordinate_finder():
         else:
             current_x, current_y = get_current_mouse_position()
             log_with_time(f"📍 Current mouse position: ({current_x}, {current_y})")
-            run_command(f"xdotool mousemove {current_x} {current_y}")
+            backend.mouse_move(current_x, current_y)
             time.sleep(0.3)
             if absolute_file_protection_check():
                 log_with_time("❌ UNSAFE LOCATION: This appears to be a code editor area")
@@ -299,12 +225,13 @@ def manual_coordinate_finder():
             if confirm == 'y':
                 log_with_time(f"✅ AI chat coordinates confirmed: ({current_x}, {current_y})")
                 try:
-                    config = load_config()
+                    cache = get_config_cache()
+                    config, etag = cache.get_with_etag()
+                    config = copy.deepcopy(config)
                     config['windows'][0]['coordinates'] = {'x': current_x, 'y': current_y}
-                    config_path = os.path.join(os.path.dirname(__file__), '../src/config.json')
-                    with open(config_path, 'w', encoding='utf-8') as f:
-                        json.dump(config, f, indent=2)
-                    log_with_time("✅ Coordinates saved to config.json")
+                    # Atomic and versioned; refused if the config changed meanwhile
+                    config, _ = cache.write(config, expected_etag=etag)
+                    log_with_time(f"✅ Coordinates saved to config.json (version {config['config_version']})")
                 except Exception as e:
                     log_with_time(f"⚠ Could not save coordinates: {e}")
                 return {
@@ -347,7 +274,7 @@ if __name__ == "__main__":
             log_with_time(f"  {i+1}. {window['title']}")
         target_window = cursor_windows[0]
         log_with_time(f"🎯 TARGET: {target_window['title']}")
-        if not activate_window(target_window):
+        if not activate_window(target_window, float(config.get('activation_timeout', 2.0))):
             log_with_time("❌ Could not activate Cursor window")
             sys.exit(1)
         log_with_time("🔍 Step 1: Find AI chat panel coordinates")
@@ -363,11 +290,10 @@ if __name__ == "__main__":
         log_with_time(f"   Location: {ai_chat_coords['name']}")
         log_with_time(f"   Coordinates: ({ai_chat_coords['x']}, {ai_chat_coords['y']})")
         log_with_time(f"   Description: {ai_chat_coords['description']}")
-        weighted_messages = prepare_weighted_messages(message_config)
-        test_message = random.choice(weighted_messages)
+        test_message = MessageSampler(message_config, seed=config.get('random_seed')).draw()
         log_with_time(f"🧪 TEST MESSAGE: '{test_message[:50]}...'")
         log_with_time("🛡️ Final safety verification...")
-        run_command(f"xdotool mousemove {ai_chat_coords['x']} {ai_chat_coords['y']}")
+        backend.mouse_move(ai_chat_coords['x'], ai_chat_coords['y'])
         time.sleep(0.5)
         if absolute_file_protection_check():
             log_with_time("❌ FINAL SAFETY CHECK FAILED")
@@ -3,17 +3,20 @@
 Enhanced Linux automation script - no hanging, better error handling
 """
 import datetime
-import json
-import os
 import subprocess
 import sys
-import time
-import random
 
-def log_with_time(msg):
-    now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
-    sys.stdout.flush()
+from config_cache import get_config_cache
+from delivery_engine import DeliveryEngine
+from log_pipeline import log_with_time
+from title_matcher import get_config_matcher
+from window_registry import get_registry
+from x11_backend import LazyProxy, get_backend
+from xdotool_sequence import format_report
+
+backend = LazyProxy(get_backend)
+registry = LazyProxy(get_registry)
+engine = DeliveryEngine(backend)
 
 def run_command(cmd, timeout=10):
     try:
@@ -26,22 +29,13 @@ def run_command(cmd, timeout=10):
 
 def get_config():
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '../src/config.json')
-        with open(config_path, encoding='utf-8') as f:
-            config = json.load(f)
-        # Convert old format if needed
-        if 'coordinates' in config and 'windows' not in config:
-            coords = config.get('coordinates', {'x': 100, 'y': 200})
-            config['windows'] = [{
-                'title': 'Default Window',
-                'coordinates': coords,
-                'enabled': True
-            }]
+        config = get_config_cache().get()
         windows = config.get('windows', [])
         messages = config.get('message', ["yes, continue"])
         cycling = config.get('cycling', 'round_robin')
         window_cycling = config.get('window_cycling', 'round_robin')
         fallback_to_coordinates = config.get('fallback_to_coordinates', True)
+        engine.activation_timeout = float(config.get('activation_timeout', 2.0))
         return windows, messages, cycling, window_cycling, fallback_to_coordinates
     except Exception as e:
         log_with_time(f"Config error: {e}")
@@ -53,82 +47,47 @@ def get_config():
         }
         return [default_window], ["test message"], 'round_robin', 'round_robin', True
 
-def find_window_by_title(title):
+def find_windows_by_title():
+    """Resolves all configured titles to windows in one pass over the window table."""
+    return get_config_matcher().match_windows(registry.windows())
+
+def find_window_by_title(title, resolved=None):
+    """Looks `title` up in `resolved` (from find_windows_by_title), resolving all titles if not given."""
     log_with_time(f"Searching for window: {title}")
-    stdout, stderr, returncode = run_command("wmctrl -l")
-    if returncode != 0:
-        log_with_time(f"wmctrl failed: {stderr}")
-        return None
-    for line in stdout.split('\n'):
-        if not line.strip():
-            continue
-        parts = line.split(None, 3)
-        if len(parts) >= 4:
-            window_id, desktop, host, window_title = parts[0], parts[1], parts[2], parts[3]
-            if title.lower() in window_title.lower():
-                log_with_time(f"Found window: {window_id} - {window_title}")
-                return window_id
+    if resolved is None:
+        try:
+            resolved = find_windows_by_title()
+        except ValueError as e:
+            log_with_time(f"Config error: {e}")
+            resolved = {}
+    window = resolved.get(title)
+    if window:
+        log_with_time(f"Found window: {window['id']} - {window['title']}")
+        return window['id']
     log_with_time(f"Window not found: {title}")
     return None
 
-def activate_window(window_id):
-    log_with_time(f"Activating window: {window_id}")
-    stdout, stderr, returncode = run_command(f"wmctrl -ia {window_id}")
-    if returncode == 0:
-        log_with_time("✓ Window activated")
-        time.sleep(0.3)
-        return True
-    else:
-        log_with_time(f"Window activation failed: {stderr}")
-        return False
-
-def activate_window_xdotool(title):
-    log_with_time(f"Trying xdotool activation for: {title}")
+def search_window_xdotool(title):
+    log_with_time(f"Trying xdotool search for: {title}")
     stdout, stderr, returncode = run_command(f'xdotool search --name "{title}" | head -1')
     if returncode != 0 or not stdout:
         log_with_time(f"xdotool search failed: {stderr}")
-        return False
-    window_id = stdout.strip()
-    log_with_time(f"Found window ID: {window_id}")
-    stdout, stderr, returncode = run_command(f'xdotool windowactivate {window_id}')
-    if returncode == 0:
-        log_with_time("✓ Window activated with xdotool")
-        time.sleep(0.3)
-        return True
-    else:
-        log_with_time(f"xdotool activation failed: {stderr}")
-        return False
-
-def click_coordinates(x, y):
-    log_with_time(f"Clicking at coordinates: ({x}, {y})")
-    stdout, stderr, returncode = run_command(f'xdotool mousemove {x} {y}')
-    if returncode != 0:
-        log_with_time(f"Mouse move failed: {stderr}")
-        return False
-    time.sleep(0.1)
-    stdout, stderr, returncode = run_command('xdotool click 1')
-    if returncode != 0:
-        log_with_time(f"Click failed: {stderr}")
-        return False
-    log_with_time("✓ Click successful")
-    return True
+        return None
+    log_with_time(f"Found window ID: {stdout.strip()}")
+    return stdout.strip()
 
-def send_message(message):
+def send_message(message, window_id=None, click_at=None, details=None):
+    """Delivers `message`; the timing report is copied into `details` if given."""
     try:
-        import pyperclip
         now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
         full_message = f"{now} {message}"
         log_with_time(f"Sending message: {message[:50]}...")
-        pyperclip.copy(full_message)
-        time.sleep(0.2)
-        stdout, stderr, returncode = run_command('xdotool key ctrl+v')
-        if returncode != 0:
-            log_with_time(f"Paste failed: {stderr}")
-            return False
-        time.sleep(0.2)
-        stdout, stderr, returncode = run_command('xdotool key Return')
-        if returncode != 0:
-            log_with_time(f"Enter failed: {stderr}")
+        report = engine.deliver(full_message, window_id, click_at)
+        if details is not None:
+            details.update(report)
+        log_with_time(f"Delivery ({report['strategy']}): {format_report(report)}")
+        if not report['ok']:
+            log_with_time(f"Delivery failed: {report['error']}")
             return False
         log_with_time("✓ Message sent successfully")
         return True
@@ -136,23 +95,18 @@ def send_message(message):
         log_with_time(f"Send message failed: {e}")
         return False
 
-def process_window(window, message, fallback_to_coordinates=True):
+def process_window(window, message, fallback_to_coordinates=True, resolved=None):
     title = window.get('title', '')
     coordinates = window.get('coordinates', {})
     log_with_time(f"Processing window: {title}")
-    window_activated = False
+    window_id = None
     if title:
-        window_id = find_window_by_title(title)
-        if window_id:
-            window_activated = activate_window(window_id)
-        if not window_activated:
-            window_activated = activate_window_xdotool(title)
+        window_id = find_window_by_title(title, resolved) or search_window_xdotool(title)
+    click_at = None
     if coordinates and ('x' in coordinates and 'y' in coordinates):
-        if not window_activated and fallback_to_coordinates:
+        if window_id is None and fallback_to_coordinates:
             log_with_time("Using fallback coordinates")
-            x, y = coordinates['x'], coordinates['y']
-            if click_coordinates(x, y):
-                time.sleep(0.3)
+            click_at = coordinates
     # Ensure message is a string before slicing
     if not isinstance(message, str):
         message_str = str(message)
@@ -160,7 +114,7 @@ def process_window(window, message, fallback_to_coordinates=True):
         message_str = message
     log_with_time(f"Message: {message_str[:50]}...")
     log_with_time(f"Fallback to coordinates: {fallback_to_coordinates}")
-    return send_message(message)
+    return send_message(message, window_id, click_at)
 
 if __name__ == "__main__":
     log_with_time("=== ENHANCED LINUX AUTOMATION STARTING ===")
@@ -2,38 +2,33 @@
 Linux-compatible multi-window automation script using xdotool and wmctrl.
 """
 import datetime
-import json
-import logging
 import os
 import platform
 import random
 import subprocess
 import time
-from logging.handlers import RotatingFileHandler
 
 import pyautogui
 import pyperclip
 
+from config_cache import get_config_cache
+from cycling_state import get_cycling_state
+from log_pipeline import log_with_time, setup_logging
+from message_sampler import sampler_for
+from plugin_manager import get_plugin_manager
+
 
 def get_config():
     """Reads configuration including windows and messages."""
     try:
-        with open(os.path.join(os.path.dirname(__file__), '../src/config.json'), encoding='utf-8') as f:
-            config = json.load(f)
-            # Legacy support - convert old format to new format
-            if 'coordinates' in config and 'windows' not in config:
-                coords = config.get('coordinates', {'x': 100, 'y': 200})
-                config['windows'] = [{
-                    'title': 'Default Window',
-                    'coordinates': coords,
-                    'enabled': True
-                }]
-            windows = config.get('windows', [])
-            messages = config.get('message', ["yes, continue"])
-            cycling = config.get('cycling', 'round_robin')
-            window_cycling = config.get('window_cycling', 'round_robin')
-            fallback_to_coordinates = config.get('fallback_to_coordinates', True)
-            return windows, messages, cycling, window_cycling, fallback_to_coordinates
+        # Cached: only re-parsed when src/config.json changes on disk
+        config = get_config_cache().get()
+        windows = config.get('windows', [])
+        messages = config.get('message', ["yes, continue"])
+        cycling = config.get('cycling', 'round_robin')
+        window_cycling = config.get('window_cycling', 'round_robin')
+        fallback_to_coordinates = config.get('fallback_to_coordinates', True)
+        return windows, messages, cycling, window_cycling, fallback_to_coordinates
     except Exception as e:
         print(f"Error reading config: {e}")
         default_window = {'title': 'Default', 'coordinates': {'x': 100, 'y': 200}, 'enabled': True}
@@ -42,58 +37,21 @@ def get_config():
 
 def get_next_window(windows, window_cycling):
     """Get the next window to target."""
-    enabled_windows = [w for w in windows if w.get('enabled', True)]
-    if not enabled_windows:
-        return None
-    idx_file = os.path.join(os.path.dirname(__file__), '../logs/window_index.txt')
-    if window_cycling == 'random':
-        return random.choice(enabled_windows)
-    # Round robin (default)
-    try:
-        if os.path.exists(idx_file):
-            with open(idx_file, 'r') as f:
-                idx = int(f.read().strip())
-        else:
-            idx = 0
-    except Exception:
-        idx = 0
-    window = enabled_windows[idx % len(enabled_windows)]
-    try:
-        with open(idx_file, 'w') as f:
-            f.write(str((idx + 1) % len(enabled_windows)))
-    except Exception as e:
-        print(f"Error writing window index: {e}")
-    return window
+    return get_cycling_state().next_window(windows, window_cycling)
 
 
 def get_next_message(messages, cycling):
     """Get the next message to send."""
-    idx_file = os.path.join(os.path.dirname(__file__), '../logs/message_index.txt')
     if isinstance(messages[0], dict):
         if cycling == 'random':
             return random.choice(messages)['text']
-        elif cycling == 'weighted':
-            weights = [m.get('weight', 1) for m in messages]
-            return random.choices(messages, weights=weights, k=1)[0]['text']
+        elif cycling in ('weighted', 'shuffle_bag'):
+            return sampler_for(messages, cycling, get_config_cache().get().get('random_seed')).draw()
     # Handle both dict and string formats
-    try:
-        if os.path.exists(idx_file):
-            with open(idx_file, 'r') as f:
-                idx = int(f.read().strip())
-        else:
-            idx = 0
-    except Exception:
-        idx = 0
+    idx = get_cycling_state().next_index('message', len(messages))
     if isinstance(messages[0], dict):
-        message = messages[idx % len(messages)]['text']
-    else:
-        message = messages[idx % len(messages)]
-    try:
-        with open(idx_file, 'w') as f:
-            f.write(str((idx + 1) % len(messages)))
-    except Exception as e:
-        print(f"Error writing message index: {e}")
-    return message
+        return messages[idx]['text']
+    return messages[idx]
 
 
 def run_command(cmd):
@@ -163,12 +121,6 @@ def activate_window_linux(window_config, fallback_to_coordinates=True):
     return False
 
 
-def log_with_time(msg):
-    now = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
-    logging.info(f"{now} {msg}")
-
-
 def send_message_to_window(window_config, message, max_retries=3):
     title = window_config.get('title', 'Unknown')
     for attempt in range(max_retries):
@@ -242,8 +194,6 @@ def check_platform_dependencies():
     for tool in required_tools:
         if shutil.which(tool) is None:
             missing.append(f'{tool} (install with: sudo apt-get install {tool})')
-    if shutil.which('scrot') is None:
-        missing.append('scrot (install with: sudo apt-get install scrot)')
     try:
         import tkinter
     except ImportError:
@@ -256,38 +206,18 @@ def check_platform_dependencies():
         exit(1)
 
 
-def run_plugins(message, window_config):
-    import glob
-    import importlib.util
-    import sys
-    plugins_dir = os.path.join(os.path.dirname(__file__), '../plugins')
-    if not os.path.isdir(plugins_dir):
-        return
-    for plugin_path in glob.glob(os.path.join(plugins_dir, '*.py')):
-        plugin_name = os.path.splitext(os.path.basename(plugin_path))[0]
-        spec = importlib.util.spec_from_file_location(plugin_name, plugin_path)
-        if spec is None:
-            continue
-        plugin = importlib.util.module_from_spec(spec)
-        try:
-            sys.modules[plugin_name] = plugin
-            spec.loader.exec_module(plugin)
-            if hasattr(plugin, 'run'):
-                plugin.run(message=message, window=window_config)
-        except Exception as e:
-            print(f"[PLUGIN ERROR] {plugin_name}: {e}")
+def run_plugins(message, window_config, hook='pre_send'):
+    # Plugins are imported once and re-imported only when their file changes;
+    # returns False if a pre-send plugin vetoed the message
+    return get_plugin_manager().run_hooks(hook, message=message, window=window_config,
+                                          coords=window_config.get('coordinates'))
 
 
 if __name__ == "__main__":
     try:
         check_platform_dependencies()
         log_path = os.path.join(os.path.dirname(__file__), '../logs/click_and_type.log')
-        handler = RotatingFileHandler(log_path, maxBytes=1000000, backupCount=3)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s %(levelname)s %(message)s',
-            handlers=[handler]
-        )
+        setup_logging(log_file=log_path)
         windows, messages, cycling, window_cycling, fallback_to_coordinates = get_config()
         if not windows:
             log_with_time("[ERROR] No windows configured")
@@ -301,8 +231,12 @@ if __name__ == "__main__":
             log_with_time(f"[AUTOMATION] Target window: {target_window.get('title', 'Unknown')}")
             log_with_time(f"[AUTOMATION] Message: {message[:50]}...")
             list_available_windows()
-            run_plugins(message, target_window)
+            if not run_plugins(message, target_window):
+                log_with_time("[AUTOMATION] Message vetoed by plugin, skipping.")
+                time.sleep(float(get_config()[0][0].get('waiting_time', 60)))
+                continue
             success = send_message_to_window(target_window, message)
+            run_plugins(message, target_window, hook='post_send')
             if success:
                 log_with_time("[AUTOMATION] Message sent successfully")
             else:
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+In-process owner of the X11 CLIPBOARD selection.
+
+pyperclip forks xclip/xsel for every copy and every read-back. Here the
+process itself owns CLIPBOARD over a persistent X connection and answers
+paste requests (SelectionRequest) from a background thread; ownership is
+confirmed with a GetSelectionOwner round trip instead of reading the text
+back. Falls back to pyperclip when python-xlib or a display is missing.
+
+ICCCM forbids taking a selection at CurrentTime, so each copy first gets a
+real server timestamp from the PropertyNotify of a zero-length property
+append, and uses it both for ownership and to answer TIMESTAMP requests.
+The display connection is shared by the caller and the serving thread,
+so every use of it is made under one lock.
+"""
+import os
+import select
+import threading
+import time
+
+try:
+    from Xlib import X, Xatom, display, error
+    from Xlib.protocol import event as xevent
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+
+class ClipboardOwner:
+    """Serves CLIPBOARD contents from this process."""
+
+    def __init__(self, display_name=None):
+        self._display = display.Display(display_name)
+        screen = self._display.screen()
+        self._window = screen.root.create_window(0, 0, 1, 1, 0, X.CopyFromParent,
+                                                 event_mask=X.PropertyChangeMask)
+        self._atoms = {name: self._display.intern_atom(name) for name in
+                       ('CLIPBOARD', 'TARGETS', 'UTF8_STRING', 'TEXT', 'TIMESTAMP',
+                        '_CLIPBOARD_OWNER_TIME')}
+        # Larger payloads would need the INCR protocol; leave those to pyperclip.
+        self.max_bytes = self._display.info.max_request_length * 4 - 1024
+        self._data = b''
+        self._owned_since = X.CurrentTime
+        # Guards the display connection as well as the data; re-entered by
+        # _reply() while copy() waits for its timestamp.
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name='clipboard-owner', daemon=True)
+        self._thread.start()
+
+    def copy(self, text):
+        """Takes ownership of CLIPBOARD with `text`; returns True once confirmed."""
+        data = text.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return False
+        with self._lock:
+            self._data = data
+            self._owned_since = self._server_time()
+            self._window.set_selection_owner(self._atoms['CLIPBOARD'], self._owned_since)
+            return self.owns_selection()
+
+    def owns_selection(self):
+        with self._lock:
+            owner = self._display.get_selection_owner(self._atoms['CLIPBOARD'])
+            return owner is not None and owner.id == self._window.id
+
+    def _server_time(self):
+        """Returns the current server time, via a zero-length property append.
+
+        Called with the lock held; selection requests that arrive first are
+        answered on the way.
+        """
+        atom = self._atoms['_CLIPBOARD_OWNER_TIME']
+        self._window.change_property(atom, Xatom.STRING, 8, b'', mode=X.PropModeAppend)
+        self._display.flush()
+        while True:
+            event = self._display.next_event()
+            if event.type == X.PropertyNotify and event.window.id == self._window.id and event.atom == atom:
+                return event.time
+            if event.type == X.SelectionRequest:
+                self._reply(event)
+
+    def _reply(self, request):
+        target = request.target
+        prop = request.property if request.property != X.NONE else target
+        data = self._data
+        if request.time != X.CurrentTime and request.time < self._owned_since:
+            # Request predates our ownership (ICCCM 2.2): refuse it.
+            prop = X.NONE
+        elif target == self._atoms['TARGETS']:
+            targets = [self._atoms['TARGETS'], self._atoms['UTF8_STRING'], self._atoms['TEXT'],
+                       Xatom.STRING, self._atoms['TIMESTAMP']]
+            request.requestor.change_property(prop, Xatom.ATOM, 32, targets)
+        elif target == self._atoms['TIMESTAMP']:
+            request.requestor.change_property(prop, Xatom.INTEGER, 32, [self._owned_since])
+        elif target in (self._atoms['UTF8_STRING'], self._atoms['TEXT']):
+            request.requestor.change_property(prop, self._atoms['UTF8_STRING'], 8, data)
+        elif target == Xatom.STRING:
+            latin1 = data.decode('utf-8').encode('latin-1', 'replace')
+            request.requestor.change_property(prop, Xatom.STRING, 8, latin1)
+        else:
+            prop = X.NONE
+        notify = xevent.SelectionNotify(
+            time=request.time,
+            requestor=request.requestor,
+            selection=request.selection,
+            target=target,
+            property=prop,
+        )
+        request.requestor.send_event(notify)
+        self._display.flush()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                select.select([self._display], [], [], 0.5)
+                with self._lock:
+                    for _ in range(self._display.pending_events()):
+                        event = self._display.next_event()
+                        if event.type == X.SelectionRequest:
+                            self._reply(event)
+            except error.ConnectionClosedError:
+                break
+            except error.XError:
+                continue
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        with self._lock:
+            self._display.close()
+
+
+_owner = None
+_owner_lock = threading.Lock()
+
+
+def get_clipboard_owner():
+    """Returns the process-wide owner, or None if X11 is unavailable."""
+    global _owner
+    with _owner_lock:
+        if _owner is None and XLIB_AVAILABLE and os.environ.get('DISPLAY'):
+            try:
+                _owner = ClipboardOwner()
+            except (error.DisplayError, OSError):
+                _owner = None
+        return _owner
+
+
+def _discard_owner(owner):
+    """Drops a broken owner so the next copy reconnects."""
+    global _owner
+    with _owner_lock:
+        if _owner is owner:
+            _owner = None
+    try:
+        owner.close()
+    except (error.ConnectionClosedError, error.XError, OSError):
+        pass
+
+
+def copy_to_clipboard(text, settle=0.1):
+    """Stages `text` on the clipboard and returns True if it was confirmed.
+
+    Uses the in-process owner when possible; otherwise, or if its X
+    connection fails (the owner is then discarded and recreated on the
+    next call), copies with pyperclip, waits `settle` seconds and verifies
+    by reading it back.
+    """
+    owner = get_clipboard_owner()
+    if owner is not None:
+        try:
+            if owner.copy(text):
+                return True
+        except (error.ConnectionClosedError, error.XError, OSError):
+            _discard_owner(owner)
+    import pyperclip
+    pyperclip.copy(text)
+    time.sleep(settle)
+    return pyperclip.paste() == text
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Shared, cached access to src/config.json.
+
+The file is parsed, normalized and validated once and the result is kept
+in memory. Every access costs at most one os.stat() (throttled by
+`check_interval`); the file is re-parsed only when its mtime, size or inode
+changes, and each successful reload bumps `generation` so consumers can
+rebuild anything derived from the config. Every reader of one
+generation gets the same read-only snapshot (dicts and lists that raise
+TypeError on modification), so reads cost no copying and consumers can key
+their own caches on its identity; a caller that wants to modify it takes
+copy.deepcopy(), which returns plain dicts and lists.
+
+Writes (ConfigCache.write) are validated, stamped with an incremented
+`config_version` field and written atomically (temp file + rename), so a
+reader never sees a half-written file. `etag` identifies the current
+contents for HTTP caching and optimistic concurrency.
+"""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'config.json')
+
+
+class ConfigError(ValueError):
+    """Raised when the config file cannot be read or is invalid."""
+
+
+class ConfigConflict(ConfigError):
+    """Raised when a write expected contents that have since changed."""
+
+
+NUMBER = (int, float)
+
+# Optional top-level settings: accepted types and, where restricted, values.
+SETTINGS = {
+    'waiting_time': (NUMBER, None),
+    'cycle_interval': (NUMBER, None),
+    'activation_timeout': (NUMBER, None),
+    'state_flush_interval': (NUMBER, None),
+    'cycling': (str, ('round_robin', 'random', 'weighted', 'shuffle_bag')),
+    'window_cycling': (str, ('round_robin', 'random')),
+    'delivery_mode': (str, ('auto', 'paste', 'inject')),
+    'fallback_to_coordinates': (bool, None),
+    'random_seed': ((int, str, type(None)), None),
+    'config_version': (int, None),
+    'chat_input_template': (str, None),
+    'chat_detection_confidence': (NUMBER, None),
+    'detect_chat_input': (bool, None),
+    'trigger': (str, ('interval', 'idle')),
+    'idle_seconds': (NUMBER, None),
+    'idle_fps': (NUMBER, None),
+    'idle_max_wait': (NUMBER, None),
+}
+
+
+def _is_type(value, types):
+    # bool is an int subclass, but true/false is never a valid number here
+    types = types if isinstance(types, tuple) else (types,)
+    return isinstance(value, types) and (bool in types or not isinstance(value, bool))
+
+
+def _check_coordinates(coordinates, where):
+    if not isinstance(coordinates, dict):
+        raise ConfigError(f'{where}: coordinates must be an object')
+    for axis in ('x', 'y'):
+        if axis in coordinates and not _is_type(coordinates[axis], NUMBER):
+            raise ConfigError(f'{where}: coordinates.{axis} must be a number')
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError('config snapshots are read-only; modify a copy.deepcopy() of it')
+
+
+class FrozenDict(dict):
+    """A dict that cannot be modified; deepcopy() returns a plain dict."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """A list that cannot be modified; deepcopy() returns a plain list."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value):
+    """Returns a read-only version of a parsed JSON value."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def normalize_config(config):
+    """Converts the legacy single-coordinates format to a windows list."""
+    if 'coordinates' in config and 'windows' not in config:
+        config['windows'] = [{
+            'title': 'Default Window',
+            'coordinates': config.get('coordinates', {'x': 100, 'y': 200}),
+            'enabled': True
+        }]
+    return config
+
+
+def validate_config(config):
+    """Raises ConfigError if the config cannot drive the automation."""
+    if not isinstance(config, dict):
+        raise ConfigError('Config must be a JSON object')
+    if not config.get('windows'):
+        raise ConfigError('No windows configured')
+    if not config.get('message'):
+        raise ConfigError('No messages configured')
+    if not isinstance(config['windows'], list):
+        raise ConfigError('windows must be a list')
+    for i, window in enumerate(config['windows']):
+        where = f'windows[{i}]'
+        if not isinstance(window, dict):
+            raise ConfigError(f'{where} must be an object')
+        if not isinstance(window.get('title', ''), str):
+            raise ConfigError(f'{where}: title must be a string')
+        if not isinstance(window.get('enabled', True), bool):
+            raise ConfigError(f'{where}: enabled must be true or false')
+        if not isinstance(window.get('detect_chat_input', False), bool):
+            raise ConfigError(f'{where}: detect_chat_input must be true or false')
+        if 'coordinates' in window:
+            _check_coordinates(window['coordinates'], where)
+        region = window.get('chat_region')
+        if region is not None and not (isinstance(region, list) and len(region) == 4
+                                       and all(_is_type(v, NUMBER) for v in region)):
+            raise ConfigError(f'{where}: chat_region must be [x, y, width, height]')
+    messages = config['message']
+    if not isinstance(messages, (list, str)):
+        raise ConfigError('message must be a list or a string')
+    for i, message in enumerate(messages if isinstance(messages, list) else []):
+        if isinstance(message, dict):
+            if not isinstance(message.get('text'), str):
+                raise ConfigError(f'message[{i}]: text must be a string')
+            weight = message.get('weight', 1)
+            if not _is_type(weight, NUMBER) or weight < 0:
+                raise ConfigError(f'message[{i}]: weight must be a non-negative number')
+        elif not isinstance(message, str):
+            raise ConfigError(f'message[{i}] must be a string or an object with text')
+    for key, (types, choices) in SETTINGS.items():
+        if key not in config:
+            continue
+        if not _is_type(config[key], types):
+            raise ConfigError(f'{key} has the wrong type')
+        if choices and config[key] not in choices:
+            raise ConfigError(f'{key} must be one of {", ".join(choices)}')
+    for key in ('idle_seconds', 'idle_max_wait'):
+        if config.get(key, 0) < 0:
+            raise ConfigError(f'{key} must not be negative')
+    if config.get('idle_fps', 1) <= 0:
+        raise ConfigError('idle_fps must be positive')
+    if not any(w.get('enabled', True) for w in config['windows']):
+        raise ConfigError('No enabled windows found')
+
+
+class ConfigCache:
+    """Parsed config kept in memory and reloaded when the file changes."""
+
+    def __init__(self, path=CONFIG_PATH, check_interval=0.5):
+        self.path = path
+        self.check_interval = check_interval
+        self.generation = 0
+        self.etag = None
+        self.error = None
+        self._config = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _reload(self, signature):
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            config = normalize_config(json.loads(raw))
+            validate_config(config)
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            if self._config is None:
+                raise ConfigError(self.error) from e
+            return
+        self._store(config, signature, raw)
+
+    def _store(self, config, signature, raw):
+        self._config = freeze(config)
+        self._signature = signature
+        self.etag = '"%s"' % hashlib.sha1(raw).hexdigest()[:20]
+        self.generation += 1
+        self.error = None
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if self._config is None or force or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            try:
+                signature = self._stat_signature()
+            except OSError as e:
+                self.error = str(e)
+                if self._config is None:
+                    raise ConfigError(self.error) from e
+                return
+            if signature != self._signature:
+                self._reload(signature)
+
+    def get(self):
+        """Returns the current config, reloading it if the file changed.
+
+        If a reload fails (e.g. the file is mid-write) the last valid config
+        is kept and the problem is recorded in `error`. The result is the
+        shared read-only snapshot of the current generation.
+        """
+        with self._lock:
+            self._refresh()
+            return self._config
+
+    def get_with_etag(self):
+        """Returns (config, etag) for the same snapshot."""
+        with self._lock:
+            self._refresh()
+            return self._config, self.etag
+
+    @property
+    def version(self):
+        """The config_version of the current config (0 if never written here)."""
+        with self._lock:
+            self._refresh()
+            return self._config.get('config_version', 0)
+
+    def write(self, config, expected_etag=None):
+        """Validates and atomically writes `config`; returns (snapshot, etag).
+
+        Raises ConfigConflict if `expected_etag` no longer matches the file,
+        and ConfigError if the new config is invalid.
+        """
+        with self._lock:
+            try:
+                self._refresh(force=True)
+                current = self._config or {}
+            except ConfigError:
+                current = {}
+            if expected_etag is not None and expected_etag != self.etag:
+                raise ConfigConflict('Config was modified by someone else')
+            config = normalize_config(copy.deepcopy(config))
+            validate_config(config)
+            config['config_version'] = int(current.get('config_version', 0)) + 1
+            raw = (json.dumps(config, indent=2, ensure_ascii=False) + '\n').encode('utf-8')
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config.', suffix='.json')
+            try:
+                try:
+                    os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+                except FileNotFoundError:
+                    os.chmod(tmp_path, 0o644)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._store(config, self._stat_signature(), raw)
+            self._last_check = time.monotonic()
+            return self._config, self.etag
+
+    def invalidate(self):
+        """Forces the next get() to re-stat the file."""
+        with self._lock:
+            self._last_check = 0.0
+            self._signature = None
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_config_cache(path=CONFIG_PATH):
+    """Returns the process-wide cache for `path`."""
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ConfigCache(path)
+        return _caches[path]
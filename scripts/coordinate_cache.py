@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Cache of resolved chat-input positions, stored relative to their window.
+
+An entry is keyed by window id and by (window class, width, height), and
+holds the input's offset from the window's top-left corner. Moving a
+window keeps its entry valid (the offset is re-applied to the new origin);
+resizing it changes the layout, so the registry's geometry notification
+drops the entry and the next lookup misses, triggering a new panel search.
+Class/size entries outlive a window and are persisted to
+logs/chat_coordinates.json, so a restarted editor with the same size and
+layout is not searched again.
+"""
+import json
+import os
+import tempfile
+import threading
+
+from x11_backend import parse_window_id
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'chat_coordinates.json')
+
+
+def _layout_key(window):
+    geometry = window['geometry']
+    return f"{window.get('class', '')}:{geometry['width']}x{geometry['height']}"
+
+
+class CoordinateCache:
+    """Window-relative chat-input positions keyed by window and geometry."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._by_window = {}
+        self._by_layout = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, layouts):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.chat_coordinates.')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(layouts, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing coordinate cache: {e}")
+
+    def get(self, window):
+        """Returns absolute {'x', 'y', 'source'} for a registry window record, or None."""
+        geometry = window.get('geometry')
+        if not geometry:
+            return None
+        size = (geometry['width'], geometry['height'])
+        with self._lock:
+            entry = self._by_window.get(parse_window_id(window['id']))
+            if entry is None or entry['size'] != size:
+                entry = self._by_layout.get(_layout_key(window))
+        if entry is None:
+            return None
+        return {'x': geometry['x'] + entry['dx'], 'y': geometry['y'] + entry['dy'], 'source': 'cache'}
+
+    def put(self, window, x, y, confidence=None):
+        """Stores absolute position (x, y) relative to `window`'s current geometry."""
+        geometry = window['geometry']
+        entry = {'dx': x - geometry['x'], 'dy': y - geometry['y'],
+                 'size': (geometry['width'], geometry['height']), 'confidence': confidence}
+        with self._lock:
+            self._by_window[parse_window_id(window['id'])] = entry
+            self._by_layout[_layout_key(window)] = dict(entry, size=list(entry['size']))
+            layouts = dict(self._by_layout)
+        self._save(layouts)
+
+    def invalidate(self, window_id):
+        with self._lock:
+            return self._by_window.pop(parse_window_id(window_id), None) is not None
+
+    def forget(self, window):
+        """Drops every entry for `window`, e.g. after its position proved wrong."""
+        with self._lock:
+            self._by_window.pop(parse_window_id(window['id']), None)
+            removed = self._by_layout.pop(_layout_key(window), None) is not None
+            layouts = dict(self._by_layout)
+        if removed:
+            self._save(layouts)
+
+    def on_window_change(self, window_id, field, old, new):
+        """Registry listener: forgets a window's entry when it is resized or closed."""
+        if field is None:
+            self.invalidate(window_id)
+        elif field == 'geometry' and old and new and (old['width'], old['height']) != (new['width'], new['height']):
+            self.invalidate(window_id)
+
+    def watch(self, registry):
+        registry.add_listener(self.on_window_change)
+        return self
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_coordinate_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CoordinateCache()
+        return _cache
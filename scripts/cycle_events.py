@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Structured per-cycle events.
+
+Every automation cycle produces one JSON object with the window and message
+it targeted, the backend, retries, the outcome and a `durations` map with
+the seconds spent in each stage (discovery, activation, panel, safety,
+paste, enter). Events are appended to logs/cycle_events.jsonl (rotated by
+size) and kept in an in-memory ring buffer, so throughput and latency can
+be computed without scraping the text log.
+"""
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+EVENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'cycle_events.jsonl')
+
+STAGES = ('discovery', 'activation', 'panel', 'safety', 'paste', 'enter')
+
+
+class CycleEvent:
+    """Collects the fields and stage timings of one cycle."""
+
+    def __init__(self, cycle, **fields):
+        self._start = time.perf_counter()
+        self.data = {'type': 'cycle', 'cycle': cycle, 'ts': time.time(), 'window_id': None,
+                     'window_title': None, 'message_id': None, 'backend': None, 'strategy': None,
+                     'retries': 0, 'safety_blocked': False, 'ok': False, 'error': None, 'durations': {}}
+        self.data.update(fields)
+
+    def update(self, **fields):
+        self.data.update(fields)
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block as stage `name` (accumulates on repeats)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            durations = self.data['durations']
+            durations[name] = durations.get(name, 0.0) + time.perf_counter() - start
+
+    def record_delivery(self, report):
+        """Derives paste and enter timings from a delivery timing report."""
+        steps = report.get('steps', [])
+        total = report.get('total') or 0.0
+        for i, step in enumerate(steps):
+            stage = None
+            if step['name'] in ('key', 'type') and i + 1 < len(steps):
+                stage = 'paste'
+            elif step['name'] == 'key':
+                stage = 'enter'
+            if stage is None:
+                continue
+            duration = step.get('duration')
+            if duration is None:
+                end = steps[i + 1]['offset'] if i + 1 < len(steps) else total
+                duration = max(0.0, end - step['offset'])
+            if stage == 'paste':
+                duration += report.get('staging', 0.0)
+            self.data['durations'][stage] = duration
+        self.data['strategy'] = report.get('strategy')
+        if report.get('backend'):
+            self.data['backend'] = report['backend']
+
+    def finish(self, ok, error=None):
+        self.data['ok'] = bool(ok)
+        if error is not None:
+            self.data['error'] = str(error)
+        self.data['total'] = time.perf_counter() - self._start
+        return self.data
+
+
+class EventLog:
+    """Rotating JSONL file plus an in-memory ring buffer of recent events."""
+
+    def __init__(self, path=EVENTS_PATH, ring_size=1000, max_bytes=5000000, backup_count=3):
+        self.path = path
+        self._ring = collections.deque(maxlen=ring_size)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._handler = None
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+
+    def _file_handler(self):
+        if self._handler is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._handler = RotatingFileHandler(self.path, maxBytes=self._max_bytes,
+                                                backupCount=self._backup_count, encoding='utf-8')
+            self._handler.setFormatter(logging.Formatter('%(message)s'))
+        return self._handler
+
+    def emit(self, event):
+        """Stores `event` (a dict), assigning it a sequence number."""
+        with self._lock:
+            self._seq += 1
+            event = dict(event, seq=self._seq)
+            self._ring.append(event)
+            line = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+            try:
+                self._file_handler().handle(logging.makeLogRecord({'msg': line, 'levelno': logging.INFO}))
+            except OSError as e:
+                print(f"Error writing cycle event: {e}")
+        return event
+
+    def recent(self, limit=None, since=0):
+        """Returns buffered events with seq > `since`, oldest first."""
+        with self._lock:
+            events = [event for event in self._ring if event['seq'] > since]
+        return events[-limit:] if limit else events
+
+    def close(self):
+        with self._lock:
+            if self._handler is not None:
+                self._handler.close()
+                self._handler = None
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_event_log():
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+        return _log
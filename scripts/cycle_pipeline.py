@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Two-stage pipeline for multi-window cycles.
+
+Keyboard focus and input must stay serialized, but the work that leads up
+to a delivery (window lookup, message selection, plugins, rendering) does
+not. The pipeline prepares the next job on a background thread while the
+caller waits between deliveries.
+
+Each job is prepared only after the previous one has been delivered, so
+per-job hooks keep their order (pre-send of job N+1 never runs before
+post-send of job N). Because a prepared job may sit through the caller's
+wait, `revalidate(prepared)` is called on the calling thread just before
+delivery to refresh anything that may have gone stale, such as a window
+handle.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CyclePipeline:
+    """Overlaps `prepare(job)` for the next job with the caller's wait."""
+
+    def __init__(self, prepare, deliver, revalidate=None):
+        self.prepare = prepare
+        self.deliver = deliver
+        self.revalidate = revalidate
+
+    def run(self, jobs):
+        """Yields `(prepared, deliver(prepared))` for each job, in order.
+
+        Preparation of the next job starts once the current delivery has
+        returned, so it overlaps with whatever the caller does between
+        iterations (e.g. the waiting time).
+        """
+        jobs = iter(jobs)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='cycle-prepare') as pool:
+            pending = self._submit(pool, jobs)
+            while pending is not None:
+                prepared = pending.result()
+                if self.revalidate is not None:
+                    prepared = self.revalidate(prepared)
+                result = self.deliver(prepared)
+                pending = self._submit(pool, jobs)
+                yield prepared, result
+
+    def _submit(self, pool, jobs):
+        for job in jobs:
+            return pool.submit(self.prepare, job)
+        return None
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+In-memory window/message cycling cursors with batched, atomic persistence.
+
+Cursors live in memory and are written to logs/<name>_index.txt (the same
+files the scripts used before) at most every `flush_interval` seconds and
+at interpreter shutdown. Each write goes to a temp file that is renamed
+over the old one, so a crash can never leave a half-written index.
+"""
+import atexit
+import os
+import random
+import tempfile
+import threading
+import time
+
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs')
+
+
+class CyclingState:
+    """Round-robin cursors shared by the automation scripts."""
+
+    def __init__(self, state_dir=STATE_DIR, flush_interval=5.0):
+        self.state_dir = state_dir
+        self.flush_interval = flush_interval
+        self._cursors = {}
+        self._dirty = set()
+        self._rings = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, f'{name}_index.txt')
+
+    def _load(self, name):
+        try:
+            with open(self._path(name), 'r') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return 0
+
+    def next_index(self, name, length):
+        """Returns the current cursor for `name` modulo `length` and advances it."""
+        with self._lock:
+            if name not in self._cursors:
+                self._cursors[name] = self._load(name)
+            idx = self._cursors[name] % length
+            self._cursors[name] = (idx + 1) % length
+            self._dirty.add(name)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+        return idx
+
+    def enabled_ring(self, windows):
+        """Returns the enabled windows, computed once per windows list."""
+        key = id(windows)
+        with self._lock:
+            cached = self._rings.get(key)
+            if cached is None or cached[0] is not windows:
+                cached = (windows, [w for w in windows if w.get('enabled', True)])
+                self._rings = {key: cached}
+            return cached[1]
+
+    def next_window(self, windows, window_cycling='round_robin'):
+        ring = self.enabled_ring(windows)
+        if not ring:
+            return None
+        if window_cycling == 'random':
+            return random.choice(ring)
+        return ring[self.next_index('window', len(ring))]
+
+    def flush(self):
+        """Atomically writes all changed cursors to disk."""
+        with self._lock:
+            pending = {name: self._cursors[name] for name in self._dirty}
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            for name, value in pending.items():
+                fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, prefix=f'.{name}_index.')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(str(value))
+                    os.replace(tmp_path, self._path(name))
+                except OSError:
+                    os.unlink(tmp_path)
+                    raise
+        except OSError as e:
+            print(f"Error writing cycling state: {e}")
+            with self._lock:
+                self._dirty.update(pending)
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_cycling_state():
+    """Returns the process-wide state, flushed automatically at exit."""
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = CyclingState()
+            atexit.register(_state.flush)
+        return _state
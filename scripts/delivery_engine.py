@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Message delivery with automatic paste/inject strategy selection.
+
+'paste' stages the message on the clipboard and sends ctrl+v; 'inject'
+types it directly through XTEST (Xlib backend only). For each message the
+engine estimates both costs and picks the cheaper one.
+
+Both costs are measured. The paste cost is a moving average of the
+clipboard staging time plus PASTE_SETTLE; the inject cost is a moving
+average of the observed seconds per character of the type step (which
+ends with a round trip, so the server has processed every key) plus
+INJECT_SETTLE. The Return key is queued behind the typed characters, so
+injection needs no settle for the target to catch up. Until injection
+has been measured once, the first eligible message is injected to
+measure it. Injection is only considered for printable ASCII text up to
+INJECT_MAX_CHARS, counted on the full payload (send_message prepends a
+22-character timestamp).
+"""
+import time
+
+from clipboard_owner import copy_to_clipboard
+from xdotool_sequence import delivery_sequence
+
+# Time the target application needs to insert pasted text before Enter.
+PASTE_SETTLE = 0.2
+
+# Pause between typing the text and pressing Enter.
+INJECT_SETTLE = 0.05
+
+# Longer payloads are always pasted, whatever the estimate.
+INJECT_MAX_CHARS = 120
+
+
+class DeliveryEngine:
+    """Chooses and runs a delivery strategy per message."""
+
+    def __init__(self, backend, mode='auto', char_cost=None, paste_cost=0.3, smoothing=0.3,
+                 activation_timeout=2.0, inject_max_chars=INJECT_MAX_CHARS):
+        self.backend = backend
+        self.mode = mode
+        self.activation_timeout = activation_timeout
+        self.char_cost = char_cost
+        self.paste_cost = paste_cost
+        self.smoothing = smoothing
+        self.inject_max_chars = inject_max_chars
+
+    def estimate(self, text):
+        """Returns the estimated seconds for each strategy (inject is None until measured)."""
+        inject = None
+        if self.char_cost is not None:
+            inject = len(text) * self.char_cost + INJECT_SETTLE
+        return {'inject': inject, 'paste': self.paste_cost}
+
+    def choose(self, text):
+        """Returns 'paste' or 'inject' for the full payload `text`."""
+        if self.backend.name != 'xlib' or '\n' in text:
+            return 'paste'
+        if self.mode in ('paste', 'inject'):
+            return self.mode
+        if len(text) > self.inject_max_chars or not (text.isascii() and text.isprintable()):
+            return 'paste'
+        estimate = self.estimate(text)
+        if estimate['inject'] is None:
+            return 'inject'
+        return 'inject' if estimate['inject'] < estimate['paste'] else 'paste'
+
+    def _average(self, current, sample):
+        return (1 - self.smoothing) * current + self.smoothing * sample
+
+    def _observe_inject(self, text, report):
+        typed = next((step for step in report['steps'] if step['name'] == 'type'), None)
+        if not report['ok'] or not text or typed is None or typed['duration'] is None:
+            return
+        sample = typed['duration'] / len(text)
+        self.char_cost = sample if self.char_cost is None else self._average(self.char_cost, sample)
+
+    def deliver(self, text, window_id=None, coordinates=None):
+        """Delivers `text` and returns the sequence timing report."""
+        strategy = self.choose(text)
+        if strategy == 'inject':
+            sequence = delivery_sequence(window_id, coordinates, paste=False, enter=False,
+                                         activation_timeout=self.activation_timeout)
+            report = sequence.type(text).sleep(INJECT_SETTLE).key('Return').run(self.backend)
+            self._observe_inject(text, report)
+        else:
+            start = time.perf_counter()
+            staged = copy_to_clipboard(text)
+            staging = time.perf_counter() - start
+            if staged:
+                report = delivery_sequence(window_id, coordinates,
+                                           activation_timeout=self.activation_timeout).run(self.backend)
+                report['staging'] = staging
+                self.paste_cost = self._average(self.paste_cost, staging + PASTE_SETTLE)
+            else:
+                report = {'backend': self.backend.name, 'processes': 0, 'steps': [], 'total': staging,
+                          'ok': False, 'error': 'clipboard staging could not be confirmed'}
+        report['strategy'] = strategy
+        return report
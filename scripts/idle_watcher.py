@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Idle detection for chat regions.
+
+IdleWatcher samples each watched screen region a few times a second,
+capturing only every `downscale`-th row and column, and compares it with
+the previous sample in NumPy: the region changed if more than `min_changed` of its thumbnail
+pixels moved by more than `pixel_delta` grey levels (a blinking caret
+stays under that). A region that has not changed for `stable_seconds` is
+idle, i.e. the assistant has stopped writing.
+
+A region fires once per burst of activity: after fired() it is disarmed
+until it changes again (the sent message and the reply re-arm it), so a
+quiet window is not sent to over and over. `max_wait` fires a disarmed
+region anyway, in case a send never showed up on screen.
+
+Regions are captured from the root window, so whatever covers one would
+count as its content. A region the caller reports as hidden (None, e.g.
+its window is minimized, on another desktop or under another window) is
+not sampled and never ready; it keeps its last sample, so uncovering it
+unchanged does not re-arm it.
+"""
+import time
+
+from screen_capture import NUMPY_AVAILABLE, capture_region
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+DEFAULT_STABLE_SECONDS = 5.0
+DEFAULT_FPS = 2.0
+DEFAULT_MAX_WAIT = 300.0
+
+
+def chat_region(window, relative=None, chat_input=None):
+    """Screen rectangle (x, y, width, height) to watch for `window`.
+
+    `relative` is an explicit [x, y, width, height] from the window's
+    origin. Otherwise, with a known chat input position, the column of 40%
+    of the window width centred on it; else the whole window.
+    """
+    geometry = window['geometry']
+    if relative:
+        x, y, width, height = relative
+        return geometry['x'] + x, geometry['y'] + y, width, height
+    if chat_input:
+        width = int(geometry['width'] * 0.4)
+        left = min(max(chat_input['x'] - width // 2, geometry['x']), geometry['x'] + geometry['width'] - width)
+        return left, geometry['y'], width, geometry['height']
+    return geometry['x'], geometry['y'], geometry['width'], geometry['height']
+
+
+class IdleWatcher:
+    """Tracks when watched regions stop changing."""
+
+    def __init__(self, stable_seconds=DEFAULT_STABLE_SECONDS, fps=DEFAULT_FPS, downscale=4,
+                 pixel_delta=24, min_changed=0.002, max_wait=DEFAULT_MAX_WAIT, capture=capture_region):
+        self.stable_seconds = stable_seconds
+        self.fps = fps
+        self.downscale = downscale
+        self.pixel_delta = pixel_delta
+        self.min_changed = min_changed
+        self.max_wait = max_wait
+        self.capture = capture
+        self._regions = {}
+
+    def set_regions(self, regions, now=None):
+        """Watches exactly `regions` ({key: (x, y, width, height) or None}).
+
+        New keys start armed; a key whose rectangle changed starts over. A
+        None region is hidden: it is kept but not sampled.
+        """
+        now = time.monotonic() if now is None else now
+        for key in set(self._regions) - set(regions):
+            del self._regions[key]
+        for key, region in regions.items():
+            state = self._regions.get(key)
+            if state is None:
+                self._regions[key] = {'region': region, 'frame': None, 'last': None, 'stable_since': now,
+                                      'armed': True, 'fired_at': None, 'changed': 0.0, 'hidden': region is None}
+            elif region is None:
+                state['hidden'] = True
+            else:
+                if state['region'] != region:
+                    state.update(region=region, last=None, stable_since=now)
+                state['hidden'] = False
+
+    def _thumbnail(self, frame):
+        if frame.ndim == 3:
+            return frame[:, :, :3].mean(axis=2, dtype=np.float32)
+        return frame.astype(np.float32)
+
+    def sample(self, now=None):
+        """Captures every region once and updates its stability."""
+        now = time.monotonic() if now is None else now
+        for state in self._regions.values():
+            if state['hidden']:
+                continue
+            # Each region captures into its previous sample's array
+            frame = state['frame'] = self.capture(*state['region'], out=state['frame'], step=self.downscale)
+            if frame is None or not frame.size:
+                continue
+            thumbnail = self._thumbnail(frame)
+            last = state['last']
+            state['last'] = thumbnail
+            if last is None or last.shape != thumbnail.shape:
+                state['stable_since'] = now
+                continue
+            state['changed'] = float((np.abs(thumbnail - last) > self.pixel_delta).mean())
+            if state['changed'] > self.min_changed:
+                state['stable_since'] = now
+                state['armed'] = True
+
+    def ready(self, now=None):
+        """Keys that are idle and due a send, longest-idle first."""
+        now = time.monotonic() if now is None else now
+        due = []
+        for key, state in self._regions.items():
+            if state['last'] is None or state['hidden']:
+                continue
+            idle = now - state['stable_since']
+            if state['armed'] and idle >= self.stable_seconds:
+                due.append((idle, key))
+            elif not state['armed'] and state['fired_at'] is not None and now - state['fired_at'] >= self.max_wait:
+                due.append((idle, key))
+        return [key for _, key in sorted(due, key=lambda item: item[0], reverse=True)]
+
+    def fired(self, key, now=None):
+        """Disarms `key` until its region changes again."""
+        state = self._regions.get(key)
+        if state is not None:
+            now = time.monotonic() if now is None else now
+            state.update(armed=False, fired_at=now, stable_since=now)
+
+    def wait(self, stop_event, refresh=None, timeout=None):
+        """Samples at `fps` until a region is ready; returns its key.
+
+        `refresh()` is called before each sample and may return new regions
+        for set_regions() (or None to keep the current ones). Returns None
+        if `stop_event` is set or `timeout` seconds pass first.
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError('idle detection requires numpy')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not stop_event.is_set():
+            if refresh is not None:
+                regions = refresh()
+                if regions is not None:
+                    self.set_regions(regions)
+            self.sample()
+            ready = self.ready()
+            if ready:
+                return ready[0]
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            stop_event.wait(1.0 / self.fps)
+        return None
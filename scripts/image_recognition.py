@@ -1,23 +1,270 @@
 """
 Advanced automation: image recognition for UI elements using OpenCV.
+
+TemplateMatcher keeps templates in memory as grayscale arrays (reloaded
+only when the file changes), together with their rescaled and downsampled
+variants. A search runs every scale coarse-to-fine: matchTemplate on a
+pyrDown'd copy of the image proposes candidates, and each is confirmed at
+full resolution in a small window around it. Results are all matches
+above the threshold after non-maximum suppression, plus the call's timing.
+The coarse pass can miss templates whose detail does not survive
+downsampling; find_image_on_screen() therefore retries a miss with a
+full-resolution pass. find_on_screen() feeds the matcher frames from
+screen_capture, with no file I/O.
 """
+import os
+import threading
+import time
+
 import cv2
 import numpy as np
 
+from screen_capture import capture_region, capture_screen
+
+DEFAULT_SCALES = (0.8, 0.9, 1.0, 1.1, 1.25)
+DEFAULT_THRESHOLD = 0.8
+NMS_OVERLAP = 0.3
+
+# The coarse pass runs at 1/2**COARSE_LEVELS resolution when the scaled
+# template stays at least MIN_COARSE_SIDE pixels on its short side there;
+# candidates need threshold - COARSE_SLACK and at most MAX_CANDIDATES are refined.
+COARSE_LEVELS = 1
+MIN_COARSE_SIDE = 12
+COARSE_SLACK = 0.15
+MAX_CANDIDATES = 20
+
+# Screen captures are only searched, never kept, so each thread reuses its
+# previous capture's array.
+_frames = threading.local()
+
+
+def to_gray(image):
+    """Returns a single-channel view/copy of a BGR(A) or grayscale array."""
+    if image.ndim == 2:
+        return image
+    code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(image, code)
+
+
+def _peaks(result, threshold, limit):
+    """Local maxima of a matchTemplate result >= threshold, best first."""
+    dilated = cv2.dilate(result, np.ones((3, 3), np.uint8))
+    ys, xs = np.where((result >= threshold) & (result >= dilated))
+    order = np.argsort(result[ys, xs])[::-1][:limit]
+    return [(int(xs[i]), int(ys[i]), float(result[ys[i], xs[i]])) for i in order]
+
+
+def _overlap(a, b):
+    x0, y0 = max(a['x'], b['x']), max(a['y'], b['y'])
+    x1 = min(a['x'] + a['width'], b['x'] + b['width'])
+    y1 = min(a['y'] + a['height'], b['y'] + b['height'])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a['width'] * a['height'] + b['width'] * b['height'] - inter
+    return inter / float(union) if union else 0.0
+
+
+def non_max_suppression(matches, overlap=NMS_OVERLAP):
+    """Keeps the best-scoring matches whose boxes overlap less than `overlap` (IoU)."""
+    kept = []
+    for match in sorted(matches, key=lambda m: m['score'], reverse=True):
+        if all(_overlap(match, other) < overlap for other in kept):
+            kept.append(match)
+    return kept
+
+
+class TemplateMatcher:
+    """Multi-scale template search over cached grayscale templates."""
+
+    def __init__(self, scales=DEFAULT_SCALES, threshold=DEFAULT_THRESHOLD, overlap=NMS_OVERLAP,
+                 coarse_levels=COARSE_LEVELS):
+        self.scales = tuple(scales)
+        self.threshold = threshold
+        self.overlap = overlap
+        self.coarse_levels = coarse_levels
+        self._templates = {}
+        self._variants = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'total_time': 0.0, 'max_time': 0.0}
+
+    def load(self, path):
+        """Returns the grayscale template at `path`, or None; cached until the file changes."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._templates.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if template is None:
+            return None
+        with self._lock:
+            self._templates[path] = (mtime, template)
+            for key in [key for key in self._variants if key[0] == path]:
+                del self._variants[key]
+        return template
+
+    def _template(self, template):
+        if isinstance(template, str):
+            return template, self.load(template)
+        return None, to_gray(template)
 
-def find_image_on_screen(template_path, screenshot_path):
-    """Finds template image in screenshot and returns coordinates."""
-    template = cv2.imread(template_path, 0)
-    screenshot = cv2.imread(screenshot_path, 0)
-    result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-    if max_val > 0.8:
-        return max_loc  # (x, y)
+    def _variant(self, key, template, scale, level):
+        """The template resized by `scale` and pyrDown'd `level` times (cached for paths)."""
+        cache_key = (key, scale, level) if key is not None else None
+        if cache_key is not None:
+            with self._lock:
+                variant = self._variants.get(cache_key)
+            if variant is not None:
+                return variant
+        variant = template
+        if scale != 1.0:
+            size = (max(1, round(template.shape[1] * scale)), max(1, round(template.shape[0] * scale)))
+            variant = cv2.resize(template, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        for _ in range(level):
+            variant = cv2.pyrDown(variant)
+        if cache_key is not None:
+            with self._lock:
+                self._variants[cache_key] = variant
+        return variant
+
+    def _search_scale(self, image, coarse, key, template, scale, threshold):
+        full = self._variant(key, template, scale, 0)
+        th, tw = full.shape
+        if th > image.shape[0] or tw > image.shape[1]:
+            return []
+        level = self.coarse_levels if coarse is not None else 0
+        if level and min(th, tw) >> level < MIN_COARSE_SIDE:
+            level = 0
+        if not level:
+            result = cv2.matchTemplate(image, full, cv2.TM_CCOEFF_NORMED)
+            return [{'x': x, 'y': y, 'width': tw, 'height': th, 'score': score, 'scale': scale}
+                    for x, y, score in _peaks(result, threshold, MAX_CANDIDATES)]
+        small = self._variant(key, template, scale, level)
+        if small.shape[0] > coarse.shape[0] or small.shape[1] > coarse.shape[1]:
+            return []
+        result = cv2.matchTemplate(coarse, small, cv2.TM_CCOEFF_NORMED)
+        factor, margin = 1 << level, 2 << level
+        matches = []
+        for cx, cy, _ in _peaks(result, threshold - COARSE_SLACK, MAX_CANDIDATES):
+            x0, y0 = max(0, cx * factor - margin), max(0, cy * factor - margin)
+            window = image[y0:y0 + th + 2 * margin, x0:x0 + tw + 2 * margin]
+            if window.shape[0] < th or window.shape[1] < tw:
+                continue
+            _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(window, full, cv2.TM_CCOEFF_NORMED))
+            if score >= threshold:
+                matches.append({'x': x0 + loc[0], 'y': y0 + loc[1], 'width': tw, 'height': th,
+                                'score': float(score), 'scale': scale})
+        return matches
+
+    def find_all(self, image, template, roi=None, threshold=None, scales=None, coarse=True):
+        """Searches `image` for `template` (a path or an array).
+
+        `roi` is an optional (x, y, width, height) restricting the search;
+        with `coarse` False every scale is matched at full resolution only.
+        Returns {'matches', 'elapsed'}: matches are dicts with x, y, width,
+        height (in image coordinates), score and scale, best first, with
+        overlapping boxes suppressed; elapsed is the call's time in seconds.
+        """
+        start = time.perf_counter()
+        threshold = self.threshold if threshold is None else threshold
+        key, template = self._template(template)
+        matches = []
+        if template is not None:
+            ox = oy = 0
+            if roi is not None:
+                x, y, width, height = (int(v) for v in roi)
+                ox, oy = max(0, x), max(0, y)
+                image = image[oy:max(oy, y + height), ox:max(ox, x + width)]
+            if image.size:
+                image = to_gray(image)
+                levels = self.coarse_levels if coarse else 0
+                small = image
+                for _ in range(levels):
+                    small = cv2.pyrDown(small)
+                for scale in scales or self.scales:
+                    matches.extend(self._search_scale(image, small if levels else None,
+                                                      key, template, scale, threshold))
+            matches = non_max_suppression(matches, self.overlap)
+            for match in matches:
+                match['x'] += ox
+                match['y'] += oy
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['total_time'] += elapsed
+            self.stats['max_time'] = max(self.stats['max_time'], elapsed)
+        return {'matches': matches, 'elapsed': elapsed}
+
+    def find(self, image, template, roi=None, threshold=None, scales=None, coarse=True):
+        """Returns the best match (see find_all) or None."""
+        matches = self.find_all(image, template, roi, threshold, scales, coarse)['matches']
+        return matches[0] if matches else None
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_template_matcher():
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = TemplateMatcher()
+        return _matcher
+
+
+def match_template(image, template, threshold=0.8):
+    """Finds `template` in an in-memory image; returns (x, y, score) or None."""
+    match = get_template_matcher().find(image, template, threshold=threshold, scales=(1.0,))
+    if match:
+        return match['x'], match['y'], match['score']
+    return None
+
+
+def find_on_screen(template, region=None, threshold=None, scales=None):
+    """Captures `region` (x, y, width, height; default the whole screen) in
+    memory and returns find_all()'s result in screen coordinates, or None if
+    nothing could be captured."""
+    previous = getattr(_frames, 'frame', None)
+    if region is None:
+        frame, ox, oy = capture_screen(out=previous), 0, 0
+    else:
+        frame = capture_region(*region, out=previous)
+        ox, oy = max(0, int(region[0])), max(0, int(region[1]))
+    if frame is None:
+        return None
+    _frames.frame = frame
+    result = get_template_matcher().find_all(frame, template, threshold=threshold, scales=scales)
+    for match in result['matches']:
+        match['x'] += ox
+        match['y'] += oy
+    return result
+
+
+def find_image_on_screen(template_path, screenshot_path=None):
+    """Finds template image in a screenshot file, or on the live screen if no
+    path is given, and returns coordinates.
+
+    A miss of the coarse-to-fine search is confirmed by a full-resolution
+    pass, so this finds everything a plain matchTemplate would."""
+    if screenshot_path is None:
+        screenshot = _frames.frame = capture_screen(out=getattr(_frames, 'frame', None))
+    else:
+        screenshot = cv2.imread(screenshot_path, 0)
+    if screenshot is None:
+        return None
+    matcher = get_template_matcher()
+    match = (matcher.find(screenshot, template_path, scales=(1.0,))
+             or matcher.find(screenshot, template_path, scales=(1.0,), coarse=False))
+    if match:
+        return match['x'], match['y']
     return None
 
 # Example usage (paths must be updated for real use)
 if __name__ == "__main__":
-    coords = find_image_on_screen('template.png', 'screenshot.png')
+    coords = find_image_on_screen('template.png')
     if coords:
         print(f"Found at: {coords}")
     else:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Minimal RFC 6902 JSON Patch (add, remove, replace, move, copy, test).
+"""
+import copy
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch is malformed or cannot be applied."""
+
+
+def _parse_pointer(pointer):
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _index(container, token, allow_end=False):
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(doc, parts):
+    """Returns (parent, last token) for a pointer split into `parts`."""
+    node = doc
+    for token in parts[:-1]:
+        try:
+            node = node[_index(node, token)] if isinstance(node, list) else node[token]
+        except (KeyError, TypeError):
+            raise JsonPatchError(f"Path not found: /{'/'.join(parts)}")
+    if not isinstance(node, (dict, list)):
+        raise JsonPatchError(f"Path not found: /{'/'.join(parts)}")
+    return node, parts[-1]
+
+
+def _get(doc, parts):
+    if not parts:
+        return doc
+    parent, token = _resolve(doc, parts)
+    try:
+        return parent[_index(parent, token)] if isinstance(parent, list) else parent[token]
+    except KeyError:
+        raise JsonPatchError(f"Path not found: /{'/'.join(parts)}")
+
+
+def _add(doc, parts, value):
+    if not parts:
+        return value
+    parent, token = _resolve(doc, parts)
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    else:
+        parent[token] = value
+    return doc
+
+
+def _remove(doc, parts):
+    if not parts:
+        raise JsonPatchError('Cannot remove the whole document')
+    parent, token = _resolve(doc, parts)
+    try:
+        if isinstance(parent, list):
+            return parent.pop(_index(parent, token))
+        return parent.pop(token)
+    except KeyError:
+        raise JsonPatchError(f"Path not found: /{'/'.join(parts)}")
+
+
+def apply_patch(doc, patch):
+    """Returns a patched copy of `doc`; `doc` itself is never modified."""
+    if not isinstance(patch, list):
+        raise JsonPatchError('A JSON Patch must be a list of operations')
+    doc = copy.deepcopy(doc)
+    for operation in patch:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f"Invalid operation: {operation!r}")
+        op = operation['op']
+        parts = _parse_pointer(operation['path'])
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f"'{op}' requires a value")
+        if op == 'add':
+            doc = _add(doc, parts, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(doc, parts)
+        elif op == 'replace':
+            if parts:
+                _remove(doc, parts)
+            doc = _add(doc, parts, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            if 'from' not in operation:
+                raise JsonPatchError(f"'{op}' requires from")
+            source = _parse_pointer(operation['from'])
+            if op == 'move':
+                if parts[:len(source)] == source and parts != source:
+                    raise JsonPatchError('Cannot move a value into itself')
+                value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_get(doc, source))
+            doc = _add(doc, parts, value)
+        elif op == 'test':
+            if _get(doc, parts) != operation['value']:
+                raise JsonPatchError(f"Test failed at {operation['path']}")
+        else:
+            raise JsonPatchError(f"Unknown operation: {op!r}")
+    return doc
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Shared followers for appended log lines, fanned out to many subscribers.
+
+One FileFollower per file watches it (a cheap os.stat() every
+`poll_interval` seconds while anyone is subscribed), reads each appended
+block once and pushes the complete lines, as (kind, line) pairs, onto every
+subscriber's bounded asyncio queue; one queue can subscribe to several
+followers. A subscriber whose queue is full is dropped instead of
+buffering without limit or slowing down the others; it receives DROPPED
+as its last item. Rotation (new inode or shrunk file) restarts from the
+beginning of the new file.
+"""
+import asyncio
+import os
+
+DROPPED = object()
+
+
+class FileFollower:
+    """Tails `path` on behalf of any number of asyncio subscribers."""
+
+    def __init__(self, path, kind='log', poll_interval=0.25, queue_size=256, chunk_size=65536):
+        self.path = path
+        self.kind = kind
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.subscribers = set()
+        self.dropped = 0
+        self._task = None
+
+    def subscribe(self, queue=None):
+        """Adds `queue` (or a new bounded one) and returns it; starts following if needed."""
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._follow())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def _publish(self, line):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((self.kind, line))
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                self.dropped += 1
+                queue.get_nowait()
+                queue.put_nowait((self.kind, DROPPED))
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_ino, st.st_size
+        except OSError:
+            return None, 0
+
+    def _read(self, position):
+        with open(self.path, 'rb') as f:
+            f.seek(position)
+            return f.read(self.chunk_size)
+
+    async def _follow(self):
+        inode, position = self._stat()
+        partial = b''
+        # Stops by itself once the last subscriber has gone away.
+        while self.subscribers:
+            current_inode, size = self._stat()
+            if current_inode != inode or size < position:
+                inode, position, partial = current_inode, 0, b''
+            if current_inode is not None and size > position:
+                try:
+                    data = await asyncio.to_thread(self._read, position)
+                except OSError:
+                    data = b''
+                position += len(data)
+                lines = (partial + data).split(b'\n')
+                partial = lines.pop()
+                for line in lines:
+                    self._publish(line.decode('utf-8', errors='replace'))
+                if size > position:
+                    continue
+            await asyncio.sleep(self.poll_interval)
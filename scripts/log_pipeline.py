@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Non-blocking logging for the automation scripts.
+
+log_with_time() only puts a LogRecord on an in-memory queue; a background
+QueueListener thread does the formatting and the terminal/file I/O, so a
+slow terminal or disk never stalls input timing. Records are formatted
+lazily (`log_with_time("x=%s", x)` only builds the string if the level is
+enabled), and every destination renders the same single timestamp taken
+when the record was created.
+
+The level defaults to INFO and can be changed with CLICK_AND_YES_LOG_LEVEL.
+"""
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOGGER_NAME = 'click_and_yes'
+LOG_FORMAT = '[%(asctime)s] %(message)s'
+FILE_FORMAT = '[%(asctime)s] %(levelname)s %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Enqueues records untouched; formatting happens on the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+_lock = threading.RLock()
+
+
+def _level_from_env(default=logging.INFO):
+    name = os.environ.get('CLICK_AND_YES_LOG_LEVEL', '').upper()
+    return getattr(logging, name, default) if name else default
+
+
+def setup_logging(log_file=None, level=None, console=True, max_bytes=1000000, backup_count=3):
+    """(Re)configures the queue and its listener; returns the logger.
+
+    `log_file` adds a rotating file destination next to the console one.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        handlers = []
+        if console:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+            handlers.append(stream)
+        if log_file:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                               encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter(FILE_FORMAT, DATE_FORMAT))
+            handlers.append(file_handler)
+        log_queue = queue.SimpleQueue()
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        logger.addHandler(_LazyQueueHandler(log_queue))
+        logger.setLevel(level if level is not None else _level_from_env())
+        logger.propagate = False
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return logger
+
+
+def get_logger():
+    """Returns the shared logger, configured for console output on first use."""
+    with _lock:
+        if _listener is None:
+            setup_logging()
+    return logging.getLogger(LOGGER_NAME)
+
+
+def log_with_time(msg, *args, level=logging.INFO):
+    """Queues `msg % args` at `level`; returns immediately."""
+    logger = get_logger()
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args)
+
+
+def flush_logging():
+    """Drains the queue and stops the listener (call before os._exit)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(flush_logging)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory readers for large log files.
+
+tail_lines() reads backwards from the end of the file in fixed-size blocks
+until it has enough newlines, so its cost depends on the number of lines
+requested, not on the size of the log. iter_byte_range() streams a byte
+range in chunks, and parse_range() interprets an HTTP Range header.
+"""
+import os
+
+BLOCK_SIZE = 8192
+CHUNK_SIZE = 65536
+
+
+def tail_lines(path, count, block_size=BLOCK_SIZE):
+    """Returns the last `count` lines of `path` (newlines kept, like readlines()).
+
+    Lines end at '\n' only; other characters str.splitlines() would break
+    on (e.g. '\r', '\x0c') stay inside the line.
+    """
+    if count <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        blocks = []
+        newlines = 0
+        # One extra newline is needed to know the earliest line is complete.
+        while position > 0 and newlines <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+    parts = b''.join(reversed(blocks)).split(b'\n')
+    lines = [part + b'\n' for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return [line.decode('utf-8', errors='replace') for line in lines[-count:]]
+
+
+def parse_range(header, size):
+    """Parses a single-range `bytes=` header into an inclusive (start, end).
+
+    Returns None if the header is absent or not a byte range we support
+    (the caller then sends the whole file); raises ValueError if the range
+    cannot be satisfied for a file of `size` bytes.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first == '':
+            suffix = int(last)
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if first == '':
+        if suffix <= 0 or size == 0:
+            raise ValueError(f"Range {header!r} not satisfiable for {size} bytes")
+        return max(0, size - suffix), size - 1
+    if start >= size or end < start:
+        raise ValueError(f"Range {header!r} not satisfiable for {size} bytes")
+    return start, min(end, size - 1)
+
+
+def iter_byte_range(path, start, end, chunk_size=CHUNK_SIZE):
+    """Yields bytes start..end (inclusive) of `path` in chunks."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Weighted message sampling without expanding messages by weight.
+
+`MessageSampler` is built once per message list (i.e. once per config
+generation) and stores one entry per distinct message:
+
+- 'weighted': Vose's alias method, O(1) per draw.
+- 'shuffle_bag': every message is drawn exactly `weight` times per bag,
+  in random order, before the bag refills. Fractional weights are scaled
+  up to whole counts with the same ratios (0.5 and 0.7 give a bag of 5
+  and 7), to a precision of 1/100.
+- 'random': uniform choice, ignoring weights.
+
+Pass `seed` for a reproducible sequence of draws.
+"""
+import math
+import random
+import threading
+from fractions import Fraction
+
+
+def message_text(item):
+    return item.get('text', '') if isinstance(item, dict) else str(item)
+
+
+def message_weight(item):
+    return item.get('weight', 1) if isinstance(item, dict) else 1
+
+
+def bag_counts(weights):
+    """Whole counts in the ratio of `weights`; whole weights are kept as they are.
+
+    Positive weights get at least 1.
+    """
+    fractions = [Fraction(w).limit_denominator(100) for w in weights]
+    scale = math.lcm(*(f.denominator for f in fractions))
+    return [max(1, int(f * scale)) if w > 0 else 0 for f, w in zip(fractions, weights)]
+
+
+class MessageSampler:
+    """Draws message texts according to their configured weights."""
+
+    MODES = ('weighted', 'shuffle_bag', 'random')
+
+    def __init__(self, messages, mode='weighted', seed=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown sampling mode: {mode}")
+        self.texts = [message_text(m) for m in messages]
+        self.weights = [max(0, message_weight(m)) for m in messages]
+        if not self.texts or not any(self.weights):
+            raise ValueError('No messages with a positive weight')
+        self.mode = mode
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        if mode == 'weighted':
+            self._build_alias_table()
+        elif mode == 'shuffle_bag':
+            self._counts = bag_counts(self.weights)
+            self._remaining = []
+
+    def _build_alias_table(self):
+        n = len(self.weights)
+        total = float(sum(self.weights))
+        scaled = [w * n / total for w in self.weights]
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def _draw_index(self):
+        if self.mode == 'random':
+            return self._rng.randrange(len(self.texts))
+        if self.mode == 'weighted':
+            i = self._rng.randrange(len(self._prob))
+            return i if self._rng.random() < self._prob[i] else self._alias[i]
+        # Shuffle bag: sample without replacement from the remaining counts.
+        if not any(self._remaining):
+            self._remaining = list(self._counts)
+        r = self._rng.randrange(sum(self._remaining))
+        for i, count in enumerate(self._remaining):
+            if r < count:
+                self._remaining[i] -= 1
+                return i
+            r -= count
+
+    def draw_index(self):
+        """Draws a message and returns its index in the messages list."""
+        with self._lock:
+            return self._draw_index()
+
+    def draw(self):
+        return self.texts[self.draw_index()]
+
+
+_cached = None
+_cached_lock = threading.Lock()
+
+
+def sampler_for(messages, mode='weighted', seed=None):
+    """Returns a sampler for `messages`, rebuilt only when the messages change.
+
+    The config cache hands out one snapshot per config generation, so an
+    unchanged config keeps its sampler (and its shuffle bag) across calls.
+    """
+    global _cached
+    with _cached_lock:
+        if _cached is None or _cached[0] is not messages or _cached[1] != (mode, seed):
+            _cached = (messages, (mode, seed), MessageSampler(messages, mode, seed))
+        return _cached[2]
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency metrics in the Prometheus text exposition format.
+
+The automation daemon keeps a MetricsRegistry in memory and serves its
+rendering on a unix socket (logs/metrics.sock); the API server's /metrics
+endpoint relays it with fetch_metrics(). Nothing is parsed from logs.
+"""
+import os
+import socket
+import threading
+
+METRICS_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'metrics.sock')
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, label_values)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(label_values, {'counts': [0] * len(self.buckets),
+                                                            'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    labels = _labels(self.labels, label_values, [('le', _number(bound))])
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {_number(series["sum"])}')
+                lines.append(f'{self.name}_count{labels} {series["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class CycleMetrics:
+    """The automation's metrics, fed from cycle events (see cycle_events.py)."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.cycles = r.counter('click_and_yes_cycles_total', 'Automation cycles run', ('window',))
+        self.sends = r.counter('click_and_yes_sends_total', 'Messages delivered', ('window',))
+        self.failures = r.counter('click_and_yes_failures_total', 'Cycles that did not deliver', ('window',))
+        self.retries = r.counter('click_and_yes_retries_total', 'Window activation retries', ('window',))
+        self.safety_blocks = r.counter('click_and_yes_safety_blocks_total',
+                                       'Deliveries blocked by the safety check', ('window',))
+        self.activation = r.histogram('click_and_yes_activation_seconds', 'Window activation latency')
+        self.paste = r.histogram('click_and_yes_paste_seconds', 'Clipboard staging plus paste latency')
+        self.cycle_time = r.histogram('click_and_yes_cycle_seconds', 'Full cycle time')
+
+    def observe_cycle(self, event):
+        window = event.get('window_title') or ''
+        self.cycles.inc(window)
+        if event.get('ok'):
+            self.sends.inc(window)
+        else:
+            self.failures.inc(window)
+        if event.get('retries'):
+            self.retries.inc(window, amount=event['retries'])
+        if event.get('safety_blocked'):
+            self.safety_blocks.inc(window)
+        durations = event.get('durations', {})
+        if 'activation' in durations:
+            self.activation.observe(durations['activation'])
+        if 'paste' in durations:
+            self.paste.observe(durations['paste'])
+        if event.get('total') is not None:
+            self.cycle_time.observe(event['total'])
+
+
+class MetricsServer:
+    """Serves registry.render() to every connection on a unix socket."""
+
+    def __init__(self, registry, path=METRICS_SOCKET):
+        self.registry = registry
+        self.path = path
+        self._stop = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(path)
+        self._socket.listen(8)
+        self._socket.settimeout(0.5)
+        self._thread = threading.Thread(target=self._serve, name='metrics-server', daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with conn:
+                try:
+                    conn.sendall(self.registry.render().encode('utf-8'))
+                except OSError:
+                    pass
+
+    def close(self):
+        self._stop.set()
+        self._socket.close()
+        self._thread.join(timeout=2)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def fetch_metrics(path=METRICS_SOCKET, timeout=1.0):
+    """Returns the text served on `path`; raises OSError if nobody is serving."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8')
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Plugin registry for the plugins/ directory.
+
+Each plugin module is imported once and cached together with its `run`
+hook. The directory is re-scanned at most every `check_interval` seconds
+and a plugin is re-imported only when its file's mtime changes, so the cost
+of a cycle no longer grows with the number of plugins.
+
+A plugin may set module-level options:
+
+    HOOK = 'pre_send'   # run before delivery, concurrently; returning False vetoes the send
+    HOOK = 'post_send'  # fire-and-forget after delivery
+    TIMEOUT = 2.0       # seconds the pre-send wait (or an async hook) is allowed
+
+`run` may be a plain function or an `async def` coroutine and is called
+with whichever of `message`, `window` and `coords` it accepts. Hooks run
+on a bounded pool of daemon threads; per-plugin call counts, failures,
+timeouts and latency are kept in `stats`, each call counting towards at
+most one outcome. A pre-send hook still queued when its TIMEOUT expires is
+cancelled; one already running is not interrupted: its late result is
+ignored, and if it never returns it keeps its worker until the process
+exits, but it does not keep the process from exiting (e.g. on SIGTERM).
+"""
+import asyncio
+import concurrent.futures
+import importlib.util
+import inspect
+import os
+import queue
+import sys
+import threading
+import time
+
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'plugins')
+
+HOOKS = ('pre_send', 'post_send')
+DEFAULT_TIMEOUT = 2.0
+HOOK_ARGS = ('message', 'window', 'coords')
+
+
+def _accepted_args(func):
+    """Returns the hook arguments `func` accepts, or None if it takes **kwargs."""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_KEYWORD for p in params):
+        return None
+    return tuple(p.name for p in params if p.name in HOOK_ARGS)
+
+
+class _DaemonPool:
+    """Minimal executor whose workers are daemon threads.
+
+    ThreadPoolExecutor joins its (non-daemon) workers at interpreter exit,
+    so a single hung plugin would block shutdown.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        self._queue.put((future, fn, args))
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'{self.thread_name_prefix}_{len(self._threads)}')
+                self._threads.append(thread)
+                thread.start()
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True):
+        """Stops the workers once queued calls are done; hung calls are not waited for unless `wait`."""
+        with self._lock:
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+class PluginManager:
+    """Loads, caches and hot-reloads plugins."""
+
+    def __init__(self, plugins_dir=PLUGINS_DIR, check_interval=1.0, max_workers=4, max_pending=16):
+        self.plugins_dir = plugins_dir
+        self.check_interval = check_interval
+        self.max_pending = max_pending
+        self.plugins = {}
+        self.stats = {}
+        self._pending = 0
+        self._last_scan = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._executor = _DaemonPool(max_workers, thread_name_prefix='plugin')
+
+    def _load(self, name, path, mtime):
+        start = time.perf_counter()
+        entry = {'path': path, 'mtime': mtime, 'module': None, 'run': None, 'error': None}
+        spec = importlib.util.spec_from_file_location(name, path)
+        if spec is None:
+            entry['error'] = 'not importable'
+        else:
+            module = importlib.util.module_from_spec(spec)
+            try:
+                sys.modules[name] = module
+                spec.loader.exec_module(module)
+                entry['module'] = module
+                entry['run'] = getattr(module, 'run', None)
+                entry['hook'] = getattr(module, 'HOOK', 'pre_send')
+                entry['timeout'] = float(getattr(module, 'TIMEOUT', DEFAULT_TIMEOUT))
+                if entry['hook'] not in HOOKS:
+                    raise ValueError(f"unknown HOOK {entry['hook']!r}")
+                if entry['run'] is not None:
+                    entry['args'] = _accepted_args(entry['run'])
+            except Exception as e:
+                sys.modules.pop(name, None)
+                entry['run'] = None
+                entry['error'] = str(e)
+                print(f"[PLUGIN ERROR] {name}: {e}")
+        entry['load_time'] = time.perf_counter() - start
+        action = 'Reloaded' if name in self.plugins else 'Loaded'
+        print(f"[PLUGIN] {action} {name} in {entry['load_time'] * 1000:.1f}ms")
+        self.plugins[name] = entry
+
+    def refresh(self, force=False):
+        """Imports new or modified plugins and forgets deleted ones."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_scan is not None and now - self._last_scan < self.check_interval:
+                return
+            self._last_scan = now
+            if not os.path.isdir(self.plugins_dir):
+                self.plugins.clear()
+                return
+            seen = set()
+            with os.scandir(self.plugins_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.py') or not entry.is_file():
+                        continue
+                    name = entry.name[:-3]
+                    seen.add(name)
+                    mtime = entry.stat().st_mtime_ns
+                    cached = self.plugins.get(name)
+                    if cached is None or cached['mtime'] != mtime:
+                        self._load(name, entry.path, mtime)
+            for name in set(self.plugins) - seen:
+                del self.plugins[name]
+                sys.modules.pop(name, None)
+
+    def _stats_for(self, name):
+        return self.stats.setdefault(name, {'calls': 0, 'failures': 0, 'timeouts': 0, 'vetoes': 0,
+                                            'total_time': 0.0, 'max_time': 0.0})
+
+    def _record(self, name, duration, outcome, call=None):
+        with self._stats_lock:
+            stats = self._stats_for(name)
+            stats['calls'] += 1
+            stats['total_time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+            if call is not None:
+                call['done'] = True
+                if call['timed_out']:
+                    # pre_send already counted the timeout and ignored the result
+                    return
+            if outcome in ('failures', 'timeouts', 'vetoes'):
+                stats[outcome] += 1
+
+    def _call(self, name, entry, kwargs, call=None):
+        """Runs one hook on a worker thread and records its latency."""
+        args = entry['args']
+        if args is not None:
+            kwargs = {key: value for key, value in kwargs.items() if key in args}
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            result = entry['run'](**kwargs)
+            if inspect.isawaitable(result):
+                result = asyncio.run(asyncio.wait_for(result, entry['timeout']))
+            if result is False:
+                outcome = 'vetoes'
+            return result
+        except asyncio.TimeoutError:
+            outcome = 'timeouts'
+            print(f"[PLUGIN TIMEOUT] {name}: exceeded {entry['timeout']}s")
+        except Exception as e:
+            outcome = 'failures'
+            print(f"[PLUGIN ERROR] {name}: {e}")
+        finally:
+            self._record(name, time.perf_counter() - start, outcome, call)
+
+    def _hooks(self, hook):
+        self.refresh()
+        return [(name, entry) for name, entry in sorted(self.plugins.items())
+                if entry['run'] is not None and entry['hook'] == hook]
+
+    def pre_send(self, **kwargs):
+        """Runs the pre-send hooks concurrently; returns False if any vetoed.
+
+        Each hook is waited on for at most its TIMEOUT, measured from when the
+        batch started. A hook that fails or times out does not block the send;
+        one that has not started by then is cancelled.
+        """
+        start = time.monotonic()
+        futures = []
+        for name, entry in self._hooks('pre_send'):
+            call = {'done': False, 'timed_out': False}
+            futures.append((name, entry, call, self._executor.submit(self._call, name, entry, kwargs, call)))
+        allowed = True
+        for name, entry, call, future in futures:
+            remaining = entry['timeout'] - (time.monotonic() - start)
+            try:
+                result = future.result(timeout=max(0.0, remaining))
+            except concurrent.futures.TimeoutError:
+                with self._stats_lock:
+                    late = not call['done']
+                    if late:
+                        call['timed_out'] = True
+                        self._stats_for(name)['timeouts'] += 1
+                if late:
+                    state = 'cancelled before it started' if future.cancel() else 'still running, not waiting'
+                    print(f"[PLUGIN TIMEOUT] {name}: {state} after {entry['timeout']}s")
+                    continue
+                # It finished (and was counted) just as the wait gave up
+                result = future.result()
+            if result is False:
+                print(f"[PLUGIN] {name} vetoed the send")
+                allowed = False
+        return allowed
+
+    def _finished(self, future):
+        with self._stats_lock:
+            self._pending -= 1
+
+    def post_send(self, **kwargs):
+        """Schedules the post-send hooks without waiting for them."""
+        for name, entry in self._hooks('post_send'):
+            with self._stats_lock:
+                if self._pending >= self.max_pending:
+                    print(f"[PLUGIN] Dropping {name}: {self._pending} post-send hooks still pending")
+                    continue
+                self._pending += 1
+            self._executor.submit(self._call, name, entry, kwargs).add_done_callback(self._finished)
+
+    def run_hooks(self, hook, **kwargs):
+        """Runs the `hook` stage; returns whether delivery may proceed."""
+        if hook == 'pre_send':
+            return self.pre_send(**kwargs)
+        self.post_send(**kwargs)
+        return True
+
+    def load_times(self):
+        """Returns {plugin name: seconds spent importing it}."""
+        return {name: entry['load_time'] for name, entry in self.plugins.items()}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_plugin_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = PluginManager()
+        return _manager
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+In-memory screen capture into reused NumPy buffers.
+
+capture_region() grabs a rectangle of the root window and returns it as an
+(h, w, 4) BGRX array, without writing a file or moving the pointer. Two
+X11 capturers are tried in order:
+
+- ShmCapture uses the MIT-SHM extension through libX11/libXext (ctypes):
+  the X server writes pixels straight into a shared-memory segment that
+  NumPy views directly, so a grab neither copies nor allocates.
+- XlibCapture uses python-xlib's GetImage and copies the reply into a
+  preallocated array.
+
+Buffers are kept per rectangle size and reused by every grab of that size.
+A frame returned by a capturer's grab() is only valid until the next grab
+of the same size, and an MIT-SHM frame must not be touched at all once its
+segment is evicted or the capturer closed (the memory is unmapped). The
+module-level capture_region() and capture_screen() therefore return an
+array the caller owns: grab_into() copies the frame, under the capturer's
+lock, into the caller's `out` array when it has the frame's shape, else
+into a new one. Passing the previous result back as `out` captures
+without allocating. With `step` > 1 only every step-th row and column is
+copied, so a downscaled sample costs no full-size copy. Both capturers accept only the 32bpp little-endian
+BGRX layout they read frames as (see _is_bgrx_layout). Falls back to
+pyautogui's screenshot when no display is usable.
+"""
+import ctypes
+import ctypes.util
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from Xlib import X, display, error
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+# Distinct frame sizes kept alive at once (a window, its chat region, ...).
+MAX_BUFFERS = 4
+
+ZPIXMAP = 2
+ALL_PLANES = 0xFFFFFFFF
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+LSB_FIRST = 0
+
+
+class BufferPool:
+    """Least-recently-used buffers keyed by frame size."""
+
+    def __init__(self, create, release=None, size=MAX_BUFFERS):
+        self._create = create
+        self._release = release
+        self._size = size
+        self._buffers = OrderedDict()
+
+    def get(self, width, height):
+        key = (width, height)
+        if key in self._buffers:
+            self._buffers.move_to_end(key)
+            return self._buffers[key]
+        buffer = self._create(width, height)
+        self._buffers[key] = buffer
+        while len(self._buffers) > self._size:
+            _, old = self._buffers.popitem(last=False)
+            if self._release:
+                self._release(old)
+        return buffer
+
+    def clear(self):
+        while self._buffers:
+            _, old = self._buffers.popitem(last=False)
+            if self._release:
+                self._release(old)
+
+
+def _clip(screen_width, screen_height, x, y, width, height):
+    x0, y0 = max(0, int(x)), max(0, int(y))
+    x1 = min(screen_width, int(x) + int(width))
+    y1 = min(screen_height, int(y) + int(height))
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+
+def _target(out, height, width):
+    """`out` if it can hold a (height, width, 4) frame, else a new array."""
+    if out is not None and out.shape == (height, width, 4) and out.dtype == np.uint8:
+        return out
+    return np.empty((height, width, 4), np.uint8)
+
+
+def _is_bgrx_layout(lsb_first, depth, bits_per_pixel, masks):
+    """True for 32bpp little-endian pixels with red, green and blue in bytes 2, 1, 0."""
+    return (lsb_first and depth in (24, 32) and bits_per_pixel == 32
+            and tuple(masks) == (0xff0000, 0xff00, 0xff))
+
+
+def _is_bgrx(info, screen):
+    """True if ZPixmap images of the root window are 32bpp little-endian BGRX."""
+    formats = [f for f in info.pixmap_formats if f.depth == screen.root_depth]
+    for depth in screen.allowed_depths:
+        for visual in depth.visuals:
+            if visual.visual_id == screen.root_visual and formats:
+                return _is_bgrx_layout(info.image_byte_order == X.LSBFirst, screen.root_depth,
+                                       formats[0].bits_per_pixel,
+                                       (visual.red_mask, visual.green_mask, visual.blue_mask))
+    return False
+
+
+class XlibCapture:
+    """Captures with GetImage on a dedicated display connection.
+
+    Only 32bpp little-endian BGRX root windows are supported; on any other
+    format `supported` is False and grab() returns None.
+    """
+
+    method = 'xlib'
+
+    def __init__(self, display_name=None):
+        self._display = display.Display(display_name)
+        screen = self._display.screen()
+        self._root = screen.root
+        self.width = screen.width_in_pixels
+        self.height = screen.height_in_pixels
+        self.supported = _is_bgrx(self._display.display.info, screen)
+        self._buffers = BufferPool(lambda width, height: np.empty((height, width, 4), np.uint8))
+        self._lock = threading.Lock()
+
+    def grab(self, x, y, width, height):
+        """Returns the rectangle as an (h, w, 4) BGRX array, or None."""
+        return self._grab(x, y, width, height, None, False)
+
+    def grab_into(self, x, y, width, height, out=None, step=1):
+        """Like grab(), but into `out` if it has the frame's shape, else into a new array.
+
+        Only every `step`-th row and column is kept.
+        """
+        return self._grab(x, y, width, height, out, True, step)
+
+    def _grab(self, x, y, width, height, out, owned, step=1):
+        x, y, width, height = _clip(self.width, self.height, x, y, width, height)
+        if not self.supported or not width or not height:
+            return None
+        with self._lock:
+            try:
+                image = self._root.get_image(x, y, width, height, X.ZPixmap, ALL_PLANES)
+            except error.XError:
+                return None
+            if len(image.data) < width * 4 * height:
+                return None
+            rows = np.frombuffer(image.data, dtype=np.uint8).reshape(height, -1)[:, :width * 4]
+            source = rows.reshape(height, width, 4)[::step, ::step]
+            # The reply is already a private copy; an owned frame needs no pool buffer
+            frame = _target(out, *source.shape[:2]) if owned else self._buffers.get(width, height)
+            np.copyto(frame, source)
+        return frame
+
+    def close(self):
+        self._display.close()
+
+
+class _XImage(ctypes.Structure):
+    # Leading fields of Xlib's XImage; only these are read or written.
+    _fields_ = [('width', ctypes.c_int), ('height', ctypes.c_int), ('xoffset', ctypes.c_int),
+                ('format', ctypes.c_int), ('data', ctypes.c_void_p), ('byte_order', ctypes.c_int),
+                ('bitmap_unit', ctypes.c_int), ('bitmap_bit_order', ctypes.c_int),
+                ('bitmap_pad', ctypes.c_int), ('depth', ctypes.c_int),
+                ('bytes_per_line', ctypes.c_int), ('bits_per_pixel', ctypes.c_int)]
+
+
+class _Visual(ctypes.Structure):
+    # Leading fields of Xlib's Visual.
+    _fields_ = [('ext_data', ctypes.c_void_p), ('visualid', ctypes.c_ulong), ('c_class', ctypes.c_int),
+                ('red_mask', ctypes.c_ulong), ('green_mask', ctypes.c_ulong), ('blue_mask', ctypes.c_ulong)]
+
+
+class _ShmSegmentInfo(ctypes.Structure):
+    _fields_ = [('shmseg', ctypes.c_ulong), ('shmid', ctypes.c_int),
+                ('shmaddr', ctypes.c_void_p), ('readOnly', ctypes.c_int)]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+def _load_libraries():
+    paths = [ctypes.util.find_library(name) for name in ('X11', 'Xext', 'c')]
+    if not all(paths):
+        raise OSError('libX11, libXext or libc not found')
+    x11, xext, libc = (ctypes.CDLL(path, use_errno=True) for path in paths)
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+    x11.XDefaultRootWindow.restype = ctypes.c_ulong
+    x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+    x11.XDefaultVisual.restype = ctypes.c_void_p
+    for name in ('XDefaultVisual', 'XDefaultDepth', 'XDisplayWidth', 'XDisplayHeight'):
+        getattr(x11, name).argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XDestroyImage.argtypes = [ctypes.POINTER(_XImage)]
+    x11.XSetErrorHandler.restype = ctypes.c_void_p
+    x11.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+    xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+    xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+    xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                     ctypes.c_void_p, ctypes.POINTER(_ShmSegmentInfo),
+                                     ctypes.c_uint, ctypes.c_uint]
+    xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ShmSegmentInfo)]
+    xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ShmSegmentInfo)]
+    xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+                                  ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+    libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+    libc.shmat.restype = ctypes.c_void_p
+    libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+    libc.shmdt.argtypes = [ctypes.c_void_p]
+    libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+    return x11, xext, libc
+
+
+class ShmCapture:
+    """Captures with XShmGetImage into shared-memory segments viewed by NumPy."""
+
+    method = 'shm'
+
+    def __init__(self, display_name=None):
+        self._x11, self._xext, self._libc = _load_libraries()
+        self._display = self._x11.XOpenDisplay(display_name.encode() if display_name else None)
+        if not self._display:
+            raise OSError('cannot open display')
+        if not self._xext.XShmQueryExtension(self._display):
+            self._x11.XCloseDisplay(self._display)
+            raise OSError('MIT-SHM extension not available')
+        # Xlib's default handler exits the process; a failed attach (e.g. a
+        # remote display) must only disable this capturer.
+        self._x_error = False
+        self._handler = _X_ERROR_HANDLER(self._on_x_error)
+        self._previous_handler = self._x11.XSetErrorHandler(ctypes.cast(self._handler, ctypes.c_void_p))
+        self._buffers = BufferPool(self._create_segment, self._release_segment)
+        self._lock = threading.Lock()
+        try:
+            screen = self._x11.XDefaultScreen(self._display)
+            self._root = self._x11.XDefaultRootWindow(self._display)
+            self._visual = self._x11.XDefaultVisual(self._display, screen)
+            self._depth = self._x11.XDefaultDepth(self._display, screen)
+            visual = ctypes.cast(self._visual, ctypes.POINTER(_Visual)).contents
+            self._masks = (visual.red_mask, visual.green_mask, visual.blue_mask)
+            self.width = self._x11.XDisplayWidth(self._display, screen)
+            self.height = self._x11.XDisplayHeight(self._display, screen)
+            self._buffers.get(1, 1)  # attaches one segment, so an unusable MIT-SHM fails here
+        except BaseException:
+            self._close()
+            raise
+
+    def _on_x_error(self, display_ptr, event):
+        self._x_error = True
+        return 0
+
+    def _create_segment(self, width, height):
+        info = _ShmSegmentInfo()
+        image = self._xext.XShmCreateImage(self._display, self._visual, self._depth, ZPIXMAP,
+                                           None, ctypes.byref(info), width, height)
+        if not image:
+            raise OSError('XShmCreateImage failed')
+        if not _is_bgrx_layout(image.contents.byte_order == LSB_FIRST, self._depth,
+                               image.contents.bits_per_pixel, self._masks):
+            self._x11.XDestroyImage(image)
+            raise OSError('unsupported pixel format')
+        size = image.contents.bytes_per_line * height
+        info.shmid = self._libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+        if info.shmid < 0:
+            self._x11.XDestroyImage(image)
+            raise OSError(ctypes.get_errno(), 'shmget failed')
+        info.shmaddr = self._libc.shmat(info.shmid, None, 0)
+        if info.shmaddr in (None, ctypes.c_void_p(-1).value):
+            self._libc.shmctl(info.shmid, IPC_RMID, None)
+            self._x11.XDestroyImage(image)
+            raise OSError(ctypes.get_errno(), 'shmat failed')
+        image.contents.data = info.shmaddr
+        info.readOnly = 0
+        self._x_error = False
+        self._xext.XShmAttach(self._display, ctypes.byref(info))
+        self._x11.XSync(self._display, 0)
+        # Removed once both sides detach; nothing leaks if the process dies
+        self._libc.shmctl(info.shmid, IPC_RMID, None)
+        segment = {'image': image, 'info': info, 'attached': not self._x_error}
+        if self._x_error:
+            self._release_segment(segment)
+            raise OSError('XShmAttach failed')
+        raw = (ctypes.c_uint8 * size).from_address(info.shmaddr)
+        rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, image.contents.bytes_per_line)
+        segment['frame'] = rows[:, :width * 4].reshape(height, width, 4)
+        return segment
+
+    def _release_segment(self, segment):
+        if segment.get('attached'):
+            self._xext.XShmDetach(self._display, ctypes.byref(segment['info']))
+            self._x11.XSync(self._display, 0)
+        self._libc.shmdt(segment['info'].shmaddr)
+        # XDestroyImage would free() the shared memory as if it were malloc'd
+        segment['image'].contents.data = None
+        self._x11.XDestroyImage(segment['image'])
+
+    def grab(self, x, y, width, height):
+        """Returns the rectangle as an (h, w, 4) BGRX view of shared memory, or None.
+
+        The view is invalid once its segment is evicted (more than
+        MAX_BUFFERS sizes grabbed since) or the capturer is closed.
+        """
+        return self._grab(x, y, width, height, None, False)
+
+    def grab_into(self, x, y, width, height, out=None, step=1):
+        """Like grab(), but copied into `out` if it has the frame's shape, else into a new array.
+
+        Only every `step`-th row and column is copied.
+        """
+        return self._grab(x, y, width, height, out, True, step)
+
+    def _grab(self, x, y, width, height, out, owned, step=1):
+        x, y, width, height = _clip(self.width, self.height, x, y, width, height)
+        if not width or not height:
+            return None
+        with self._lock:
+            try:
+                segment = self._buffers.get(width, height)
+            except OSError:
+                return None
+            if not self._xext.XShmGetImage(self._display, self._root, segment['image'], x, y, ALL_PLANES):
+                return None
+            if not owned:
+                return segment['frame']
+            # Copied before the lock is released, so the segment cannot be evicted meanwhile
+            source = segment['frame'][::step, ::step]
+            frame = _target(out, *source.shape[:2])
+            np.copyto(frame, source)
+        return frame
+
+    def _close(self):
+        """Releases the segments, restores the previous X error handler and closes the display."""
+        self._buffers.clear()
+        self._x11.XSetErrorHandler(self._previous_handler)
+        self._x11.XCloseDisplay(self._display)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def get_capture():
+    """Returns the process-wide capturer (MIT-SHM, else GetImage), or None if unavailable."""
+    global _capture
+    with _capture_lock:
+        if _capture is None and NUMPY_AVAILABLE and os.environ.get('DISPLAY'):
+            try:
+                _capture = ShmCapture()
+            except (OSError, AttributeError):
+                _capture = None
+            if _capture is None and XLIB_AVAILABLE:
+                try:
+                    _capture = XlibCapture()
+                except (error.DisplayError, OSError):
+                    _capture = None
+                if _capture is not None and not _capture.supported:
+                    _capture.close()
+                    _capture = None
+        return _capture
+
+
+def capture_region(x, y, width, height, out=None, step=1):
+    """Returns a BGR(X) array of the screen rectangle, or None if capture failed.
+
+    The array is the caller's own: `out` (e.g. the previous result) if it
+    has the frame's shape, else a new one (see module docstring). With
+    `step` > 1 it holds every `step`-th row and column only.
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    capture = get_capture()
+    if capture is not None:
+        return capture.grab_into(x, y, width, height, out, step)
+    try:
+        import pyautogui
+        screenshot = pyautogui.screenshot(region=(int(x), int(y), int(width), int(height)))
+    except Exception:
+        return None
+    return np.asarray(screenshot)[::step, ::step, ::-1]
+
+
+def capture_screen(out=None, step=1):
+    """Returns a BGR(X) array of the whole screen, or None if capture failed (see capture_region)."""
+    if not NUMPY_AVAILABLE:
+        return None
+    capture = get_capture()
+    if capture is not None:
+        return capture.grab_into(0, 0, capture.width, capture.height, out, step)
+    try:
+        import pyautogui
+        screenshot = pyautogui.screenshot()
+    except Exception:
+        return None
+    return np.asarray(screenshot)[::step, ::step, ::-1]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Single-pass multi-pattern window title matcher.
+
+All configured window titles and safety keywords are compiled once into an
+Aho-Corasick automaton, so classifying a title costs one scan of its
+characters no matter how many targets and safety rules are configured.
+get_config_matcher() returns the matcher for the enabled window titles in
+src/config.json, rebuilt only when the config is reloaded.
+"""
+import functools
+import threading
+
+from config_cache import get_config_cache
+
+FILE_EXTENSIONS = ('.py', '.js', '.json', '.md', '.txt', '.cpp', '.c', '.java', '.html', '.css',
+                   '.yml', '.yaml', '.xml', '.sql')
+EDITOR_KEYWORDS = ('visual studio code', 'vim', 'nvim', 'nano', 'gedit', 'kate', 'sublime', 'atom',
+                   'notepad')
+EXCLUDED_TITLES = ('click-and-yes-cursor',)
+
+
+class TitleMatcher:
+    """Aho-Corasick automaton over lowercased title patterns.
+
+    Patterns are grouped by kind ('targets', 'extensions', 'editor_keywords',
+    'excluded'); `classify` reports every pattern of every kind found in a
+    title, including overlapping ones.
+    """
+
+    def __init__(self, targets=(), extensions=FILE_EXTENSIONS, editor_keywords=EDITOR_KEYWORDS,
+                 excluded=EXCLUDED_TITLES):
+        self.kinds = {
+            'targets': list(targets),
+            'extensions': list(extensions),
+            'editor_keywords': list(editor_keywords),
+            'excluded': list(excluded),
+        }
+        self._patterns = []
+        for kind, patterns in self.kinds.items():
+            for pattern in patterns:
+                if pattern:
+                    self._patterns.append((kind, pattern))
+        self._build()
+
+    def _build(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for index, (_, pattern) in enumerate(self._patterns):
+            node = 0
+            for char in pattern.lower():
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = child
+                node = child
+            self._output[node].append(index)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                state = self._fail[node]
+                while state and char not in self._goto[state]:
+                    state = self._fail[state]
+                self._fail[child] = self._goto[state].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def classify(self, title):
+        """Returns {kind: [patterns found in title]} after a single scan."""
+        found = set()
+        node = 0
+        for char in (title or '').lower():
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            found.update(self._output[node])
+        result = {kind: [] for kind in self.kinds}
+        for index in sorted(found):
+            kind, pattern = self._patterns[index]
+            result[kind].append(pattern)
+        return result
+
+    def match_windows(self, windows):
+        """Maps each target to the first window whose title contains it.
+
+        Each window title is scanned once for all targets; windows whose
+        title contains an excluded pattern are skipped.
+        """
+        matches = {}
+        for window in windows:
+            result = self.classify(window.get('title', ''))
+            if result['excluded']:
+                continue
+            for target in result['targets']:
+                matches.setdefault(target, window)
+        return matches
+
+
+@functools.lru_cache(maxsize=16)
+def build_matcher(targets=()):
+    """Returns a cached matcher for a tuple of target titles."""
+    return TitleMatcher(targets=targets)
+
+
+_config_matcher = None
+_config_generation = None
+_config_matcher_lock = threading.Lock()
+
+
+def get_config_matcher():
+    """Returns the matcher for the configured (enabled) window titles.
+
+    Raises ConfigError if no valid config has been loaded.
+    """
+    global _config_matcher, _config_generation
+    cache = get_config_cache()
+    config = cache.get()
+    with _config_matcher_lock:
+        if _config_matcher is None or _config_generation != cache.generation:
+            titles = tuple(w.get('title', '') for w in config['windows'] if w.get('enabled', True))
+            _config_matcher = build_matcher(titles)
+            _config_generation = cache.generation
+        return _config_matcher
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Resident window registry kept current by X11 property notifications.
+
+The registry subscribes to PropertyNotify on the root window
+(_NET_CLIENT_LIST) and on every client (_NET_WM_NAME, WM_NAME,
+_NET_WM_DESKTOP), plus ConfigureNotify for geometry, and keeps an in-memory
+table of id -> title/class/desktop/geometry. Lookups never touch the X
+server; find_by_title() goes through a title index that is rebuilt only
+after a window appears, disappears or is renamed. Without python-xlib (or
+if the event connection is lost) it falls back to `wmctrl -l -G -x`
+snapshots refreshed at most every `refresh_interval` seconds.
+
+It also follows the current desktop, the stacking order
+(_NET_CURRENT_DESKTOP, _NET_CLIENT_LIST_STACKING on the root window) and
+whether each window is minimized (_NET_WM_STATE_HIDDEN), so is_visible()
+can tell whether a window, or a rectangle of it, is actually on screen.
+
+Listeners registered with add_listener(callback) are called as
+callback(window_id, field, old, new) whenever a known window's field
+changes; a window that disappears is reported with field None.
+"""
+import logging
+import select
+import threading
+import time
+
+from log_pipeline import log_with_time
+from x11_backend import XLIB_AVAILABLE, format_window_id, get_backend, parse_window_id, run_command
+
+if XLIB_AVAILABLE:
+    from Xlib import X, display, error
+
+ROOT_STATE_ATOMS = ('_NET_CURRENT_DESKTOP', '_NET_CLIENT_LIST_STACKING')
+TITLE_ATOMS = ('_NET_WM_NAME', 'WM_NAME')
+
+
+class WindowRegistry:
+    """In-memory table of managed top-level windows."""
+
+    def __init__(self, refresh_interval=2.0):
+        self.refresh_interval = refresh_interval
+        self.mode = None
+        self._windows = {}
+        self._title_index = None
+        self._desktop = None
+        self._stacking = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._display = None
+        self._last_refresh = 0.0
+        self._listeners = []
+
+    def start(self, use_xlib=True):
+        """Loads the initial window table and starts following changes."""
+        if self.mode:
+            return self
+        if use_xlib and XLIB_AVAILABLE:
+            try:
+                self._display = display.Display()
+            except (error.DisplayError, OSError):
+                self._display = None
+        if self._display is not None:
+            self.mode = 'events'
+            self._atoms = {name: self._display.intern_atom(name) for name in
+                           ('_NET_CLIENT_LIST', '_NET_WM_DESKTOP', 'UTF8_STRING', '_NET_WM_STATE',
+                            '_NET_WM_STATE_HIDDEN') + ROOT_STATE_ATOMS + TITLE_ATOMS}
+            self._root = self._display.screen().root
+            self._root.change_attributes(event_mask=X.PropertyChangeMask)
+            self._sync_clients()
+            self._sync_root_state()
+            self._thread = threading.Thread(target=self._event_loop, name='window-registry', daemon=True)
+            self._thread.start()
+        else:
+            self.mode = 'polling'
+            self._refresh_from_wmctrl()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._display is not None:
+            self._display.close()
+            self._display = None
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, window_id, field, old, new):
+        for callback in list(self._listeners):
+            try:
+                callback(window_id, field, old, new)
+            except Exception as e:
+                log_with_time("Window registry listener failed: %s", e, level=logging.WARNING)
+
+    # -- lookups -----------------------------------------------------------
+
+    def _ensure_fresh(self):
+        if self.mode != 'polling':
+            return
+        with self._refresh_lock:
+            if time.monotonic() - self._last_refresh >= self.refresh_interval:
+                self._refresh_from_wmctrl()
+
+    def windows(self):
+        """Returns a snapshot of all windows, ordered by id."""
+        self._ensure_fresh()
+        with self._lock:
+            return [dict(self._windows[window_id]) for window_id in sorted(self._windows)]
+
+    def get(self, window_id):
+        self._ensure_fresh()
+        with self._lock:
+            record = self._windows.get(parse_window_id(window_id))
+            return dict(record) if record else None
+
+    def find_by_title(self, title):
+        """Returns the first window whose title contains `title` (case-insensitive).
+
+        An exact title is a dictionary lookup; otherwise only the distinct
+        titles are scanned, without copying any records.
+        """
+        self._ensure_fresh()
+        needle = title.lower()
+        with self._lock:
+            if self._title_index is None:
+                self._title_index = {}
+                for window_id in sorted(self._windows, reverse=True):
+                    self._title_index[self._windows[window_id]['title'].lower()] = window_id
+            window_id = self._title_index.get(needle)
+            if window_id is None:
+                window_id = min((wid for key, wid in self._title_index.items() if needle in key), default=None)
+            return dict(self._windows[window_id]) if window_id is not None else None
+
+    def is_visible(self, window_id, rect=None):
+        """Whether `window_id` is on screen and nothing covers `rect` of it.
+
+        `rect` is (x, y, width, height) in screen coordinates, by default
+        the window's geometry. A minimized window, one on another desktop
+        and one with a window stacked above it overlapping `rect` are not
+        visible. Unknown desktop or stacking information counts as visible.
+        """
+        self._ensure_fresh()
+        window_id = parse_window_id(window_id)
+        with self._lock:
+            record = self._windows.get(window_id)
+            if record is None or not self._on_screen(record):
+                return False
+            if rect is None:
+                geometry = record['geometry']
+                rect = (geometry['x'], geometry['y'], geometry['width'], geometry['height'])
+            if not self._stacking or window_id not in self._stacking:
+                return True
+            x, y, width, height = rect
+            for above_id in self._stacking[self._stacking.index(window_id) + 1:]:
+                above = self._windows.get(above_id)
+                if above is None or not self._on_screen(above):
+                    continue
+                g = above['geometry']
+                if g['x'] < x + width and x < g['x'] + g['width'] and g['y'] < y + height and y < g['y'] + g['height']:
+                    return False
+            return True
+
+    def _on_screen(self, record):
+        if record.get('hidden'):
+            return False
+        return self._desktop is None or record['desktop'] in ('-1', self._desktop)
+
+    # -- Xlib event mode -----------------------------------------------------
+
+    def _read_record(self, window_id):
+        window = self._display.create_resource_object('window', window_id)
+        window.change_attributes(event_mask=X.PropertyChangeMask | X.StructureNotifyMask)
+        wm_class = window.get_wm_class()
+        record = {
+            'id': format_window_id(window_id),
+            'title': self._read_title(window),
+            'class': wm_class[1] if wm_class else '',
+            'desktop': self._read_desktop(window),
+            'geometry': self._read_geometry(window),
+            'hidden': self._read_hidden(window),
+        }
+        return record
+
+    def _read_title(self, window):
+        prop = window.get_full_property(self._atoms['_NET_WM_NAME'], self._atoms['UTF8_STRING'])
+        if prop is None:
+            prop = window.get_full_property(self._atoms['WM_NAME'], X.AnyPropertyType)
+        if prop is None:
+            return ''
+        value = prop.value
+        return value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
+
+    def _read_desktop(self, window):
+        prop = window.get_full_property(self._atoms['_NET_WM_DESKTOP'], X.AnyPropertyType)
+        if not prop or prop.value[0] == 0xFFFFFFFF:
+            return '-1'
+        return str(prop.value[0])
+
+    def _read_hidden(self, window):
+        prop = window.get_full_property(self._atoms['_NET_WM_STATE'], X.AnyPropertyType)
+        return bool(prop) and self._atoms['_NET_WM_STATE_HIDDEN'] in prop.value
+
+    def _sync_root_state(self):
+        desktop = self._root.get_full_property(self._atoms['_NET_CURRENT_DESKTOP'], X.AnyPropertyType)
+        stacking = self._root.get_full_property(self._atoms['_NET_CLIENT_LIST_STACKING'], X.AnyPropertyType)
+        with self._lock:
+            self._desktop = str(desktop.value[0]) if desktop else None
+            self._stacking = [int(window_id) for window_id in stacking.value] if stacking else None
+
+    def _read_geometry(self, window):
+        geometry = window.get_geometry()
+        origin = self._root.translate_coords(window, 0, 0)
+        return {'x': origin.x, 'y': origin.y, 'width': geometry.width, 'height': geometry.height}
+
+    def _sync_clients(self):
+        prop = self._root.get_full_property(self._atoms['_NET_CLIENT_LIST'], X.AnyPropertyType)
+        client_ids = set(int(window_id) for window_id in prop.value) if prop else set()
+        with self._lock:
+            known = set(self._windows)
+        added = {}
+        for window_id in client_ids - known:
+            try:
+                added[window_id] = self._read_record(window_id)
+            except error.XError:
+                continue
+        with self._lock:
+            removed = [self._windows.pop(window_id) for window_id in known - client_ids
+                       if window_id in self._windows]
+            self._windows.update(added)
+            self._title_index = None
+        for record in removed:
+            self._notify(parse_window_id(record['id']), None, record, None)
+
+    def _update(self, window_id, field, reader):
+        with self._lock:
+            if window_id not in self._windows:
+                return
+        window = self._display.create_resource_object('window', window_id)
+        try:
+            value = reader(window)
+        except error.XError:
+            return
+        with self._lock:
+            if window_id not in self._windows:
+                return
+            old = self._windows[window_id][field]
+            self._windows[window_id][field] = value
+            if field == 'title':
+                self._title_index = None
+        if old != value:
+            self._notify(window_id, field, old, value)
+
+    def _handle_event(self, event):
+        if event.type == X.PropertyNotify:
+            if event.window == self._root:
+                if event.atom == self._atoms['_NET_CLIENT_LIST']:
+                    self._sync_clients()
+                elif event.atom in (self._atoms['_NET_CURRENT_DESKTOP'], self._atoms['_NET_CLIENT_LIST_STACKING']):
+                    self._sync_root_state()
+            elif event.atom in (self._atoms['_NET_WM_NAME'], self._atoms['WM_NAME']):
+                self._update(event.window.id, 'title', self._read_title)
+            elif event.atom == self._atoms['_NET_WM_DESKTOP']:
+                self._update(event.window.id, 'desktop', self._read_desktop)
+            elif event.atom == self._atoms['_NET_WM_STATE']:
+                self._update(event.window.id, 'hidden', self._read_hidden)
+        elif event.type == X.ConfigureNotify:
+            self._update(event.window.id, 'geometry', self._read_geometry)
+        elif event.type == X.DestroyNotify:
+            with self._lock:
+                record = self._windows.pop(event.window.id, None)
+                self._title_index = None
+            if record is not None:
+                self._notify(event.window.id, None, record, None)
+
+    def _event_loop(self):
+        while not self._stop.is_set():
+            try:
+                readable, _, _ = select.select([self._display], [], [], 0.5)
+                if not readable and not self._display.pending_events():
+                    continue
+                for _ in range(self._display.pending_events()):
+                    self._handle_event(self._display.next_event())
+            except error.ConnectionClosedError:
+                log_with_time("Window registry lost its X connection, polling wmctrl instead",
+                              level=logging.WARNING)
+                self.mode = 'polling'
+                self._last_refresh = 0.0
+                break
+            except error.XError:
+                continue
+
+    # -- wmctrl polling mode -------------------------------------------------
+
+    def _refresh_from_wmctrl(self):
+        self._last_refresh = time.monotonic()
+        stdout, _, returncode = run_command("wmctrl -l -G -x")
+        if returncode != 0:
+            return
+        windows = {}
+        for line in stdout.split('\n'):
+            parts = line.split(None, 8)
+            if len(parts) < 8:
+                continue
+            window_id = parse_window_id(parts[0])
+            try:
+                geometry = {'x': int(parts[2]), 'y': int(parts[3]), 'width': int(parts[4]), 'height': int(parts[5])}
+            except ValueError:
+                continue
+            windows[window_id] = {
+                'id': format_window_id(window_id),
+                'title': parts[8] if len(parts) > 8 else '',
+                'class': parts[6].split('.')[-1],
+                'desktop': parts[1],
+                'geometry': geometry,
+                'hidden': False,
+            }
+        desktop, stacking = self._root_state_from_xprop()
+        with self._lock:
+            previous, self._windows = self._windows, windows
+            self._title_index = None
+            self._desktop, self._stacking = desktop, stacking
+        for window_id, old in previous.items():
+            new = windows.get(window_id)
+            if new is None:
+                self._notify(window_id, None, old, None)
+                continue
+            for field in ('title', 'desktop', 'geometry'):
+                if old[field] != new[field]:
+                    self._notify(window_id, field, old[field], new[field])
+
+
+    def _root_state_from_xprop(self):
+        """(current desktop, stacking order) from xprop, None where unavailable."""
+        stdout, _, returncode = run_command("xprop -root _NET_CURRENT_DESKTOP _NET_CLIENT_LIST_STACKING")
+        desktop = stacking = None
+        if returncode != 0:
+            return desktop, stacking
+        for line in stdout.split('\n'):
+            name, _, value = line.partition('=')
+            if name.startswith('_NET_CURRENT_DESKTOP') and value.strip().isdigit():
+                desktop = value.strip()
+            elif name.startswith('_NET_CLIENT_LIST_STACKING'):
+                ids = value.split('#', 1)[-1]
+                stacking = [parse_window_id(window_id) for window_id in ids.split(',') if window_id.strip()]
+        return desktop, stacking
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Returns the process-wide registry, starting it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = WindowRegistry().start(use_xlib=get_backend().name == 'xlib')
+        return _registry
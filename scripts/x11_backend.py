@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""
+Persistent X11 backend for window, pointer and keyboard actions.
+
+Keeps one Xlib display connection open for the lifetime of the process
+instead of forking xdotool/wmctrl for every query and input event. When
+python-xlib or an X display is not available the shell tools are used.
+"""
+import os
+import select
+import subprocess
+import threading
+import time
+
+try:
+    from Xlib import X, XK, display, error, protocol
+    from Xlib.ext import xtest
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+# Time the target gets to translate typed keys before their spare keycode
+# is remapped or reset.
+REMAP_SETTLE = 0.05
+
+MODIFIER_KEYSYMS = {
+    'ctrl': 'Control_L',
+    'control': 'Control_L',
+    'shift': 'Shift_L',
+    'alt': 'Alt_L',
+    'super': 'Super_L',
+    'meta': 'Meta_L',
+}
+
+
+def run_command(cmd, timeout=10):
+    try:
+        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
+        return result.stdout.strip(), result.stderr.strip(), result.returncode
+    except subprocess.TimeoutExpired:
+        return "", f"Command timed out after {timeout}s", 1
+    except Exception as e:
+        return "", str(e), 1
+
+
+def parse_window_id(value):
+    """Normalizes a wmctrl hex id, xdotool decimal id or int to an int."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return int(value, 16) if value.lower().startswith('0x') else int(value)
+    except ValueError:
+        return None
+
+
+def format_window_id(window_id):
+    """Formats a window id the way wmctrl prints it."""
+    return f"0x{window_id:08x}"
+
+
+class ShellBackend:
+    """xdotool/wmctrl backend: one subprocess per action."""
+
+    name = 'shell'
+
+    def list_windows(self):
+        stdout, _, returncode = run_command("wmctrl -l")
+        if returncode != 0:
+            return []
+        windows = []
+        for line in stdout.split('\n'):
+            parts = line.split(None, 3)
+            if len(parts) >= 4:
+                windows.append({'id': parts[0], 'desktop': parts[1], 'title': parts[3]})
+        return windows
+
+    def get_active_window(self):
+        stdout, _, _ = run_command('xdotool getwindowfocus')
+        return parse_window_id(stdout)
+
+    def get_window_name(self, window_id):
+        stdout, _, returncode = run_command(f'xdotool getwindowname {parse_window_id(window_id)}')
+        return stdout if returncode == 0 else None
+
+    def get_window_geometry(self, window_id):
+        stdout, _, returncode = run_command(f'xdotool getwindowgeometry --shell {parse_window_id(window_id)}')
+        if returncode != 0:
+            return None
+        values = {}
+        for line in stdout.split('\n'):
+            if '=' in line:
+                key, value = line.split('=', 1)
+                values[key] = value
+        try:
+            return {
+                'x': int(values['X']),
+                'y': int(values['Y']),
+                'width': int(values['WIDTH']),
+                'height': int(values['HEIGHT']),
+            }
+        except (KeyError, ValueError):
+            return None
+
+    def get_mouse_location(self):
+        stdout, _, _ = run_command('xdotool getmouselocation --shell')
+        values = {}
+        for line in stdout.split('\n'):
+            if '=' in line:
+                key, value = line.split('=', 1)
+                values[key] = value
+        try:
+            return int(values.get('X', 0)), int(values.get('Y', 0)), parse_window_id(values.get('WINDOW'))
+        except ValueError:
+            return 0, 0, None
+
+    def mouse_move(self, x, y):
+        return run_command(f'xdotool mousemove {int(x)} {int(y)}')[2] == 0
+
+    def click(self, button=1):
+        return run_command(f'xdotool click {int(button)}')[2] == 0
+
+    def key(self, combo):
+        return run_command(f'xdotool key {combo}')[2] == 0
+
+    def type_text(self, text):
+        return run_command(f"xdotool type -- {_shell_quote(text)}")[2] == 0
+
+    def activate_window(self, window_id):
+        window_id = parse_window_id(window_id)
+        if window_id is None:
+            return False
+        return run_command(f'wmctrl -ia {format_window_id(window_id)}')[2] == 0
+
+    def activate_window_sync(self, window_id, timeout=2.0):
+        """Activates a window and waits for the focus change.
+
+        Returns the activation latency in seconds, or None on timeout.
+        """
+        window_id = parse_window_id(window_id)
+        if window_id is None:
+            return None
+        start = time.perf_counter()
+        _, _, returncode = run_command(f'xdotool windowactivate --sync {window_id}', timeout=timeout)
+        if returncode != 0:
+            return None
+        return time.perf_counter() - start
+
+    def close(self):
+        pass
+
+
+def char_to_keysym(char):
+    """Maps a character to its X keysym."""
+    if char == '\n':
+        return 0xff0d  # Return
+    if char == '\t':
+        return 0xff09  # Tab
+    codepoint = ord(char)
+    if 0x20 <= codepoint <= 0x7e or 0xa0 <= codepoint <= 0xff:
+        return codepoint
+    return 0x01000000 | codepoint
+
+
+def _shell_quote(text):
+    return "'" + text.replace("'", "'\"'\"'") + "'"
+
+
+class X11Backend:
+    """Xlib backend sharing a single display connection across calls."""
+
+    name = 'xlib'
+
+    def __init__(self, display_name=None):
+        self._display_name = display_name
+        self._display = display.Display(display_name)
+        self._root = self._display.screen().root
+        self._lock = threading.RLock()
+        self._wait_display = None
+        self._wait_lock = threading.Lock()
+        self._atoms = {}
+        self._has_xtest = self._display.query_extension('XTEST') is not None
+        self._keymap = None
+        self._spare_keycodes = []
+
+    def _atom(self, name):
+        atom = self._atoms.get(name)
+        if atom is None:
+            atom = self._atoms[name] = self._display.intern_atom(name)
+        return atom
+
+    def _window(self, window_id):
+        return self._display.create_resource_object('window', parse_window_id(window_id))
+
+    def _property(self, window, name, prop_type=None):
+        prop = window.get_full_property(self._atom(name), prop_type or X.AnyPropertyType)
+        return prop.value if prop else None
+
+    def _window_title(self, window):
+        title = self._property(window, '_NET_WM_NAME', self._atom('UTF8_STRING'))
+        if title is None:
+            title = self._property(window, 'WM_NAME')
+        if isinstance(title, bytes):
+            title = title.decode('utf-8', 'replace')
+        return title
+
+    def _client_window(self, window):
+        """Returns the managed client under a (possibly WM frame) window."""
+        pending = [window]
+        while pending:
+            candidate = pending.pop(0)
+            if candidate.get_full_property(self._atom('WM_STATE'), X.AnyPropertyType):
+                return candidate
+            pending.extend(candidate.query_tree().children)
+        return window
+
+    def list_windows(self):
+        with self._lock:
+            try:
+                client_ids = self._property(self._root, '_NET_CLIENT_LIST') or []
+                windows = []
+                for window_id in client_ids:
+                    window = self._window(window_id)
+                    desktop = self._property(window, '_NET_WM_DESKTOP')
+                    sticky = not desktop or desktop[0] == 0xFFFFFFFF
+                    windows.append({
+                        'id': format_window_id(window_id),
+                        'desktop': '-1' if sticky else str(desktop[0]),
+                        'title': self._window_title(window) or '',
+                    })
+                return windows
+            except error.XError:
+                return []
+
+    def get_active_window(self):
+        with self._lock:
+            try:
+                active = self._property(self._root, '_NET_ACTIVE_WINDOW')
+                if active and active[0]:
+                    return int(active[0])
+                focus = self._display.get_input_focus().focus
+                # PointerRoot and None come back as plain ints, not windows
+                if isinstance(focus, int):
+                    return None
+                return focus.id
+            except error.XError:
+                return None
+
+    def get_window_name(self, window_id):
+        with self._lock:
+            try:
+                return self._window_title(self._window(window_id))
+            except error.XError:
+                return None
+
+    def get_window_geometry(self, window_id):
+        with self._lock:
+            try:
+                window = self._window(window_id)
+                geometry = window.get_geometry()
+                origin = self._root.translate_coords(window, 0, 0)
+                return {'x': origin.x, 'y': origin.y, 'width': geometry.width, 'height': geometry.height}
+            except error.XError:
+                return None
+
+    def get_mouse_location(self):
+        with self._lock:
+            try:
+                pointer = self._root.query_pointer()
+                window_id = None
+                if pointer.child:
+                    window_id = self._client_window(pointer.child).id
+                return pointer.root_x, pointer.root_y, window_id
+            except error.XError:
+                return 0, 0, None
+
+    def mouse_move(self, x, y):
+        with self._lock:
+            try:
+                if self._has_xtest:
+                    xtest.fake_input(self._display, X.MotionNotify, x=int(x), y=int(y))
+                else:
+                    self._root.warp_pointer(int(x), int(y))
+                self._display.sync()
+                return True
+            except error.XError:
+                return False
+
+    def click(self, button=1):
+        with self._lock:
+            if not self._has_xtest:
+                return False
+            try:
+                xtest.fake_input(self._display, X.ButtonPress, int(button))
+                xtest.fake_input(self._display, X.ButtonRelease, int(button))
+                self._display.sync()
+                return True
+            except error.XError:
+                return False
+
+    def _keycode(self, name):
+        keysym = XK.string_to_keysym(MODIFIER_KEYSYMS.get(name.lower(), name))
+        if not keysym and len(name) == 1:
+            keysym = ord(name)
+        return self._display.keysym_to_keycode(keysym) if keysym else 0
+
+    def key(self, combo):
+        """Presses an xdotool-style key combination such as 'ctrl+v'."""
+        with self._lock:
+            if not self._has_xtest:
+                return False
+            try:
+                self._handle_mapping_events()
+                keycodes = [self._keycode(name) for name in combo.split('+')]
+                if not all(keycodes):
+                    return False
+                for keycode in keycodes:
+                    xtest.fake_input(self._display, X.KeyPress, keycode)
+                for keycode in reversed(keycodes):
+                    xtest.fake_input(self._display, X.KeyRelease, keycode)
+                self._display.sync()
+                return True
+            except error.XError:
+                return False
+
+    def _load_keymap(self):
+        """Caches keysym -> (keycode, shift level) and finds the spare keycodes."""
+        first = self._display.display.info.min_keycode
+        count = self._display.display.info.max_keycode - first + 1
+        self._keymap = {}
+        self._spare_keycodes = []
+        for offset, keysyms in enumerate(self._display.get_keyboard_mapping(first, count)):
+            keycode = first + offset
+            for level, keysym in enumerate(keysyms[:2]):
+                if keysym and keysym not in self._keymap:
+                    self._keymap[keysym] = (keycode, level)
+            if not any(keysyms):
+                self._spare_keycodes.append(keycode)
+
+    def _handle_mapping_events(self):
+        """Processes queued MappingNotify events on the shared connection.
+
+        Changes made by another client invalidate the cached keymap; the
+        ones type_text() makes to its spare keycodes do not.
+        """
+        spares = set(self._spare_keycodes)
+        for _ in range(self._display.pending_events()):
+            event = self._display.next_event()
+            if event.type != X.MappingNotify:
+                continue
+            self._display.refresh_keyboard_mapping(event)
+            changed = range(event.first_keycode, event.first_keycode + event.count)
+            if event.request != X.MappingKeyboard or not spares.issuperset(changed):
+                self._keymap = None
+
+    def _tap(self, keycode, shifted=False):
+        shift = self._keycode('shift') if shifted else 0
+        if shift:
+            xtest.fake_input(self._display, X.KeyPress, shift)
+        xtest.fake_input(self._display, X.KeyPress, keycode)
+        xtest.fake_input(self._display, X.KeyRelease, keycode)
+        if shift:
+            xtest.fake_input(self._display, X.KeyRelease, shift)
+
+    def type_text(self, text):
+        """Types text through XTEST using the cached keymap.
+
+        Characters without a keycode (e.g. non-ASCII) are typed by
+        temporarily mapping their keysyms onto the spare keycodes, one
+        keycode per distinct keysym. When a string needs more keysyms than
+        there are spares it is typed in chunks, and before the spares are
+        remapped or reset the target gets REMAP_SETTLE seconds to look up
+        the keys already sent with the old mapping.
+        """
+        with self._lock:
+            if not self._has_xtest:
+                return False
+            try:
+                return self._type_text(text)
+            except error.XError:
+                return False
+
+    def _type_text(self, text):
+        self._handle_mapping_events()
+        if self._keymap is None:
+            self._load_keymap()
+        keysyms = [char_to_keysym(char) for char in text]
+        remapped = set()
+        try:
+            start = 0
+            while start < len(keysyms):
+                assigned = {}
+                end = start
+                for keysym in keysyms[start:]:
+                    if keysym not in self._keymap and keysym not in assigned:
+                        if len(assigned) == len(self._spare_keycodes):
+                            break
+                        assigned[keysym] = self._spare_keycodes[len(assigned)]
+                    end += 1
+                if end == start:
+                    return False
+                if assigned:
+                    if remapped:
+                        self._display.sync()
+                        time.sleep(REMAP_SETTLE)
+                    for keysym, keycode in assigned.items():
+                        self._display.change_keyboard_mapping(keycode, [(keysym, keysym)])
+                        remapped.add(keycode)
+                    self._display.sync()
+                for keysym in keysyms[start:end]:
+                    mapped = self._keymap.get(keysym)
+                    if mapped:
+                        self._tap(mapped[0], shifted=mapped[1] == 1)
+                    else:
+                        self._tap(assigned[keysym])
+                start = end
+            return True
+        finally:
+            self._display.sync()
+            if remapped:
+                time.sleep(REMAP_SETTLE)
+                for keycode in sorted(remapped):
+                    self._display.change_keyboard_mapping(keycode, [(X.NoSymbol, X.NoSymbol)])
+                self._display.sync()
+
+    def _send_root_message(self, window, message_type, data):
+        event = protocol.event.ClientMessage(
+            window=window,
+            client_type=self._atom(message_type),
+            data=(32, data + [0] * (5 - len(data))),
+        )
+        self._root.send_event(event, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+
+    def activate_window(self, window_id):
+        """Switches desktop and requests focus like `wmctrl -ia`."""
+        with self._lock:
+            try:
+                window = self._window(window_id)
+                desktop = self._property(window, '_NET_WM_DESKTOP')
+                if desktop and desktop[0] != 0xFFFFFFFF:
+                    self._send_root_message(self._root, '_NET_CURRENT_DESKTOP', [desktop[0], X.CurrentTime])
+                self._send_root_message(window, '_NET_ACTIVE_WINDOW', [2, X.CurrentTime])
+                self._display.flush()
+                return True
+            except error.XError:
+                return False
+
+    def _wait_connection(self):
+        """Returns the connection used only to wait for focus notifications.
+
+        Waiting there, rather than on the shared connection, means the
+        backend lock is not held while blocked in select().
+        """
+        if self._wait_display is None:
+            self._wait_display = display.Display(self._display_name)
+        return self._wait_display
+
+    def activate_window_sync(self, window_id, timeout=2.0):
+        """Activates a window and waits for _NET_ACTIVE_WINDOW to confirm it.
+
+        Returns the activation latency in seconds, or None if the window
+        manager did not confirm focus before `timeout`.
+        """
+        window_id = parse_window_id(window_id)
+        with self._wait_lock:
+            try:
+                events = self._wait_connection()
+            except (error.DisplayError, OSError):
+                return None
+            root = events.screen().root
+            try:
+                active_atom = events.intern_atom('_NET_ACTIVE_WINDOW')
+                root.change_attributes(event_mask=X.PropertyChangeMask)
+                events.sync()
+                for _ in range(events.pending_events()):
+                    events.next_event()
+                start = time.perf_counter()
+                if not self.activate_window(window_id):
+                    return None
+                deadline = start + timeout
+                while True:
+                    if self.get_active_window() == window_id:
+                        return time.perf_counter() - start
+                    confirmed = False
+                    while not confirmed:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            return None
+                        if not events.pending_events():
+                            select.select([events], [], [], remaining)
+                        for _ in range(events.pending_events()):
+                            event = events.next_event()
+                            if event.type == X.PropertyNotify and event.atom == active_atom:
+                                confirmed = True
+            except error.XError:
+                return None
+            finally:
+                try:
+                    root.change_attributes(event_mask=X.NoEventMask)
+                    events.flush()
+                except error.XError:
+                    pass
+
+    def close(self):
+        with self._wait_lock:
+            if self._wait_display is not None:
+                self._wait_display.close()
+                self._wait_display = None
+        with self._lock:
+            self._display.close()
+
+
+class LazyProxy:
+    """Forwards attribute access to factory()'s result, created on first use.
+
+    Lets modules expose `backend = LazyProxy(get_backend)` without
+    connecting to X when they are imported.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend(preferred=None):
+    """Returns the process-wide backend, connecting to X on first use.
+
+    ``preferred`` (or the CLICK_AND_YES_BACKEND environment variable) may be
+    'xlib', 'shell' or 'auto'.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            preferred = preferred or os.environ.get('CLICK_AND_YES_BACKEND', 'auto')
+            if preferred != 'shell' and XLIB_AVAILABLE and os.environ.get('DISPLAY'):
+                try:
+                    _backend = X11Backend()
+                except (error.DisplayError, OSError):
+                    _backend = None
+            if _backend is None:
+                _backend = ShellBackend()
+        return _backend
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Action sequences for one message delivery.
+
+A sequence (activate, move, click, paste, enter and the delays between them)
+is compiled into a single chained `xdotool` command line, so a delivery costs
+one process instead of one per step. With the in-process Xlib backend the
+same steps run over the shared display connection instead.
+"""
+import subprocess
+import time
+
+from x11_backend import parse_window_id
+
+
+TYPE_TERMINATOR = '--end-of-text--'
+
+
+class ActionSequence:
+    """Builder for a chained xdotool invocation.
+
+    xdotool's `type` consumes every remaining argument unless given
+    `--terminator`, so each `type` step is closed by TYPE_TERMINATOR and the
+    steps after it still run as commands.
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def _add(self, name, *args, delay=0.0):
+        self.steps.append({'name': name, 'args': [str(arg) for arg in args], 'delay': float(delay)})
+        return self
+
+    def activate(self, window_id, timeout=2.0):
+        """Activates the window; the in-process runner waits up to `timeout` for focus."""
+        self._add('windowactivate', '--sync', parse_window_id(window_id))
+        self.steps[-1]['timeout'] = float(timeout)
+        return self
+
+    def mousemove(self, x, y):
+        return self._add('mousemove', int(x), int(y))
+
+    def click(self, button=1):
+        return self._add('click', int(button))
+
+    def key(self, combo):
+        return self._add('key', combo)
+
+    def type(self, text):
+        terminator = TYPE_TERMINATOR
+        while terminator == text:
+            terminator += '-'
+        return self._add('type', '--terminator', terminator, '--', text, terminator)
+
+    def sleep(self, seconds):
+        """Delays the previous step's successor by `seconds`."""
+        if self.steps:
+            self.steps[-1]['delay'] += float(seconds)
+        else:
+            self._add('sleep', delay=seconds)
+        return self
+
+    def to_argv(self):
+        argv = ['xdotool']
+        for step in self.steps:
+            if step['name'] != 'sleep':
+                argv.append(step['name'])
+                argv.extend(step['args'])
+            if step['delay'] > 0:
+                argv.extend(['sleep', f"{step['delay']:g}"])
+        return argv
+
+    def planned_duration(self):
+        return sum(step['delay'] for step in self.steps)
+
+    def run(self, backend=None, timeout=None):
+        """Executes the sequence and returns a per-step timing report."""
+        if backend is not None and backend.name == 'xlib':
+            return self._run_in_process(backend)
+        return self._run_xdotool(timeout)
+
+    def _run_xdotool(self, timeout):
+        timeout = timeout or self.planned_duration() + 10
+        report = {'backend': 'xdotool', 'processes': 1, 'steps': [], 'error': ''}
+        offset = 0.0
+        for step in self.steps:
+            report['steps'].append({'name': step['name'], 'offset': offset, 'duration': None})
+            offset += step['delay']
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(self.to_argv(), capture_output=True, text=True, timeout=timeout)
+            report['ok'] = result.returncode == 0
+            report['error'] = result.stderr.strip()
+        except (OSError, subprocess.TimeoutExpired) as e:
+            report['ok'] = False
+            report['error'] = str(e)
+        report['total'] = time.perf_counter() - start
+        return report
+
+    def _run_in_process(self, backend):
+        actions = {
+            'windowactivate': lambda step: backend.activate_window_sync(
+                int(step['args'][1]), step['timeout']) is not None,
+            'mousemove': lambda step: backend.mouse_move(int(step['args'][0]), int(step['args'][1])),
+            'click': lambda step: backend.click(int(step['args'][0])),
+            'key': lambda step: backend.key(step['args'][0]),
+            'type': lambda step: backend.type_text(step['args'][3]),
+            'sleep': lambda step: True,
+        }
+        report = {'backend': backend.name, 'processes': 0, 'steps': [], 'error': '', 'ok': True}
+        start = time.perf_counter()
+        for step in self.steps:
+            step_start = time.perf_counter()
+            ok = actions[step['name']](step)
+            report['steps'].append({
+                'name': step['name'],
+                'offset': step_start - start,
+                'duration': time.perf_counter() - step_start,
+            })
+            if not ok:
+                report['ok'] = False
+                report['error'] = f"{step['name']} failed"
+                break
+            if step['delay'] > 0:
+                time.sleep(step['delay'])
+        report['total'] = time.perf_counter() - start
+        return report
+
+
+def delivery_sequence(window_id=None, coordinates=None, paste=True, enter=True, activation_timeout=2.0):
+    """Builds the standard activate/move/click/paste/enter delivery."""
+    sequence = ActionSequence()
+    if window_id is not None:
+        sequence.activate(window_id, activation_timeout).sleep(0.3)
+    if coordinates:
+        sequence.mousemove(coordinates['x'], coordinates['y']).sleep(0.1).click(1).sleep(0.3)
+    if paste:
+        sequence.key('ctrl+v').sleep(0.2)
+    if enter:
+        sequence.key('Return')
+    return sequence
+
+
+def format_report(report):
+    """Formats a timing report as a single log line."""
+    steps = ', '.join(
+        f"{step['name']}@{step['offset'] * 1000:.0f}ms"
+        + (f"({step['duration'] * 1000:.1f}ms)" if step['duration'] is not None else '')
+        for step in report['steps']
+    )
+    status = 'ok' if report['ok'] else f"failed: {report['error']}"
+    return (f"{report['backend']} x{report['processes']} process(es), "
+            f"{report['total'] * 1000:.0f}ms total, {status} [{steps}]")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Scripts import their helper modules as siblings (they are run as
+# `python3 scripts/<name>.py`), so make them importable under pytest too.
+sys.path.append(os.path.join(os.path.dirname(__file__), '../scripts'))
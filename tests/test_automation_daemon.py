@@ -0,0 +1,217 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import automation_daemon
+from automation_daemon import AutomationDaemon
+from config_cache import ConfigCache
+from coordinate_cache import CoordinateCache
+from cycle_events import EventLog
+from cycling_state import CyclingState
+
+CONFIG = {
+    'cycle_interval': 10,
+    'message': ['yes', 'continue'],
+    'windows': [
+        {'title': 'Chat A', 'coordinates': {'x': 100, 'y': 200}},
+        {'title': 'Chat B', 'coordinates': {'x': 300, 'y': 400}},
+    ],
+}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeStop:
+    """Stands in for the daemon's stop event; every wait advances the fake clock."""
+
+    def __init__(self, clock, max_waits):
+        self.clock = clock
+        self.max_waits = max_waits
+        self.waits = []
+        self._set = False
+
+    def is_set(self):
+        return self._set
+
+    def set(self):
+        self._set = True
+
+    def wait(self, timeout=None):
+        self.waits.append(round(timeout, 6))
+        self.clock.now += max(0.0, timeout)
+        if len(self.waits) >= self.max_waits:
+            self._set = True
+        return self._set
+
+
+class FakeRegistry:
+
+    def __init__(self):
+        self.records = {
+            '0x00000001': {'id': '0x00000001', 'title': 'Chat A', 'class': 'Code', 'desktop': '0',
+                           'geometry': {'x': 0, 'y': 0, 'width': 800, 'height': 600}},
+            '0x00000002': {'id': '0x00000002', 'title': 'Chat B', 'class': 'Code', 'desktop': '0',
+                           'geometry': {'x': 800, 'y': 0, 'width': 800, 'height': 600}},
+        }
+        self.covered = set()
+
+    def windows(self):
+        return [dict(record) for record in self.records.values()]
+
+    def get(self, window_id):
+        return dict(self.records[window_id])
+
+    def is_visible(self, window_id, rect=None):
+        return window_id not in self.covered
+
+    def add_listener(self, callback):
+        pass
+
+
+class TestAutomationDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmpdir.name, 'config.json')
+        self.write_config(CONFIG)
+        self.clock = FakeClock()
+        self.sent = []
+        self.send_duration = 0.0
+        patches = {
+            'get_config_cache': lambda: ConfigCache(self.config_path, check_interval=0),
+            'get_cycling_state': lambda: CyclingState(self.tmpdir.name, flush_interval=3600),
+            'get_event_log': lambda: EventLog(os.path.join(self.tmpdir.name, 'events.jsonl')),
+            'get_coordinate_cache': lambda: CoordinateCache(os.path.join(self.tmpdir.name, 'coords.json')),
+            'registry': FakeRegistry(),
+            'backend': SimpleNamespace(name='fake', mouse_move=mock.Mock()),
+            'activate_window': mock.Mock(return_value=True),
+            'absolute_file_protection_check': mock.Mock(return_value=False),
+            'find_cursor_ai_chat_panel': mock.Mock(return_value=None),
+            'send_message': self.fake_send,
+            'log_with_time': mock.Mock(),
+            'time': self.clock,
+        }
+        for name, value in patches.items():
+            patcher = mock.patch.object(automation_daemon, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(AutomationDaemon, '_watchdog')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_config(self, config):
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+    def fake_send(self, message, click_at=None, details=None):
+        self.clock.now += self.send_duration
+        self.sent.append((message, click_at['x'], click_at['y']))
+        details.update(strategy='paste', total=self.send_duration)
+        return True
+
+    def run_daemon(self, max_waits, **kwargs):
+        daemon = AutomationDaemon(**kwargs)
+        daemon._stop = FakeStop(self.clock, max_waits)
+        daemon.run_forever()
+        return daemon
+
+    def test_interval_cycles_alternate_windows_and_messages(self):
+        """Each cycle delivers the next message to the next window, cycle_interval apart."""
+        daemon = self.run_daemon(max_waits=3)
+        self.assertEqual(daemon.cycle_count, 3)
+        self.assertEqual(self.sent, [('yes', 100, 200), ('continue', 300, 400), ('yes', 100, 200)])
+        self.assertEqual(daemon._stop.waits, [10, 10, 10])
+        events = daemon.events.recent()
+        self.assertEqual([event['window_title'] for event in events], ['Chat A', 'Chat B', 'Chat A'])
+        self.assertTrue(all(event['ok'] for event in events))
+
+    def test_schedule_counts_from_cycle_start(self):
+        """Time spent in a cycle is subtracted from the wait before the next one."""
+        self.send_duration = 3.0
+        daemon = self.run_daemon(max_waits=2)
+        self.assertEqual(daemon._stop.waits, [7, 7])
+
+    def test_overrun_does_not_burst(self):
+        """A cycle longer than the interval starts the next one at once, then the cadence resumes."""
+        durations = iter([25.0, 1.0])
+
+        def slow_activation(window, timeout):
+            self.clock.now += next(durations)
+            return True
+
+        with mock.patch.object(automation_daemon, 'activate_window', slow_activation):
+            daemon = self.run_daemon(max_waits=2)
+        self.assertEqual(daemon._stop.waits, [0, 9])
+
+    def test_command_line_interval_overrides_config(self):
+        """--interval takes precedence over cycle_interval."""
+        daemon = self.run_daemon(max_waits=2, interval=4.0)
+        self.assertEqual(daemon._stop.waits, [4, 4])
+
+    def test_invalid_config_skips_delivery(self):
+        """An invalid config is reported on the cycle event and nothing is sent."""
+        self.write_config(dict(CONFIG, windows=[]))
+        daemon = self.run_daemon(max_waits=1)
+        self.assertEqual(self.sent, [])
+        event = daemon.events.recent()[-1]
+        self.assertFalse(event['ok'])
+        self.assertTrue(event['error'].startswith('configuration invalid'))
+
+    def test_missing_window_fails_cycle(self):
+        """A configured window that is not open fails its cycle without sending."""
+        automation_daemon.registry.records.pop('0x00000001')
+        daemon = self.run_daemon(max_waits=2)
+        self.assertEqual(self.sent, [('continue', 300, 400)])
+        self.assertEqual([event['error'] for event in daemon.events.recent()], ['window not found', None])
+
+    def test_idle_trigger_dispatches_to_idle_window(self):
+        """With the idle trigger each quiet chat gets a cycle, without interval waits."""
+        daemon = AutomationDaemon(trigger='idle')
+        daemon._stop = FakeStop(self.clock, max_waits=1)
+        quiet = iter(['Chat B', 'Chat B'])
+
+        def wait_for_idle():
+            title = next(quiet, None)
+            if title is None:
+                daemon._stop.set()
+                return None
+            return next(w for w in daemon.load_config()['windows'] if w['title'] == title)
+
+        daemon.wait_for_idle = wait_for_idle
+        daemon.run_forever()
+        self.assertEqual(self.sent, [('yes', 300, 400), ('continue', 300, 400)])
+        self.assertEqual(daemon._stop.waits, [])
+
+    def test_idle_detection_error_retries_after_interval(self):
+        """A failing idle watcher is retried after cycle_interval instead of stopping the daemon."""
+        daemon = AutomationDaemon(trigger='idle')
+        daemon._stop = FakeStop(self.clock, max_waits=2)
+        daemon.load_config()
+        daemon.wait_for_idle = mock.Mock(side_effect=OSError('no display'))
+        daemon.run_forever()
+        self.assertEqual(daemon._stop.waits, [10, 10])
+        self.assertEqual(daemon.cycle_count, 0)
+        self.assertEqual(self.sent, [])
+
+    def test_chat_regions_reports_covered_windows_as_hidden(self):
+        """A window that is not visible is watched with a None region instead of its rectangle."""
+        automation_daemon.registry.covered.add('0x00000002')
+        daemon = AutomationDaemon(trigger='idle')
+        regions = daemon.chat_regions()
+        self.assertIsNotNone(regions['Chat A'])
+        self.assertIsNone(regions['Chat B'])
+
+
+if __name__ == '__main__':
+    unittest.main()
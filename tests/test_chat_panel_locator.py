@@ -0,0 +1,43 @@
+import unittest
+
+from chat_panel_locator import MIN_CONFIDENCE, OPENCV_AVAILABLE, locate_chat_input
+
+if OPENCV_AVAILABLE:
+    import cv2
+    import numpy as np
+
+
+def editor_frame(with_input=True):
+    """A dark editor window with code on the left and a chat input on the right."""
+    frame = np.full((900, 1400, 3), 30, np.uint8)
+    for i in range(60):
+        cv2.putText(frame, 'def foo(bar): return bar * 2  # code', (10, 20 + i * 13),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+    cv2.line(frame, (1000, 0), (1000, 900), (80, 80, 80), 1)
+    if with_input:
+        cv2.rectangle(frame, (1020, 800), (1380, 860), (120, 120, 120), 1)
+    return frame
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, 'requires numpy and opencv-python')
+class TestChatPanelLocator(unittest.TestCase):
+    def test_finds_input_box_by_edges(self):
+        found = locate_chat_input(editor_frame())
+        self.assertEqual(found['method'], 'edges')
+        self.assertGreaterEqual(found['confidence'], MIN_CONFIDENCE)
+        self.assertTrue(1020 <= found['x'] <= 1380 and 800 <= found['y'] <= 860)
+
+    def test_no_input_box(self):
+        found = locate_chat_input(editor_frame(with_input=False))
+        self.assertTrue(found is None or found['confidence'] < MIN_CONFIDENCE)
+
+    def test_template_match_takes_precedence(self):
+        frame = editor_frame()
+        template = cv2.cvtColor(frame[795:865, 1015:1385], cv2.COLOR_BGR2GRAY)
+        found = locate_chat_input(frame, template=template)
+        self.assertEqual(found['method'], 'template')
+        self.assertEqual((found['x'], found['y']), (1200, 830))
+
+
+if __name__ == '__main__':
+    unittest.main()
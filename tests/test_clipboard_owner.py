@@ -0,0 +1,117 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import clipboard_owner
+from clipboard_owner import XLIB_AVAILABLE, ClipboardOwner, copy_to_clipboard
+
+if XLIB_AVAILABLE:
+    from Xlib import X, error
+
+
+class FakeWindow:
+
+    def __init__(self, display, window_id):
+        self.display = display
+        self.id = window_id
+        self.owned_at = None
+        self.properties = []
+
+    def change_property(self, prop, prop_type, fmt, data, mode=None):
+        self.properties.append((prop, data))
+        if mode == X.PropModeAppend:
+            self.display.events.append(SimpleNamespace(type=X.PropertyNotify, window=self, atom=prop,
+                                                       time=self.display.time))
+
+    def set_selection_owner(self, selection, time):
+        self.owned_at = time
+        self.display.owner = self
+
+    def send_event(self, event):
+        self.display.sent.append(event)
+
+
+class FakeDisplay:
+
+    def __init__(self):
+        self.time = 123456
+        self.events = []
+        self.sent = []
+        self.owner = None
+
+    def flush(self):
+        pass
+
+    def next_event(self):
+        return self.events.pop(0)
+
+    def get_selection_owner(self, selection):
+        return self.owner
+
+
+@unittest.skipUnless(XLIB_AVAILABLE, 'python-xlib not installed')
+class TestClipboardOwner(unittest.TestCase):
+
+    def setUp(self):
+        self.display = FakeDisplay()
+        owner = ClipboardOwner.__new__(ClipboardOwner)
+        owner._display = self.display
+        owner._window = FakeWindow(self.display, 7)
+        owner._atoms = {name: i for i, name in enumerate(
+            ('CLIPBOARD', 'TARGETS', 'UTF8_STRING', 'TEXT', 'TIMESTAMP', '_CLIPBOARD_OWNER_TIME'), 100)}
+        owner.max_bytes = 1 << 16
+        owner._data = b''
+        owner._owned_since = X.CurrentTime
+        owner._lock = threading.RLock()
+        self.owner = owner
+        patcher = mock.patch('clipboard_owner.xevent.SelectionNotify', SimpleNamespace)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, target, time):
+        requestor = FakeWindow(self.display, 9)
+        return requestor, SimpleNamespace(type=X.SelectionRequest, requestor=requestor, target=target,
+                                          property=200, selection=self.owner._atoms['CLIPBOARD'], time=time)
+
+    def test_ownership_uses_server_timestamp(self):
+        """Test that copy() takes the selection at a real server time, not CurrentTime."""
+        self.assertTrue(self.owner.copy('hello'))
+        self.assertEqual(self.owner._window.owned_at, 123456)
+
+    def test_timestamp_target_reports_ownership_time(self):
+        """Test that TIMESTAMP is answered with the time ownership was taken."""
+        self.owner.copy('hello')
+        requestor, request = self.request(self.owner._atoms['TIMESTAMP'], 123500)
+        self.owner._reply(request)
+        self.assertEqual(requestor.properties, [(200, [123456])])
+
+    def test_requests_queued_before_timestamp_are_answered(self):
+        """Test that a paste arriving during the timestamp round trip is still served."""
+        requestor, request = self.request(self.owner._atoms['UTF8_STRING'], X.CurrentTime)
+        self.display.events.append(request)
+        self.owner.copy('hello')
+        self.assertEqual(requestor.properties, [(200, b'hello')])
+        self.assertEqual(len(self.display.sent), 1)
+
+
+@unittest.skipUnless(XLIB_AVAILABLE, 'python-xlib not installed')
+class TestCopyToClipboard(unittest.TestCase):
+
+    def test_broken_connection_discards_owner(self):
+        """Test that a closed X connection drops the owner and falls back to pyperclip."""
+        broken = mock.Mock()
+        broken.copy.side_effect = error.ConnectionClosedError('server')
+        clipboard = {}
+        pyperclip = SimpleNamespace(copy=lambda text: clipboard.update(text=text),
+                                    paste=lambda: clipboard.get('text'))
+        with mock.patch.object(clipboard_owner, '_owner', broken), \
+                mock.patch.dict('sys.modules', pyperclip=pyperclip):
+            self.assertTrue(copy_to_clipboard('hello', settle=0))
+            self.assertIsNone(clipboard_owner._owner)
+        broken.close.assert_called_once()
+        self.assertEqual(clipboard, {'text': 'hello'})
+
+
+if __name__ == "__main__":
+    unittest.main()
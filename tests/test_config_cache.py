@@ -0,0 +1,103 @@
+import copy
+import json
+import os
+import tempfile
+import unittest
+
+from config_cache import ConfigCache, ConfigConflict, ConfigError
+
+
+class TestConfigCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'config.json')
+        self.write({'windows': [{'title': 'Cursor'}], 'message': ['yes, continue']})
+        self.cache = ConfigCache(self.path, check_interval=0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, config):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+
+    def test_unchanged_file_is_parsed_once(self):
+        """Test that repeated reads do not reload the file."""
+        first = self.cache.get()
+        self.assertIs(self.cache.get(), first)
+        self.assertIs(self.cache.get_with_etag()[0], first)
+        self.assertEqual(self.cache.generation, 1)
+
+    def test_callers_cannot_modify_cached_config(self):
+        """Test that the shared snapshot is read-only and a deep copy is a plain, mutable config."""
+        config = self.cache.get()
+        with self.assertRaises(TypeError):
+            config['windows'][0]['title'] = 'Changed'
+        with self.assertRaises(TypeError):
+            config['message'].append('extra')
+        with self.assertRaises(TypeError):
+            config.update(waiting_time=5)
+        mutable = copy.deepcopy(config)
+        mutable['windows'][0]['title'] = 'Changed'
+        mutable['message'].append('extra')
+        self.assertIs(type(mutable['windows']), list)
+        self.assertEqual(self.cache.get()['windows'][0]['title'], 'Cursor')
+        self.assertEqual(json.loads(json.dumps(config)), {'windows': [{'title': 'Cursor'}], 'message': ['yes, continue']})
+
+    def test_changed_file_bumps_generation(self):
+        """Test that a rewrite is picked up and increments the generation."""
+        self.cache.get()
+        self.write({'windows': [{'title': 'Terminal'}], 'message': ['go'], 'padding': 'x'})
+        self.assertEqual(self.cache.get()['windows'][0]['title'], 'Terminal')
+        self.assertEqual(self.cache.generation, 2)
+
+    def test_invalid_rewrite_keeps_last_valid_config(self):
+        """Test that a broken file does not replace a loaded config."""
+        self.cache.get()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"windows": [')
+        self.assertEqual(self.cache.get()['windows'][0]['title'], 'Cursor')
+        self.assertIsNotNone(self.cache.error)
+
+    def test_invalid_initial_config_raises(self):
+        """Test that a config without messages is rejected."""
+        self.write({'windows': [{'title': 'Cursor'}]})
+        with self.assertRaises(ConfigError):
+            ConfigCache(self.path).get()
+
+    def test_schema_rejects_wrong_types(self):
+        """Test that settings and messages are type-checked."""
+        for bad in ({'windows': [{'title': 'Cursor'}], 'message': ['go'], 'waiting_time': 'soon'},
+                    {'windows': [{'title': 'Cursor'}], 'message': ['go'], 'cycling': 'sometimes'},
+                    {'windows': [{'title': 'Cursor', 'coordinates': {'x': '1'}}], 'message': ['go']},
+                    {'windows': [{'title': 'Cursor', 'detect_chat_input': 'yes'}], 'message': ['go']},
+                    {'windows': [{'title': 'Cursor'}], 'message': ['go'], 'idle_fps': 0},
+                    {'windows': [{'title': 'Cursor'}], 'message': ['go'], 'idle_seconds': -1},
+                    {'windows': [{'title': 'Cursor'}], 'message': ['go'], 'idle_max_wait': -5},
+                    {'windows': [{'title': 'Cursor'}], 'message': [{'text': 'go', 'weight': -1}]}):
+            with self.assertRaises(ConfigError):
+                self.cache.write(bad)
+
+    def test_write_is_atomic_and_versioned(self):
+        """Test that writes bump config_version and update the cache in place."""
+        config, etag = self.cache.get_with_etag()
+        written, new_etag = self.cache.write(dict(config, waiting_time=5))
+        self.assertEqual(written['config_version'], 1)
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(self.cache.get()['waiting_time'], 5)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['config_version'], 1)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['config.json'])
+        self.assertEqual(ConfigCache(self.path).version, 1)
+
+    def test_stale_etag_is_rejected(self):
+        """Test that a write based on an old snapshot fails."""
+        config, etag = self.cache.get_with_etag()
+        self.write({'windows': [{'title': 'Terminal'}], 'message': ['go']})
+        with self.assertRaises(ConfigConflict):
+            self.cache.write(config, expected_etag=etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
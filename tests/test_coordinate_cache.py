@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from coordinate_cache import CoordinateCache
+
+
+def window(window_id='0x01', x=100, y=50, width=800, height=600, wm_class='Cursor'):
+    return {'id': window_id, 'title': 'main.py - Cursor', 'class': wm_class,
+            'geometry': {'x': x, 'y': y, 'width': width, 'height': height}}
+
+
+class TestCoordinateCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'coords.json')
+        self.cache = CoordinateCache(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_moved_window_keeps_relative_position(self):
+        self.cache.put(window(), 500, 600, 0.9)
+        moved = window(x=300, y=80)
+        self.cache.on_window_change(1, 'geometry', window()['geometry'], moved['geometry'])
+        self.assertEqual(self.cache.get(moved), {'x': 700, 'y': 630, 'source': 'cache'})
+
+    def test_resize_invalidates(self):
+        self.cache.put(window(), 500, 600)
+        resized = window(width=1024)
+        self.cache.on_window_change(1, 'geometry', window()['geometry'], resized['geometry'])
+        self.assertIsNone(self.cache.get(resized))
+
+    def test_layout_reused_for_new_window(self):
+        self.cache.put(window(), 500, 600)
+        self.assertEqual(self.cache.get(window(window_id='0x02', x=0, y=0))['x'], 400)
+        self.assertIsNone(self.cache.get(window(window_id='0x02', wm_class='Code')))
+
+    def test_layouts_persist(self):
+        self.cache.put(window(), 500, 600)
+        reloaded = CoordinateCache(self.path)
+        self.assertEqual(reloaded.get(window(window_id='0x03'))['y'], 600)
+
+    def test_forget_drops_layout(self):
+        self.cache.put(window(), 500, 600)
+        self.cache.forget(window())
+        self.assertIsNone(self.cache.get(window()))
+        self.assertIsNone(CoordinateCache(self.path).get(window()))
+
+
+if __name__ == '__main__':
+    unittest.main()
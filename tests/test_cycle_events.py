@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cycle_events import CycleEvent, EventLog
+
+
+class TestCycleEvent(unittest.TestCase):
+    def test_stages_and_outcome(self):
+        event = CycleEvent(7, backend='xlib')
+        with event.stage('discovery'):
+            pass
+        with event.stage('activation'):
+            pass
+        data = event.finish(False, 'activation failed')
+        self.assertEqual(data['cycle'], 7)
+        self.assertEqual(set(data['durations']), {'discovery', 'activation'})
+        self.assertFalse(data['ok'])
+        self.assertEqual(data['error'], 'activation failed')
+        self.assertGreaterEqual(data['total'], 0)
+
+    def test_paste_and_enter_from_xdotool_report(self):
+        event = CycleEvent(1)
+        event.record_delivery({
+            'backend': 'xdotool', 'strategy': 'paste', 'total': 1.0, 'staging': 0.05,
+            'steps': [{'name': 'mousemove', 'offset': 0.0, 'duration': None},
+                      {'name': 'click', 'offset': 0.1, 'duration': None},
+                      {'name': 'key', 'offset': 0.4, 'duration': None},
+                      {'name': 'key', 'offset': 0.6, 'duration': None}],
+        })
+        durations = event.data['durations']
+        self.assertAlmostEqual(durations['paste'], 0.25)
+        self.assertAlmostEqual(durations['enter'], 0.4)
+        self.assertEqual(event.data['strategy'], 'paste')
+
+
+class TestEventLog(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.log = EventLog(os.path.join(self.log_dir, 'events.jsonl'), ring_size=3)
+
+    def tearDown(self):
+        self.log.close()
+        shutil.rmtree(self.log_dir)
+
+    def test_jsonl_file_and_ring_buffer(self):
+        for cycle in range(5):
+            self.log.emit(CycleEvent(cycle).finish(True))
+        with open(self.log.path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([e['cycle'] for e in lines], [0, 1, 2, 3, 4])
+        self.assertEqual([e['seq'] for e in self.log.recent()], [3, 4, 5])
+        self.assertEqual([e['seq'] for e in self.log.recent(since=4)], [5])
+        self.assertEqual([e['seq'] for e in self.log.recent(limit=1)], [5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import threading
+import unittest
+
+from cycle_pipeline import CyclePipeline
+
+
+class TestCyclePipeline(unittest.TestCase):
+
+    def test_results_stay_in_job_order(self):
+        """Test that deliveries happen in order on the calling thread."""
+        caller = threading.current_thread()
+        delivered_on = []
+
+        def deliver(prepared):
+            delivered_on.append(threading.current_thread())
+            return prepared * 10
+
+        pipeline = CyclePipeline(lambda job: job + 1, deliver)
+        results = [result for _, result in pipeline.run(range(4))]
+        self.assertEqual(results, [10, 20, 30, 40])
+        self.assertTrue(all(thread is caller for thread in delivered_on))
+
+    def test_next_job_is_prepared_after_delivery(self):
+        """Test that hooks of job N finish before job N+1 is prepared."""
+        calls = []
+
+        def prepare(job):
+            calls.append(('pre_send', job))
+            return job
+
+        def deliver(prepared):
+            calls.append(('post_send', prepared))
+            return True
+
+        list(CyclePipeline(prepare, deliver).run(range(3)))
+        self.assertEqual(calls, [('pre_send', 0), ('post_send', 0), ('pre_send', 1),
+                                 ('post_send', 1), ('pre_send', 2), ('post_send', 2)])
+
+    def test_next_job_is_prepared_while_caller_waits(self):
+        """Test that job N+1 is prepared between iterations."""
+        prepared_next = threading.Event()
+
+        def prepare(job):
+            if job == 1:
+                prepared_next.set()
+            return job
+
+        for prepared, _ in CyclePipeline(prepare, lambda prepared: True).run(range(2)):
+            if prepared == 0:
+                self.assertTrue(prepared_next.wait(timeout=2))
+
+    def test_prepared_job_is_revalidated_before_delivery(self):
+        """Test that revalidate runs on the calling thread and its result is delivered."""
+        caller = threading.current_thread()
+        revalidated_on = []
+
+        def revalidate(prepared):
+            revalidated_on.append(threading.current_thread())
+            return prepared + 100
+
+        results = [result for _, result in CyclePipeline(lambda job: job, lambda p: p, revalidate).run(range(2))]
+        self.assertEqual(results, [100, 101])
+        self.assertTrue(all(thread is caller for thread in revalidated_on))
+
+
+if __name__ == "__main__":
+    unittest.main()
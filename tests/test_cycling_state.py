@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from cycling_state import CyclingState
+
+
+class TestCyclingState(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cursor_survives_flush_and_reload(self):
+        """Test that cursors are persisted atomically and resumed."""
+        state = CyclingState(self.tmpdir.name, flush_interval=3600)
+        self.assertEqual([state.next_index('message', 3) for _ in range(4)], [0, 1, 2, 0])
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, 'message_index.txt')))
+        state.flush()
+        self.assertEqual(os.listdir(self.tmpdir.name), ['message_index.txt'])
+        self.assertEqual(CyclingState(self.tmpdir.name).next_index('message', 3), 1)
+
+    def test_round_robin_skips_disabled_windows(self):
+        """Test that only enabled windows are cycled."""
+        windows = [{'title': 'A'}, {'title': 'B', 'enabled': False}, {'title': 'C'}]
+        state = CyclingState(self.tmpdir.name, flush_interval=3600)
+        titles = [state.next_window(windows)['title'] for _ in range(3)]
+        self.assertEqual(titles, ['A', 'C', 'A'])
+
+
+if __name__ == "__main__":
+    unittest.main()
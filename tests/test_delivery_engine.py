@@ -0,0 +1,111 @@
+import unittest
+from unittest import mock
+
+from delivery_engine import DeliveryEngine
+
+
+class FakeBackend:
+
+    def __init__(self, name='xlib'):
+        self.name = name
+        self.calls = []
+
+    def activate_window_sync(self, window_id, timeout=2.0):
+        self.calls.append(('activate', window_id))
+        return 0.01
+
+    def mouse_move(self, x, y):
+        self.calls.append(('move', x, y))
+        return True
+
+    def click(self, button=1):
+        self.calls.append(('click', button))
+        return True
+
+    def key(self, combo):
+        self.calls.append(('key', combo))
+        return True
+
+    def type_text(self, text):
+        self.calls.append(('type', text))
+        return True
+
+
+class TestDeliveryEngineChoose(unittest.TestCase):
+
+    def test_unmeasured_inject_is_tried_first(self):
+        """Test that auto mode injects once to measure the typing rate."""
+        self.assertEqual(DeliveryEngine(FakeBackend()).choose('yes'), 'inject')
+
+    def test_measured_costs_decide(self):
+        """Test that the cheaper measured strategy wins, counting the whole payload."""
+        engine = DeliveryEngine(FakeBackend(), char_cost=0.002, paste_cost=0.21)
+        self.assertEqual(engine.choose('[2026-01-01 12:00:00] yes'), 'inject')
+        self.assertEqual(engine.choose('[2026-01-01 12:00:00] ' + 'x' * 60), 'paste')
+
+    def test_long_text_is_pasted(self):
+        """Test that text over the length cutoff is pasted whatever the estimate."""
+        engine = DeliveryEngine(FakeBackend(), char_cost=1e-6)
+        self.assertEqual(engine.choose('x' * (engine.inject_max_chars + 1)), 'paste')
+
+    def test_non_ascii_and_multiline_text_is_pasted(self):
+        """Test that text needing keymap changes or newlines is pasted."""
+        engine = DeliveryEngine(FakeBackend())
+        self.assertEqual(engine.choose('ça va'), 'paste')
+        self.assertEqual(engine.choose('a\nb'), 'paste')
+
+    def test_non_xlib_backend_always_pastes(self):
+        """Test that inject is never chosen without the Xlib backend, even if forced."""
+        engine = DeliveryEngine(FakeBackend('shell'), mode='inject')
+        self.assertEqual(engine.choose('yes'), 'paste')
+
+    def test_forced_mode_wins_on_xlib(self):
+        """Test that an explicit mode overrides the estimate."""
+        self.assertEqual(DeliveryEngine(FakeBackend(), mode='paste').choose('yes'), 'paste')
+        self.assertEqual(DeliveryEngine(FakeBackend(), mode='inject').choose('x' * 100), 'inject')
+
+
+class TestDeliveryEngineDeliver(unittest.TestCase):
+
+    def test_inject_types_then_presses_enter(self):
+        """Test that injection types the text, presses Enter and measures the typing rate."""
+        backend = FakeBackend()
+        engine = DeliveryEngine(backend)
+        report = engine.deliver('yes', window_id=7)
+        self.assertEqual(report['strategy'], 'inject')
+        self.assertTrue(report['ok'])
+        self.assertEqual(backend.calls, [('activate', 7), ('type', 'yes'), ('key', 'Return')])
+        typed = next(step for step in report['steps'] if step['name'] == 'type')
+        self.assertAlmostEqual(engine.char_cost, typed['duration'] / 3)
+
+    def test_inject_cost_is_a_moving_average(self):
+        """Test that later inject timings are smoothed into the measured cost."""
+        engine = DeliveryEngine(FakeBackend(), char_cost=1.0, smoothing=0.5)
+        report = {'ok': True, 'steps': [{'name': 'type', 'offset': 0.0, 'duration': 0.5}]}
+        engine._observe_inject('xxxxx', report)
+        self.assertAlmostEqual(engine.char_cost, 0.55)
+        engine._observe_inject('xxxxx', dict(report, ok=False))
+        self.assertAlmostEqual(engine.char_cost, 0.55)
+
+    def test_paste_stages_clipboard_and_learns_cost(self):
+        """Test that pasting stages the text and updates the paste cost."""
+        backend = FakeBackend()
+        engine = DeliveryEngine(backend, mode='paste', paste_cost=10.0)
+        with mock.patch('delivery_engine.copy_to_clipboard', return_value=True) as copy:
+            report = engine.deliver('hello', coordinates={'x': 1, 'y': 2})
+        copy.assert_called_once_with('hello')
+        self.assertTrue(report['ok'])
+        self.assertIn(('key', 'ctrl+v'), backend.calls)
+        self.assertLess(engine.paste_cost, 10.0)
+
+    def test_unconfirmed_clipboard_fails_without_input(self):
+        """Test that nothing is pasted when staging could not be confirmed."""
+        backend = FakeBackend()
+        with mock.patch('delivery_engine.copy_to_clipboard', return_value=False):
+            report = DeliveryEngine(backend, mode='paste').deliver('hello')
+        self.assertFalse(report['ok'])
+        self.assertEqual(backend.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
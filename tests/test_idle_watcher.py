@@ -0,0 +1,110 @@
+import threading
+import unittest
+
+from idle_watcher import IdleWatcher, chat_region
+from screen_capture import NUMPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+class FakeScreen:
+    """Returns the current frame for every region."""
+
+    def __init__(self):
+        self.frame = np.zeros((200, 300, 4), np.uint8)
+        self.captures = 0
+
+    def capture(self, x, y, width, height, out=None, step=1):
+        self.captures += 1
+        return self.frame[::step, ::step]
+
+    def write_line(self, row):
+        self.frame[row:row + 16, 20:260] = 255
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, 'requires numpy')
+class TestIdleWatcher(unittest.TestCase):
+    def setUp(self):
+        self.screen = FakeScreen()
+        self.watcher = IdleWatcher(stable_seconds=5, max_wait=60, capture=self.screen.capture)
+        self.watcher.set_regions({'Cursor': (0, 0, 300, 200)}, now=0)
+
+    def test_fires_after_stable_period(self):
+        self.watcher.sample(now=0)
+        self.watcher.sample(now=3)
+        self.assertEqual(self.watcher.ready(now=3), [])
+        self.screen.write_line(40)
+        self.watcher.sample(now=4)
+        self.assertEqual(self.watcher.ready(now=8), [])
+        self.watcher.sample(now=9)
+        self.assertEqual(self.watcher.ready(now=9), ['Cursor'])
+
+    def test_disarmed_until_region_changes(self):
+        self.watcher.sample(now=0)
+        self.watcher.sample(now=6)
+        self.watcher.fired('Cursor', now=6)
+        self.watcher.sample(now=20)
+        self.assertEqual(self.watcher.ready(now=20), [])
+        self.screen.write_line(100)
+        self.watcher.sample(now=21)
+        self.watcher.sample(now=27)
+        self.assertEqual(self.watcher.ready(now=27), ['Cursor'])
+
+    def test_max_wait_refires_quiet_region(self):
+        self.watcher.sample(now=0)
+        self.watcher.fired('Cursor', now=0)
+        self.watcher.sample(now=61)
+        self.assertEqual(self.watcher.ready(now=61), ['Cursor'])
+
+    def test_caret_blink_is_not_activity(self):
+        self.watcher.sample(now=0)
+        self.screen.frame[50:68, 100:102] = 255
+        self.watcher.sample(now=6)
+        self.assertEqual(self.watcher.ready(now=6), ['Cursor'])
+
+    def test_wait_returns_ready_key_or_none_on_stop(self):
+        self.watcher.stable_seconds = 0
+        self.assertEqual(self.watcher.wait(threading.Event(), timeout=1), 'Cursor')
+        stop = threading.Event()
+        stop.set()
+        self.assertIsNone(self.watcher.wait(stop))
+
+    def test_removed_region_is_forgotten(self):
+        self.watcher.set_regions({}, now=1)
+        self.watcher.sample(now=10)
+        self.assertEqual(self.watcher.ready(now=10), [])
+
+    def test_hidden_region_is_not_sampled_or_ready(self):
+        self.watcher.sample(now=0)
+        self.watcher.set_regions({'Cursor': None}, now=1)
+        self.watcher.sample(now=10)
+        self.assertEqual(self.screen.captures, 1)
+        self.assertEqual(self.watcher.ready(now=10), [])
+
+    def test_uncovered_unchanged_region_stays_disarmed(self):
+        self.watcher.sample(now=0)
+        self.watcher.sample(now=6)
+        self.watcher.fired('Cursor', now=6)
+        self.watcher.set_regions({'Cursor': None}, now=7)
+        self.watcher.set_regions({'Cursor': (0, 0, 300, 200)}, now=20)
+        self.watcher.sample(now=20)
+        self.watcher.sample(now=30)
+        self.assertEqual(self.watcher.ready(now=30), [])
+
+
+class TestChatRegion(unittest.TestCase):
+    window = {'geometry': {'x': 100, 'y': 50, 'width': 1000, 'height': 800}}
+
+    def test_explicit_region_is_relative_to_window(self):
+        self.assertEqual(chat_region(self.window, [600, 0, 400, 700]), (700, 50, 400, 700))
+
+    def test_column_around_chat_input_is_clamped(self):
+        self.assertEqual(chat_region(self.window, chat_input={'x': 1050, 'y': 800}), (700, 50, 400, 800))
+
+    def test_whole_window_by_default(self):
+        self.assertEqual(chat_region(self.window), (100, 50, 1000, 800))
+
+
+if __name__ == '__main__':
+    unittest.main()
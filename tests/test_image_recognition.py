@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import cv2
+    import numpy as np
+    import image_recognition
+    from image_recognition import TemplateMatcher, find_image_on_screen, find_on_screen, non_max_suppression
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+
+def icon():
+    """A 40x40 button-like glyph with enough texture to match."""
+    glyph = np.full((40, 40), 40, np.uint8)
+    cv2.rectangle(glyph, (2, 2), (37, 37), 220, 2)
+    cv2.putText(glyph, 'OK', (6, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 255, 2)
+    return glyph
+
+
+def screen(placements):
+    image = np.random.RandomState(0).randint(0, 30, (400, 600)).astype(np.uint8)
+    for x, y, scale in placements:
+        glyph = icon() if scale == 1.0 else cv2.resize(icon(), None, fx=scale, fy=scale)
+        image[y:y + glyph.shape[0], x:x + glyph.shape[1]] = glyph
+    return image
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, 'requires numpy and opencv-python')
+class TestTemplateMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = TemplateMatcher()
+
+    def test_finds_every_occurrence_once(self):
+        result = self.matcher.find_all(screen([(50, 60, 1.0), (400, 300, 1.0)]), icon())
+        found = sorted((m['x'], m['y']) for m in result['matches'])
+        self.assertEqual(len(found), 2)
+        self.assertTrue(all(abs(a - b) <= 1 for pair in zip(found, [(50, 60), (400, 300)]) for a, b in zip(*pair)))
+        self.assertGreater(result['elapsed'], 0)
+        self.assertEqual(self.matcher.stats['calls'], 1)
+
+    def test_finds_scaled_template(self):
+        match = self.matcher.find(screen([(200, 100, 1.25)]), icon())
+        self.assertEqual(match['scale'], 1.25)
+        self.assertLessEqual(abs(match['x'] - 200) + abs(match['y'] - 100), 3)
+
+    def test_roi_restricts_search(self):
+        image = screen([(50, 60, 1.0), (400, 300, 1.0)])
+        matches = self.matcher.find_all(image, icon(), roi=(300, 200, 300, 200))['matches']
+        self.assertEqual(len(matches), 1)
+        self.assertLessEqual(abs(matches[0]['x'] - 400) + abs(matches[0]['y'] - 300), 2)
+
+    def test_no_match(self):
+        self.assertIsNone(self.matcher.find(screen([]), icon()))
+
+    def test_template_file_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'icon.png')
+            cv2.imwrite(path, icon())
+            self.assertIs(self.matcher.load(path), self.matcher.load(path))
+            screenshot = os.path.join(tmp, 'screen.png')
+            cv2.imwrite(screenshot, screen([(120, 80, 1.0)]))
+            x, y = find_image_on_screen(path, screenshot)
+            self.assertLessEqual(abs(x - 120) + abs(y - 80), 2)
+
+    def test_find_image_on_screen_falls_back_to_full_resolution(self):
+        checkers = ((np.indices((32, 32)).sum(0) % 2) * 255).astype(np.uint8)
+        image = screen([])
+        image[100:132, 200:232] = checkers
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'checkers.png')
+            cv2.imwrite(path, checkers)
+            screenshot = os.path.join(tmp, 'screen.png')
+            cv2.imwrite(screenshot, image)
+            # pyrDown averages the 1px pattern away, so the coarse pass alone misses it
+            self.assertIsNone(image_recognition.get_template_matcher().find(image, path, scales=(1.0,)))
+            self.assertEqual(find_image_on_screen(path, screenshot), (200, 100))
+
+    def test_find_on_screen_offsets_region(self):
+        frame = cv2.cvtColor(screen([(120, 80, 1.0)]), cv2.COLOR_GRAY2BGRA)
+        with mock.patch.object(image_recognition, 'capture_region', return_value=frame) as capture:
+            result = find_on_screen(icon(), region=(1000, 500, 600, 400), scales=(1.0,))
+        self.assertEqual(capture.call_args[0], (1000, 500, 600, 400))
+        match = result['matches'][0]
+        self.assertLessEqual(abs(match['x'] - 1120) + abs(match['y'] - 580), 2)
+
+    def test_non_max_suppression(self):
+        box = {'x': 0, 'y': 0, 'width': 10, 'height': 10}
+        kept = non_max_suppression([dict(box, score=0.9), dict(box, x=2, score=0.95), dict(box, x=50, score=0.85)])
+        self.assertEqual([m['score'] for m in kept], [0.95, 0.85])
+
+
+if __name__ == '__main__':
+    unittest.main()
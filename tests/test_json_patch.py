@@ -0,0 +1,36 @@
+import unittest
+
+from json_patch import JsonPatchError, apply_patch
+
+
+class TestJsonPatch(unittest.TestCase):
+    def setUp(self):
+        self.doc = {'windows': [{'title': 'Cursor', 'enabled': True}], 'message': ['a', 'b'], 'a/b': 1}
+
+    def test_operations(self):
+        patched = apply_patch(self.doc, [
+            {'op': 'replace', 'path': '/windows/0/enabled', 'value': False},
+            {'op': 'add', 'path': '/message/-', 'value': 'c'},
+            {'op': 'add', 'path': '/message/0', 'value': 'z'},
+            {'op': 'remove', 'path': '/message/1'},
+            {'op': 'copy', 'from': '/windows/0/title', 'path': '/title'},
+            {'op': 'move', 'from': '/a~1b', 'path': '/moved'},
+            {'op': 'test', 'path': '/moved', 'value': 1},
+        ])
+        self.assertEqual(patched, {'windows': [{'title': 'Cursor', 'enabled': False}],
+                                   'message': ['z', 'b', 'c'], 'title': 'Cursor', 'moved': 1})
+        self.assertTrue(self.doc['windows'][0]['enabled'])
+
+    def test_errors(self):
+        for patch in ([{'op': 'remove', 'path': '/missing'}],
+                      [{'op': 'replace', 'path': '/message/5', 'value': 'x'}],
+                      [{'op': 'test', 'path': '/message/0', 'value': 'nope'}],
+                      [{'op': 'add', 'path': 'no-slash', 'value': 1}],
+                      [{'op': 'frobnicate', 'path': '/message'}],
+                      {'op': 'add'}):
+            with self.assertRaises(JsonPatchError):
+                apply_patch(self.doc, patch)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from log_follower import DROPPED, FileFollower
+
+
+class TestFileFollower(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.log_dir, 'run.log')
+        with open(self.path, 'w') as f:
+            f.write('existing\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def append(self, text):
+        with open(self.path, 'a') as f:
+            f.write(text)
+
+    def test_subscribers_share_one_reader(self):
+        async def scenario():
+            follower = FileFollower(self.path, poll_interval=0.01)
+            first, second = follower.subscribe(), follower.subscribe()
+            await asyncio.sleep(0.05)
+            self.append('one\ntw')
+            await asyncio.sleep(0.05)
+            self.append('o\n')
+            await asyncio.sleep(0.05)
+            lines = [[q.get_nowait()[1] for _ in range(q.qsize())] for q in (first, second)]
+            follower.unsubscribe(first)
+            follower.unsubscribe(second)
+            await asyncio.sleep(0.05)
+            return lines, follower._task.done()
+
+        lines, stopped = asyncio.run(scenario())
+        self.assertEqual(lines, [['one', 'two'], ['one', 'two']])
+        self.assertTrue(stopped)
+
+    def test_slow_consumer_is_dropped(self):
+        async def scenario():
+            follower = FileFollower(self.path, poll_interval=0.01, queue_size=2)
+            slow, fast = follower.subscribe(), follower.subscribe(asyncio.Queue())
+            await asyncio.sleep(0.05)
+            self.append('a\nb\nc\n')
+            await asyncio.sleep(0.05)
+            items = [slow.get_nowait() for _ in range(slow.qsize())]
+            follower.unsubscribe(fast)
+            return items, fast.qsize(), follower.dropped
+
+        items, fast_count, dropped = asyncio.run(scenario())
+        self.assertEqual(items, [('log', 'b'), ('log', DROPPED)])
+        self.assertEqual(fast_count, 3)
+        self.assertEqual(dropped, 1)
+
+    def test_rotation_restarts_from_new_file(self):
+        async def scenario():
+            follower = FileFollower(self.path, poll_interval=0.01)
+            queue = follower.subscribe()
+            await asyncio.sleep(0.05)
+            os.rename(self.path, self.path + '.1')
+            with open(self.path, 'w') as f:
+                f.write('fresh\n')
+            await asyncio.sleep(0.05)
+            follower.unsubscribe(queue)
+            return [queue.get_nowait()[1] for _ in range(queue.qsize())]
+
+        self.assertEqual(asyncio.run(scenario()), ['fresh'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import log_pipeline
+from log_pipeline import flush_logging, log_with_time, setup_logging
+
+
+class Unprintable:
+    formatted = False
+
+    def __str__(self):
+        Unprintable.formatted = True
+        return 'unprintable'
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.log_dir, 'run.log')
+
+    def tearDown(self):
+        flush_logging()
+        shutil.rmtree(self.log_dir)
+
+    def read_log(self):
+        flush_logging()
+        with open(self.log_file, encoding='utf-8') as f:
+            return f.read()
+
+    def test_single_timestamp_in_file(self):
+        """Test that a file line carries exactly one timestamp."""
+        setup_logging(log_file=self.log_file, console=False)
+        log_with_time('cycle %d done', 3)
+        lines = self.read_log().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertRegex(lines[0], r'^\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\] INFO cycle 3 done$')
+
+    def test_disabled_level_is_never_formatted(self):
+        """Test that arguments of a disabled level are never rendered."""
+        setup_logging(log_file=self.log_file, console=False, level=logging.INFO)
+        Unprintable.formatted = False
+        log_with_time('value: %s', Unprintable(), level=logging.DEBUG)
+        self.assertEqual(self.read_log(), '')
+        self.assertFalse(Unprintable.formatted)
+
+    def test_formatting_happens_off_the_calling_thread(self):
+        """Test that messages are formatted on the listener thread, not the caller's."""
+        formatted_on = []
+
+        class Recorder:
+            def __str__(self):
+                formatted_on.append(threading.current_thread())
+                return 'recorded'
+
+        setup_logging(log_file=self.log_file, console=False)
+        listener_thread = log_pipeline._listener._thread
+        log_with_time('value %s', Recorder())
+        self.assertIn('value recorded', self.read_log())
+        self.assertTrue(formatted_on)
+        self.assertEqual(set(formatted_on), {listener_thread})
+        self.assertIsNot(listener_thread, threading.current_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from log_reader import iter_byte_range, parse_range, tail_lines
+
+
+class TestLogReader(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.log_dir, 'run.log')
+        self.lines = [f"[2024-01-01 00:00:00] line {i} ✓\n" for i in range(1000)]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(self.lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def test_tail_matches_readlines(self):
+        for count in (1, 10, 999, 1000, 5000):
+            self.assertEqual(tail_lines(self.path, count, block_size=64), self.lines[-count:])
+
+    def test_tail_without_trailing_newline(self):
+        with open(self.path, 'a') as f:
+            f.write('partial')
+        self.assertEqual(tail_lines(self.path, 2), [self.lines[-1], 'partial'])
+
+    def test_tail_of_empty_file(self):
+        open(self.path, 'w').close()
+        self.assertEqual(tail_lines(self.path, 10), [])
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-2000', 1000), (990, 999))
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1000))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=1000-', 1000)
+
+    def test_suffix_range_of_empty_file_is_unsatisfiable(self):
+        """Test that bytes=-N on an empty log raises instead of returning (0, -1)."""
+        with self.assertRaises(ValueError):
+            parse_range('bytes=-100', 0)
+
+    def test_tail_splits_on_newline_only(self):
+        """Test that carriage returns and form feeds do not start new lines."""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('progress 10%\rprogress 100%\nnext\x0cpage\n')
+        self.assertEqual(tail_lines(self.path, 2), ['progress 10%\rprogress 100%\n', 'next\x0cpage\n'])
+
+    def test_byte_range_streaming(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        chunks = list(iter_byte_range(self.path, 100, 5099, chunk_size=1000))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(b''.join(chunks), data[100:5100])
+
+
+if __name__ == '__main__':
+    unittest.main()
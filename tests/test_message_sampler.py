@@ -0,0 +1,57 @@
+import collections
+import os
+import unittest
+
+from message_sampler import MessageSampler, sampler_for
+
+MESSAGES = [
+    {'text': 'yes, continue', 'weight': 5},
+    {'text': 'run full test suite', 'weight': 3},
+    {'text': 'update readme.md'},
+]
+
+
+class TestMessageSampler(unittest.TestCase):
+
+    def test_memory_is_per_distinct_message(self):
+        """Test that weights do not duplicate message texts."""
+        sampler = MessageSampler([{'text': 'long instruction', 'weight': 50}, 'short'])
+        self.assertEqual(sampler.texts, ['long instruction', 'short'])
+
+    def test_seeded_draws_are_reproducible(self):
+        """Test that the same seed yields the same sequence."""
+        a = MessageSampler(MESSAGES, seed=7)
+        b = MessageSampler(MESSAGES, seed=7)
+        self.assertEqual([a.draw() for _ in range(50)], [b.draw() for _ in range(50)])
+
+    def test_weighted_draws_follow_weights(self):
+        """Test that the alias table reproduces the weight ratios."""
+        sampler = MessageSampler(MESSAGES, seed=1)
+        counts = collections.Counter(sampler.draw() for _ in range(9000))
+        self.assertAlmostEqual(counts['yes, continue'] / 9000, 5 / 9, delta=0.03)
+        self.assertAlmostEqual(counts['update readme.md'] / 9000, 1 / 9, delta=0.03)
+
+    def test_shuffle_bag_draws_each_weight_exactly(self):
+        """Test that one bag contains every message exactly `weight` times."""
+        sampler = MessageSampler(MESSAGES, mode='shuffle_bag', seed=3)
+        counts = collections.Counter(sampler.draw() for _ in range(9))
+        self.assertEqual(counts, {'yes, continue': 5, 'run full test suite': 3, 'update readme.md': 1})
+
+    def test_shuffle_bag_scales_fractional_weights(self):
+        """Test that fractional weights become whole counts in the same ratio."""
+        sampler = MessageSampler([{'text': 'a', 'weight': 0.5}, {'text': 'b', 'weight': 0.7}],
+                                 mode='shuffle_bag', seed=1)
+        counts = collections.Counter(sampler.draw() for _ in range(12))
+        self.assertEqual(counts, {'a': 5, 'b': 7})
+
+    def test_sampler_for_reuses_sampler_per_message_list(self):
+        """Test that the same message list keeps the sampler and its bag until it is replaced."""
+        messages = [dict(m) for m in MESSAGES]
+        first = sampler_for(messages, 'shuffle_bag', 5)
+        self.assertIs(sampler_for(messages, 'shuffle_bag', 5), first)
+        self.assertIsNot(sampler_for(messages, 'shuffle_bag', 6), first)
+        self.assertIsNot(sampler_for([dict(m) for m in MESSAGES], 'shuffle_bag', 6), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
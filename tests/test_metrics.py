@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from metrics import CycleMetrics, MetricsRegistry, MetricsServer, fetch_metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_and_histogram_rendering(self):
+        registry = MetricsRegistry()
+        sends = registry.counter('sends_total', 'Sends', ('window',))
+        latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        sends.inc('Cursor "main"')
+        sends.inc('Cursor "main"')
+        for value in (0.05, 0.5, 3.0):
+            latency.observe(value)
+        text = registry.render()
+        self.assertIn('# TYPE sends_total counter', text)
+        self.assertIn('sends_total{window="Cursor \\"main\\""} 2', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count 3', text)
+
+    def test_cycle_events_feed_metrics(self):
+        metrics = CycleMetrics()
+        metrics.observe_cycle({'window_title': 'Cursor', 'ok': True, 'retries': 2,
+                               'durations': {'activation': 0.2, 'paste': 0.3}, 'total': 1.0})
+        metrics.observe_cycle({'window_title': 'Cursor', 'ok': False, 'safety_blocked': True,
+                               'durations': {}, 'total': 0.1})
+        self.assertEqual(metrics.sends.value('Cursor'), 1)
+        self.assertEqual(metrics.failures.value('Cursor'), 1)
+        self.assertEqual(metrics.retries.value('Cursor'), 2)
+        self.assertEqual(metrics.safety_blocks.value('Cursor'), 1)
+
+    def test_served_over_unix_socket(self):
+        tmpdir = tempfile.mkdtemp()
+        path = os.path.join(tmpdir, 'metrics.sock')
+        metrics = CycleMetrics()
+        metrics.observe_cycle({'window_title': 'Cursor', 'ok': True, 'total': 0.5})
+        server = MetricsServer(metrics.registry, path)
+        try:
+            self.assertEqual(fetch_metrics(path), metrics.registry.render())
+        finally:
+            server.close()
+            shutil.rmtree(tmpdir)
+        with self.assertRaises(OSError):
+            fetch_metrics(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from plugin_manager import PluginManager
+
+
+PLUGIN = """
+calls = []
+
+def run(message=None, coords=None):
+    calls.append((message, coords, VERSION))
+"""
+
+
+class TestPluginManager(unittest.TestCase):
+    def setUp(self):
+        self.plugins_dir = tempfile.mkdtemp()
+        self.manager = PluginManager(self.plugins_dir, check_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.plugins_dir)
+        sys.modules.pop('sample_plugin', None)
+
+    def write_source(self, name, source):
+        with open(os.path.join(self.plugins_dir, f'{name}.py'), 'w') as f:
+            f.write(source)
+
+    def write_plugin(self, version, mtime):
+        path = os.path.join(self.plugins_dir, 'sample_plugin.py')
+        with open(path, 'w') as f:
+            f.write(f"VERSION = {version}\n" + PLUGIN)
+        os.utime(path, (mtime, mtime))
+
+    def test_plugin_is_imported_once(self):
+        """Test that an unchanged plugin keeps its imported module."""
+        self.write_plugin(1, 1000)
+        self.manager.pre_send(message='hi', coords=(1, 2))
+        module = self.manager.plugins['sample_plugin']['module']
+        self.manager.pre_send(message='again', coords=None)
+        self.assertIs(self.manager.plugins['sample_plugin']['module'], module)
+        self.assertEqual(module.calls, [('hi', (1, 2), 1), ('again', None, 1)])
+        self.assertIn('sample_plugin', self.manager.load_times())
+
+    def test_modified_plugin_is_reloaded(self):
+        """Test that a newer mtime re-imports the plugin with fresh state."""
+        self.write_plugin(1, 1000)
+        self.manager.pre_send(message='a')
+        self.write_plugin(2, 2000)
+        self.manager.pre_send(message='b')
+        module = self.manager.plugins['sample_plugin']['module']
+        self.assertEqual(module.calls, [('b', None, 2)])
+
+    def test_deleted_plugin_is_dropped(self):
+        """Test that a removed plugin file is forgotten."""
+        self.write_plugin(1, 1000)
+        self.manager.refresh()
+        os.remove(os.path.join(self.plugins_dir, 'sample_plugin.py'))
+        self.manager.refresh()
+        self.assertEqual(self.manager.plugins, {})
+
+    def test_broken_plugin_does_not_stop_others(self):
+        """Test that a plugin failing to import does not block the rest."""
+        with open(os.path.join(self.plugins_dir, 'broken.py'), 'w') as f:
+            f.write("raise RuntimeError('boom')\n")
+        self.write_plugin(1, 1000)
+        self.manager.pre_send(message='x')
+        self.assertEqual(self.manager.plugins['broken']['error'], 'boom')
+        self.assertEqual(len(self.manager.plugins['sample_plugin']['module'].calls), 1)
+        sys.modules.pop('broken', None)
+
+    def test_pre_send_veto(self):
+        """Test that a pre-send hook returning False vetoes the send."""
+        self.write_source('veto', "def run(message=None):\n    return message != 'stop'\n")
+        self.assertTrue(self.manager.pre_send(message='go', window={}, coords=None))
+        self.assertFalse(self.manager.pre_send(message='stop', window={}, coords=None))
+        self.assertEqual(self.manager.stats['veto']['vetoes'], 1)
+        sys.modules.pop('veto', None)
+
+    def test_slow_pre_send_hook_is_not_waited_for(self):
+        """Test that pre_send stops waiting for a hook after its TIMEOUT."""
+        self.write_source('slow', "import time\nTIMEOUT = 0.05\ndef run():\n    time.sleep(0.5)\n")
+        start = time.monotonic()
+        self.assertTrue(self.manager.pre_send(message='x'))
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(self.manager.stats['slow']['timeouts'], 1)
+        sys.modules.pop('slow', None)
+
+    def test_late_veto_counts_as_timeout_only(self):
+        """Test that a hook vetoing after its TIMEOUT is counted once, as a timeout, and ignored."""
+        self.write_source('late', "import time\nTIMEOUT = 0.05\ndef run():\n    time.sleep(0.2)\n    return False\n")
+        self.assertTrue(self.manager.pre_send(message='x'))
+        self.manager._executor.shutdown(wait=True)
+        stats = self.manager.stats['late']
+        self.assertEqual((stats['calls'], stats['timeouts'], stats['vetoes']), (1, 1, 0))
+        sys.modules.pop('late', None)
+
+    def test_queued_hook_is_cancelled_after_timeout(self):
+        """Test that a hook still queued when its TIMEOUT expires never runs."""
+        self.manager = PluginManager(self.plugins_dir, check_interval=0, max_workers=1)
+        self.write_source('a_busy', "import threading\nTIMEOUT = 0.05\nrelease = threading.Event()\n"
+                                    "def run():\n    release.wait(5)\n")
+        self.write_source('b_queued', "TIMEOUT = 0.05\nran = []\ndef run():\n    ran.append(True)\n")
+        self.assertTrue(self.manager.pre_send(message='x'))
+        self.manager.plugins['a_busy']['module'].release.set()
+        self.manager._executor.shutdown(wait=True)
+        self.assertEqual(self.manager.plugins['b_queued']['module'].ran, [])
+        self.assertEqual(self.manager.stats['b_queued']['calls'], 0)
+        self.assertEqual(self.manager.stats['b_queued']['timeouts'], 1)
+        self.assertEqual(self.manager.stats['a_busy']['timeouts'], 1)
+        sys.modules.pop('a_busy', None)
+        sys.modules.pop('b_queued', None)
+
+    def test_async_hook_timeout(self):
+        """Test that an async hook is cancelled after its TIMEOUT."""
+        self.write_source('aslow', "import asyncio\nTIMEOUT = 0.05\nasync def run(message=None):\n"
+                                   "    await asyncio.sleep(1)\n")
+        self.manager.pre_send(message='x')
+        # The pre-send wait gives up first; the coroutine is then cancelled by its own timeout.
+        deadline = time.monotonic() + 1
+        while self.manager.stats.get('aslow', {}).get('calls', 0) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.manager.stats['aslow']['calls'], 1)
+        self.assertLess(self.manager.stats['aslow']['max_time'], 0.5)
+        sys.modules.pop('aslow', None)
+
+    def test_post_send_hooks_are_fire_and_forget(self):
+        """Test that post_send returns before its hooks finish."""
+        self.write_source('after', "import time\nHOOK = 'post_send'\ndone = []\n"
+                                   "def run(message=None, window=None):\n    time.sleep(0.1)\n    done.append(message)\n")
+        start = time.monotonic()
+        self.manager.post_send(message='sent', window={}, coords=(1, 2))
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.manager._executor.shutdown(wait=True)
+        self.assertEqual(self.manager.plugins['after']['module'].done, ['sent'])
+        sys.modules.pop('after', None)
+
+    def test_hung_hook_does_not_block_exit(self):
+        """Test that hooks run on daemon threads, so a hung one cannot block interpreter exit."""
+        self.write_source('hung', "import threading\nTIMEOUT = 0.01\nrelease = threading.Event()\n"
+                                  "def run():\n    release.wait(5)\n")
+        self.manager.pre_send(message='x')
+        self.assertTrue(self.manager._executor._threads)
+        self.assertTrue(all(thread.daemon for thread in self.manager._executor._threads))
+        self.manager.plugins['hung']['module'].release.set()
+        sys.modules.pop('hung', None)
+
+
+if __name__ == '__main__':
+    unittest.main()
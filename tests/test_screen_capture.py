@@ -0,0 +1,197 @@
+import ctypes
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import screen_capture
+from screen_capture import (NUMPY_AVAILABLE, XLIB_AVAILABLE, BufferPool, ShmCapture, XlibCapture, _is_bgrx,
+                            _Visual, _XImage)
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+class FakeImage:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeRoot:
+    """Serves GetImage replies with 8 bytes of row padding, like a real server may."""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.calls = 0
+
+    def get_image(self, x, y, width, height, fmt, planes):
+        self.calls += 1
+        region = self.screen[y:y + height, x:x + width]
+        padded = np.zeros((height, width * 4 + 8), np.uint8)
+        padded[:, :width * 4] = region.reshape(height, -1)
+        return FakeImage(padded.tobytes())
+
+
+class TestBufferPool(unittest.TestCase):
+    def test_reuses_and_evicts_least_recent(self):
+        released = []
+        pool = BufferPool(lambda w, h: [w, h], released.append, size=2)
+        first = pool.get(10, 10)
+        self.assertIs(pool.get(10, 10), first)
+        pool.get(20, 20)
+        pool.get(10, 10)
+        pool.get(30, 30)
+        self.assertEqual(released, [[20, 20]])
+        pool.clear()
+        self.assertEqual(len(released), 3)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, 'requires numpy')
+class TestXlibCapture(unittest.TestCase):
+    def setUp(self):
+        self.screen = np.random.RandomState(1).randint(0, 255, (100, 160, 4)).astype(np.uint8)
+        self.capture = XlibCapture.__new__(XlibCapture)
+        self.capture._root = FakeRoot(self.screen)
+        self.capture.width, self.capture.height = 160, 100
+        self.capture._buffers = BufferPool(lambda w, h: np.empty((h, w, 4), np.uint8))
+        self.capture._lock = mock.MagicMock()
+        self.capture.supported = True
+
+    def test_grab_fills_reused_buffer(self):
+        """Test that grabs of the same size reuse one buffer."""
+        first = self.capture.grab(10, 20, 50, 30)
+        np.testing.assert_array_equal(first, self.screen[20:50, 10:60])
+        self.screen[:] = 7
+        second = self.capture.grab(10, 20, 50, 30)
+        self.assertIs(second, first)
+        self.assertTrue((second == 7).all())
+
+    def test_grab_clips_to_screen(self):
+        """Test that rectangles are clipped to the screen."""
+        frame = self.capture.grab(140, 90, 50, 50)
+        self.assertEqual(frame.shape, (10, 20, 4))
+        self.assertIsNone(self.capture.grab(200, 0, 10, 10))
+
+    def test_unsupported_format_is_not_grabbed(self):
+        """Test that grab() returns None instead of misreading other pixel formats."""
+        self.capture.supported = False
+        self.assertIsNone(self.capture.grab(0, 0, 10, 10))
+        self.assertEqual(self.capture._root.calls, 0)
+
+    def test_capture_region_uses_process_capturer(self):
+        """Test that the module helpers go through the process capturer and return copies."""
+        with mock.patch.object(screen_capture, 'get_capture', return_value=self.capture):
+            frame = screen_capture.capture_region(0, 0, 16, 8)
+            again = screen_capture.capture_region(0, 0, 16, 8)
+            full = screen_capture.capture_screen()
+        self.assertEqual(frame.shape, (8, 16, 4))
+        self.assertEqual(full.shape, (100, 160, 4))
+        self.assertFalse(np.shares_memory(frame, again))
+        self.assertEqual(len(self.capture._buffers._buffers), 0)
+
+    def test_capture_region_fills_out_of_matching_shape(self):
+        """Test that a previous frame passed as `out` is refilled, and a mismatched one replaced."""
+        with mock.patch.object(screen_capture, 'get_capture', return_value=self.capture):
+            frame = screen_capture.capture_region(10, 20, 16, 8)
+            self.screen[:] = 3
+            self.assertIs(screen_capture.capture_region(10, 20, 16, 8, out=frame), frame)
+            other = screen_capture.capture_region(10, 20, 32, 8, out=frame)
+        self.assertTrue((frame == 3).all())
+        self.assertEqual(other.shape, (8, 32, 4))
+        self.assertFalse(np.shares_memory(frame, other))
+
+    def test_capture_region_step_copies_downsampled_frame(self):
+        """Test that `step` keeps every step-th row and column and reuses a matching `out`."""
+        with mock.patch.object(screen_capture, 'get_capture', return_value=self.capture):
+            frame = screen_capture.capture_region(10, 20, 50, 30, step=4)
+            again = screen_capture.capture_region(10, 20, 50, 30, out=frame, step=4)
+        self.assertEqual(frame.shape, (8, 13, 4))
+        np.testing.assert_array_equal(frame, self.screen[20:50:4, 10:60:4])
+        self.assertIs(again, frame)
+
+
+
+def screen_format(byte_order=0, depth=24, bits_per_pixel=32, red_mask=0xff0000):
+    info = SimpleNamespace(image_byte_order=byte_order,
+                           pixmap_formats=[SimpleNamespace(depth=depth, bits_per_pixel=bits_per_pixel)])
+    visual = SimpleNamespace(visual_id=33, red_mask=red_mask, green_mask=0xff00, blue_mask=0xff)
+    screen = SimpleNamespace(root_depth=depth, root_visual=33,
+                             allowed_depths=[SimpleNamespace(depth=depth, visuals=[visual])])
+    return info, screen
+
+
+@unittest.skipUnless(XLIB_AVAILABLE, 'requires python-xlib')
+class TestPixelFormat(unittest.TestCase):
+    def test_bgrx_is_supported(self):
+        """Test that 24-bit TrueColor in 32bpp little-endian pixels is accepted."""
+        self.assertTrue(_is_bgrx(*screen_format()))
+
+    def test_other_formats_are_rejected(self):
+        """Test that big-endian, 16bpp and RGB-ordered screens are rejected."""
+        self.assertFalse(_is_bgrx(*screen_format(byte_order=1)))
+        self.assertFalse(_is_bgrx(*screen_format(depth=16, bits_per_pixel=16)))
+        self.assertFalse(_is_bgrx(*screen_format(red_mask=0xff)))
+
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, 'requires numpy')
+class TestShmCaptureSetup(unittest.TestCase):
+    def libraries(self, red_mask=0xff0000):
+        self.visual = _Visual(red_mask=red_mask, green_mask=0xff00, blue_mask=0xff)
+        x11, xext, libc = mock.MagicMock(), mock.MagicMock(), mock.MagicMock()
+        x11.XOpenDisplay.return_value = 1234
+        x11.XSetErrorHandler.return_value = 99
+        x11.XDefaultVisual.return_value = ctypes.addressof(self.visual)
+        x11.XDefaultDepth.return_value = 24
+        return x11, xext, libc
+
+    def test_failed_setup_restores_handler_and_closes_display(self):
+        """Test that a capturer failing after XOpenDisplay leaves no display or handler behind."""
+        x11, xext, libc = self.libraries()
+        xext.XShmCreateImage.return_value = None
+        with mock.patch.object(screen_capture, '_load_libraries', return_value=(x11, xext, libc)):
+            with self.assertRaises(OSError):
+                ShmCapture()
+        self.assertEqual(x11.XSetErrorHandler.call_args_list[-1], mock.call(99))
+        x11.XCloseDisplay.assert_called_once_with(1234)
+
+    def test_rgb_visual_is_rejected(self):
+        """Test that MIT-SHM capture checks the visual's masks like GetImage capture does."""
+        x11, xext, libc = self.libraries(red_mask=0xff)
+        image = _XImage(byte_order=screen_capture.LSB_FIRST, bits_per_pixel=32, bytes_per_line=4)
+        xext.XShmCreateImage.return_value = ctypes.pointer(image)
+        with mock.patch.object(screen_capture, '_load_libraries', return_value=(x11, xext, libc)):
+            with self.assertRaisesRegex(OSError, 'unsupported pixel format'):
+                ShmCapture()
+        x11.XDestroyImage.assert_called_once()
+        libc.shmget.assert_not_called()
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE and os.environ.get('DISPLAY'), 'requires numpy and an X display')
+class TestShmCapture(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.capture = ShmCapture()
+        except OSError as e:
+            self.skipTest(f'MIT-SHM unavailable: {e}')
+        self.addCleanup(self.capture.close)
+
+    def test_grab_returns_bgrx_frame(self):
+        """Test that a grab of the real screen has the requested shape."""
+        frame = self.capture.grab(0, 0, 32, 16)
+        self.assertEqual(frame.shape, (16, 32, 4))
+        self.assertEqual(frame.dtype, np.uint8)
+
+    def test_capture_region_survives_eviction(self):
+        """Test that capture_region() frames stay readable after their segment is unmapped."""
+        with mock.patch.object(screen_capture, 'get_capture', return_value=self.capture):
+            frame = screen_capture.capture_region(0, 0, 8, 8)
+        expected = frame.tobytes()
+        for size in range(9, 9 + screen_capture.MAX_BUFFERS + 1):
+            self.capture.grab(0, 0, size, size)
+        self.assertTrue(frame.flags.owndata)
+        self.assertEqual(frame.tobytes(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
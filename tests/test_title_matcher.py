@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import title_matcher
+from config_cache import ConfigCache
+from title_matcher import TitleMatcher, get_config_matcher
+
+
+class TestTitleMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = TitleMatcher(targets=['Cursor', 'Terminal'])
+
+    def test_classify_reports_every_kind_in_one_pass(self):
+        """Test that overlapping targets, extensions and keywords are all found."""
+        result = self.matcher.classify('main.py - nvim - Cursor')
+        self.assertEqual(result['targets'], ['Cursor'])
+        self.assertIn('.py', result['extensions'])
+        self.assertEqual(result['editor_keywords'], ['vim', 'nvim'])
+        self.assertEqual(result['excluded'], [])
+
+    def test_safe_title_has_no_safety_hits(self):
+        """Test that a plain Cursor title only matches the target."""
+        result = self.matcher.classify('Cursor')
+        self.assertEqual(result['targets'], ['Cursor'])
+        self.assertFalse(result['extensions'] or result['editor_keywords'])
+
+    def test_match_windows_skips_excluded_titles(self):
+        """Test that each target maps to the first non-excluded window."""
+        windows = [
+            {'id': '0x1', 'title': 'click-and-yes-cursor - Terminal'},
+            {'id': '0x2', 'title': 'project - Cursor'},
+            {'id': '0x3', 'title': 'Terminal'},
+        ]
+        matches = self.matcher.match_windows(windows)
+        self.assertEqual(matches['Cursor']['id'], '0x2')
+        self.assertEqual(matches['Terminal']['id'], '0x3')
+
+
+class TestConfigMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'config.json')
+        self.write(['Cursor', 'Terminal'])
+        patcher = mock.patch.object(title_matcher, 'get_config_cache',
+                                    return_value=ConfigCache(self.path, check_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, titles, padding=''):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'windows': [{'title': t} for t in titles], 'message': ['go'], 'pad': padding}, f)
+
+    def test_one_matcher_for_all_configured_titles(self):
+        """Test that every configured title resolves in one pass."""
+        windows = [{'id': 1, 'title': 'bash - Terminal'}, {'id': 2, 'title': 'chat - Cursor'}]
+        matches = get_config_matcher().match_windows(windows)
+        self.assertEqual({title: w['id'] for title, w in matches.items()}, {'Cursor': 2, 'Terminal': 1})
+
+    def test_rebuilt_when_config_generation_changes(self):
+        """Test that the matcher follows a config reload and is reused otherwise."""
+        first = get_config_matcher()
+        self.assertIs(get_config_matcher(), first)
+        self.write(['Firefox'], padding='changed')
+        self.assertEqual(get_config_matcher().kinds['targets'], ['Firefox'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import window_registry
+from window_registry import XLIB_AVAILABLE, WindowRegistry
+
+if XLIB_AVAILABLE:
+    from Xlib import X
+
+ATOMS = {name: i for i, name in enumerate(
+    ('_NET_CLIENT_LIST', '_NET_WM_DESKTOP', 'UTF8_STRING', '_NET_WM_NAME', 'WM_NAME', '_NET_WM_STATE',
+     '_NET_WM_STATE_HIDDEN', '_NET_CURRENT_DESKTOP', '_NET_CLIENT_LIST_STACKING'), start=1)}
+
+
+class FakeWindow:
+
+    def __init__(self, window_id, title='', desktop=0, x=0, y=0):
+        self.id = window_id
+        self.title = title
+        self.desktop = desktop
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+    def change_attributes(self, event_mask=None):
+        pass
+
+    def get_wm_class(self):
+        return ('term', 'Terminal')
+
+    def get_full_property(self, atom, prop_type):
+        if atom == ATOMS['_NET_WM_NAME']:
+            return SimpleNamespace(value=self.title.encode('utf-8'))
+        if atom == ATOMS['_NET_WM_DESKTOP']:
+            return SimpleNamespace(value=[self.desktop])
+        if atom == ATOMS['_NET_WM_STATE'] and self.hidden:
+            return SimpleNamespace(value=[ATOMS['_NET_WM_STATE_HIDDEN']])
+        return None
+
+    def get_geometry(self):
+        return SimpleNamespace(width=640, height=480)
+
+
+class FakeRoot:
+
+    def __init__(self, clients):
+        self.clients = clients
+        self.desktop = 0
+
+    def get_full_property(self, atom, prop_type):
+        if atom == ATOMS['_NET_CURRENT_DESKTOP']:
+            return SimpleNamespace(value=[self.desktop])
+        return SimpleNamespace(value=list(self.clients))
+
+    def translate_coords(self, window, x, y):
+        return SimpleNamespace(x=window.x, y=window.y)
+
+
+class FakeDisplay:
+
+    def __init__(self, windows):
+        self.windows = {window.id: window for window in windows}
+
+    def create_resource_object(self, kind, window_id):
+        return self.windows[window_id]
+
+
+WMCTRL_OUTPUT = (
+    "0x00a00001  0 10   20   800  600  term.Terminal  host Build log\n"
+    "0x00a00002  1 0    0    1024 768  firefox.Firefox  host Chat - Firefox\n"
+)
+XPROP_OUTPUT = (
+    "_NET_CURRENT_DESKTOP(CARDINAL) = 1\n"
+    "_NET_CLIENT_LIST_STACKING(WINDOW): window id # 0xa00002, 0xa00001\n"
+)
+
+
+def fake_run_command(command):
+    if command.startswith('xprop'):
+        return XPROP_OUTPUT, '', 0
+    return WMCTRL_OUTPUT, '', 0
+
+
+@unittest.skipUnless(XLIB_AVAILABLE, 'python-xlib not installed')
+class TestEventMode(unittest.TestCase):
+
+    def setUp(self):
+        self.windows = [FakeWindow(0x10, 'Chat - Firefox', desktop=1, x=5, y=6), FakeWindow(0x20, 'Build log')]
+        self.root = FakeRoot([0x10, 0x20])
+        self.registry = WindowRegistry()
+        self.registry.mode = 'events'
+        self.registry._display = FakeDisplay(self.windows)
+        self.registry._atoms = ATOMS
+        self.registry._root = self.root
+        self.registry._sync_clients()
+        self.registry._sync_root_state()
+        self.changes = []
+        self.registry.add_listener(lambda *change: self.changes.append(change))
+
+    def property_event(self, window, atom):
+        return SimpleNamespace(type=X.PropertyNotify, window=window, atom=ATOMS[atom])
+
+    def test_client_list_is_loaded(self):
+        """_NET_CLIENT_LIST on the root window seeds the table with every client."""
+        record = self.registry.get(0x10)
+        self.assertEqual(record['title'], 'Chat - Firefox')
+        self.assertEqual(record['class'], 'Terminal')
+        self.assertEqual(record['desktop'], '1')
+        self.assertEqual(record['geometry'], {'x': 5, 'y': 6, 'width': 640, 'height': 480})
+        self.assertEqual(len(self.registry.windows()), 2)
+
+    def test_client_list_change_adds_and_removes_windows(self):
+        """A _NET_CLIENT_LIST PropertyNotify adds new clients and reports closed ones."""
+        new_window = FakeWindow(0x30, 'Editor')
+        self.registry._display.windows[0x30] = new_window
+        self.root.clients = [0x20, 0x30]
+        self.registry._handle_event(self.property_event(self.root, '_NET_CLIENT_LIST'))
+        self.assertIsNone(self.registry.get(0x10))
+        self.assertEqual(self.registry.get(0x30)['title'], 'Editor')
+        self.assertEqual(self.changes[0][0:2], (0x10, None))
+        self.assertIsNone(self.registry.find_by_title('chat'))
+        self.assertEqual(self.registry.find_by_title('editor')['id'], '0x00000030')
+
+    def test_title_change_updates_index_and_notifies(self):
+        """A _NET_WM_NAME PropertyNotify renames the window in place and in the title index."""
+        self.assertEqual(self.registry.find_by_title('chat - firefox')['id'], '0x00000010')
+        self.windows[0].title = 'Inbox - Firefox'
+        self.registry._handle_event(self.property_event(self.windows[0], '_NET_WM_NAME'))
+        self.assertEqual(self.changes, [(0x10, 'title', 'Chat - Firefox', 'Inbox - Firefox')])
+        self.assertIsNone(self.registry.find_by_title('Chat'))
+        self.assertEqual(self.registry.find_by_title('INBOX')['id'], '0x00000010')
+
+    def test_find_by_title_prefers_lowest_id(self):
+        """Duplicate titles resolve to the lowest window id, as in windows() order."""
+        self.windows[1].title = 'Chat - Firefox'
+        self.registry._handle_event(self.property_event(self.windows[1], '_NET_WM_NAME'))
+        self.assertEqual(self.registry.find_by_title('Chat - Firefox')['id'], '0x00000010')
+        self.assertEqual(self.registry.find_by_title('firefox')['id'], '0x00000010')
+
+    def test_failing_listener_is_logged(self):
+        """A listener that raises is logged and does not stop the update."""
+        self.registry.add_listener(mock.Mock(side_effect=RuntimeError('boom')))
+        self.windows[1].title = 'Tests passed'
+        with mock.patch.object(window_registry, 'log_with_time') as log:
+            self.registry._handle_event(self.property_event(self.windows[1], '_NET_WM_NAME'))
+        log.assert_called_once()
+        self.assertEqual(self.registry.get(0x20)['title'], 'Tests passed')
+
+    def test_window_covered_by_higher_window_is_not_visible(self):
+        """A window stacked above that overlaps the rectangle hides it; one beside it does not."""
+        self.windows[0].desktop = 0
+        self.registry._handle_event(self.property_event(self.windows[0], '_NET_WM_DESKTOP'))
+        self.root.clients = [0x20, 0x10]
+        self.registry._handle_event(self.property_event(self.root, '_NET_CLIENT_LIST_STACKING'))
+        self.assertTrue(self.registry.is_visible(0x10))
+        self.assertFalse(self.registry.is_visible(0x20))
+        self.assertTrue(self.registry.is_visible(0x20, (700, 500, 50, 50)))
+
+    def test_other_desktop_and_minimized_windows_are_not_visible(self):
+        """Windows on another desktop or with _NET_WM_STATE_HIDDEN are not on screen."""
+        self.assertFalse(self.registry.is_visible('0x00000010'))
+        self.root.desktop = 1
+        self.registry._handle_event(self.property_event(self.root, '_NET_CURRENT_DESKTOP'))
+        self.assertTrue(self.registry.is_visible('0x00000010'))
+        self.windows[0].hidden = True
+        self.registry._handle_event(self.property_event(self.windows[0], '_NET_WM_STATE'))
+        self.assertFalse(self.registry.is_visible('0x00000010'))
+        self.assertEqual(self.changes[-1], (0x10, 'hidden', False, True))
+
+
+class TestPollingMode(unittest.TestCase):
+
+    def test_falls_back_to_wmctrl(self):
+        """Without Xlib the registry is filled from wmctrl snapshots."""
+        with mock.patch.object(window_registry, 'run_command', side_effect=fake_run_command) as run:
+            registry = WindowRegistry(refresh_interval=60).start(use_xlib=False)
+            self.assertEqual(registry.mode, 'polling')
+            record = registry.find_by_title('chat')
+            registry.windows()
+            visible = registry.is_visible(record['id']), registry.is_visible('0x00a00001')
+        self.assertEqual(record['id'], '0x00a00002')
+        self.assertEqual(record['class'], 'Firefox')
+        self.assertEqual(record['geometry'], {'x': 0, 'y': 0, 'width': 1024, 'height': 768})
+        self.assertEqual(visible, (True, False))
+        self.assertEqual(run.call_count, 2)
+
+    def test_concurrent_lookups_refresh_once(self):
+        """Threads that find the snapshot stale together trigger a single wmctrl call."""
+        registry = WindowRegistry(refresh_interval=60)
+        registry.mode = 'polling'
+        calls = []
+        gate = threading.Event()
+
+        def slow_wmctrl(command):
+            calls.append(command)
+            gate.wait(1)
+            return fake_run_command(command)
+
+        results = []
+        with mock.patch.object(window_registry, 'run_command', side_effect=slow_wmctrl):
+            threads = [threading.Thread(target=lambda: results.append(registry.find_by_title('build')))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            gate.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([record['id'] for record in results], ['0x00a00001'] * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
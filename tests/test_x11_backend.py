@@ -0,0 +1,172 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import x11_backend
+from x11_backend import XLIB_AVAILABLE, LazyProxy, X11Backend, char_to_keysym
+
+if XLIB_AVAILABLE:
+    from Xlib import X, error
+
+    class FakeXError(error.XError):
+        def __init__(self):
+            Exception.__init__(self, 'BadWindow')
+
+
+class BrokenDisplay:
+    """A display whose every request fails, as after the server drops a window."""
+
+    def sync(self):
+        raise FakeXError()
+
+    def __getattr__(self, name):
+        raise FakeXError()
+
+
+def broken_backend():
+    backend = X11Backend.__new__(X11Backend)
+    backend._display = BrokenDisplay()
+    backend._root = BrokenDisplay()
+    backend._lock = threading.RLock()
+    backend._has_xtest = True
+    backend._keymap = {}
+    backend._spare_keycodes = []
+    return backend
+
+
+class KeyboardDisplay:
+    """Records keyboard mapping changes; keycodes 10 and 11 are spare."""
+
+    def __init__(self, keymap):
+        self.keymap = keymap
+        self.events = []
+        self.log = []
+
+    def pending_events(self):
+        return len(self.events)
+
+    def next_event(self):
+        return self.events.pop(0)
+
+    def refresh_keyboard_mapping(self, event):
+        pass
+
+    def change_keyboard_mapping(self, keycode, keysyms):
+        self.log.append(('map', keycode, keysyms[0][0]))
+        self.keymap[keycode] = keysyms[0][0]
+
+    def sync(self):
+        pass
+
+
+def keyboard_backend():
+    backend = X11Backend.__new__(X11Backend)
+    backend._display = KeyboardDisplay({})
+    backend._lock = threading.RLock()
+    backend._has_xtest = True
+    backend._keymap = {ord('a'): (20, 0)}
+    backend._spare_keycodes = [10, 11]
+    return backend
+
+
+class TestCharToKeysym(unittest.TestCase):
+    def test_keysyms(self):
+        """Test control, Latin-1 and Unicode keysyms."""
+        self.assertEqual(char_to_keysym('\n'), 0xff0d)
+        self.assertEqual(char_to_keysym('\t'), 0xff09)
+        self.assertEqual(char_to_keysym('a'), ord('a'))
+        self.assertEqual(char_to_keysym('é'), 0xe9)
+        self.assertEqual(char_to_keysym('€'), 0x010020ac)
+
+
+class TestLazyProxy(unittest.TestCase):
+    def test_factory_runs_on_first_attribute_access(self):
+        """Test that the wrapped object is only created when first used."""
+        calls = []
+
+        class Target:
+            name = 'xlib'
+
+        def factory():
+            calls.append(1)
+            return Target()
+
+        proxy = LazyProxy(factory)
+        self.assertEqual(calls, [])
+        self.assertEqual(proxy.name, 'xlib')
+        self.assertEqual(len(calls), 1)
+
+
+@unittest.skipUnless(XLIB_AVAILABLE, 'requires python-xlib')
+class TestX11BackendErrors(unittest.TestCase):
+    def test_input_methods_report_x_errors_as_failure(self):
+        """Test that input methods return False instead of raising XError."""
+        backend = broken_backend()
+        self.assertFalse(backend.mouse_move(10, 20))
+        self.assertFalse(backend.click())
+        self.assertFalse(backend.key('ctrl+v'))
+        self.assertFalse(backend.type_text('hi'))
+
+    def test_active_window_without_focus_window(self):
+        """Test that PointerRoot or None input focus gives no active window."""
+        backend = X11Backend.__new__(X11Backend)
+        backend._lock = threading.RLock()
+        backend._property = lambda window, name, prop_type=None: None
+        backend._root = None
+        for focus in (X.PointerRoot, X.NONE):
+            backend._display = SimpleNamespace(get_input_focus=lambda: SimpleNamespace(focus=focus))
+            self.assertIsNone(backend.get_active_window())
+        backend._display = SimpleNamespace(get_input_focus=lambda: SimpleNamespace(focus=SimpleNamespace(id=42)))
+        self.assertEqual(backend.get_active_window(), 42)
+
+
+@unittest.skipUnless(XLIB_AVAILABLE, 'requires python-xlib')
+class TestX11BackendTyping(unittest.TestCase):
+    def type_and_record(self, backend, text):
+        """Types `text` and returns the keysyms the target would have seen."""
+        display = backend._display
+        typed = []
+
+        def fake_input(_, event_type, keycode):
+            if event_type == X.KeyPress:
+                display.log.append(('tap', keycode))
+                typed.append(display.keymap.get(keycode, keycode))
+
+        with mock.patch.object(x11_backend.xtest, 'fake_input', fake_input), \
+                mock.patch.object(x11_backend, 'REMAP_SETTLE', 0):
+            self.assertTrue(backend.type_text(text))
+        return typed
+
+    def test_spare_keycodes_hold_one_keysym_each(self):
+        """Test that distinct unmapped keysyms get their own spare keycode."""
+        backend = keyboard_backend()
+        typed = self.type_and_record(backend, 'éaüé')
+        self.assertEqual(typed, [0xe9, 20, 0xfc, 0xe9])
+        maps = [entry for entry in backend._display.log if entry[0] == 'map']
+        self.assertEqual(maps[:2], [('map', 10, 0xe9), ('map', 11, 0xfc)])
+        self.assertEqual(sorted(maps[2:]), [('map', 10, X.NoSymbol), ('map', 11, X.NoSymbol)])
+
+    def test_more_keysyms_than_spares_are_typed_in_chunks(self):
+        """Test that spares are remapped only after the previous chunk is typed."""
+        backend = keyboard_backend()
+        typed = self.type_and_record(backend, 'éüñ')
+        self.assertEqual(typed, [0xe9, 0xfc, 0xf1])
+        log = backend._display.log
+        self.assertLess(log.index(('tap', 11)), log.index(('map', 10, 0xf1)))
+
+    def test_foreign_mapping_change_reloads_keymap(self):
+        """Test that a MappingNotify from another client drops the cached keymap."""
+        backend = keyboard_backend()
+        backend._display.events.append(SimpleNamespace(type=X.MappingNotify, request=X.MappingKeyboard,
+                                                       first_keycode=10, count=1))
+        backend._handle_mapping_events()
+        self.assertIsNotNone(backend._keymap)
+        backend._display.events.append(SimpleNamespace(type=X.MappingNotify, request=X.MappingKeyboard,
+                                                       first_keycode=20, count=1))
+        backend._handle_mapping_events()
+        self.assertIsNone(backend._keymap)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from xdotool_sequence import ActionSequence, delivery_sequence
+
+
+class TestActionSequence(unittest.TestCase):
+
+    def test_delivery_is_one_chained_command(self):
+        """Test that a full delivery compiles to a single xdotool argv."""
+        argv = delivery_sequence('0x0480000a', {'x': 10, 'y': 20}).to_argv()
+        self.assertEqual(argv.count('xdotool'), 1)
+        self.assertEqual(argv[:4], ['xdotool', 'windowactivate', '--sync', str(0x0480000a)])
+        self.assertIn('ctrl+v', argv)
+        self.assertEqual(argv[-2:], ['key', 'Return'])
+
+    def test_sleeps_are_merged_into_delays(self):
+        """Test that consecutive sleeps add up on the preceding step."""
+        sequence = ActionSequence().click(1).sleep(0.2).sleep(0.3).key('Return')
+        self.assertEqual(sequence.to_argv(), ['xdotool', 'click', '1', 'sleep', '0.5', 'key', 'Return'])
+        self.assertAlmostEqual(sequence.planned_duration(), 0.5)
+
+    def test_type_is_terminated_before_next_command(self):
+        """Test that steps after a type step are not typed as literal text."""
+        argv = ActionSequence().type('hello world').sleep(0.05).key('Return').to_argv()
+        self.assertEqual(argv, ['xdotool', 'type', '--terminator', '--end-of-text--', '--', 'hello world',
+                                '--end-of-text--', 'sleep', '0.05', 'key', 'Return'])
+
+    def test_type_terminator_differs_from_text(self):
+        """Test that text equal to the terminator still ends at the real terminator."""
+        argv = ActionSequence().type('--end-of-text--').to_argv()
+        self.assertEqual(argv[3], argv[-1])
+        self.assertNotEqual(argv[3], '--end-of-text--')
+
+    def test_in_process_activation_uses_configured_timeout(self):
+        """Test that the activation timeout reaches the backend."""
+        class Backend:
+            name = 'xlib'
+            calls = []
+
+            def activate_window_sync(self, window_id, timeout=2.0):
+                self.calls.append((window_id, timeout))
+                return 0.01
+
+        backend = Backend()
+        report = delivery_sequence(42, paste=False, enter=False, activation_timeout=5.0).run(backend)
+        self.assertTrue(report['ok'])
+        self.assertEqual(backend.calls, [(42, 5.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()